@@ -6,7 +6,7 @@ import checkout_pb2_grpc
 class CheckoutClient:
     def __init__(self):
         self.host = os.getenv("CHECKOUT_ORCHESTRATOR_HOST", "localhost")
-        self.port = os.getenv("CHECKOUT_ORCHESTRATOR_PORT", "8000") # <-- IMPORTANT: Verify this port
+        self.port = os.getenv("CHECKOUT_ORCHESTRATOR_PORT", "50051") # gRPC port of the orchestrator (GRPC_PORT), not its HTTP port
         self.channel = grpc.aio.insecure_channel(f'{self.host}:{self.port}')
         self.client = checkout_pb2_grpc.CheckoutServiceStub(self.channel)
 
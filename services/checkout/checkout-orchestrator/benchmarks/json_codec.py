@@ -0,0 +1,34 @@
+"""
+Encode/decode cost of the JSON backends on saga contexts of growing carts.
+
+    python -m benchmarks.json_codec [--items 1 10 50] [--number 2000]
+"""
+import argparse
+import timeit
+
+from benchmarks.payloads import saga_context
+from checkout_orchestrator.utils import json_codec
+
+
+def run(item_counts, number: int):
+    print(f"{'backend':<10}{'items':>7}{'bytes':>9}{'encode us':>12}{'decode us':>12}")
+    for item_count in item_counts:
+        payload = saga_context(item_count)
+        for backend in json_codec.available_backends():
+            codec = json_codec.make_codec(backend)
+            encoded = codec.dumps(payload)
+            encode = min(timeit.repeat(lambda: codec.dumps(payload), number=number, repeat=5)) / number
+            decode = min(timeit.repeat(lambda: codec.loads(encoded), number=number, repeat=5)) / number
+            print(f"{backend:<10}{item_count:>7}{len(encoded):>9}{encode * 1e6:>12.2f}{decode * 1e6:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.items, args.number)
+
+
+if __name__ == "__main__":
+    main()
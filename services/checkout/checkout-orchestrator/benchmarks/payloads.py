@@ -0,0 +1,38 @@
+import random
+import uuid
+from typing import Any, Dict
+
+
+def cart_details(item_count: int, seed: int = 0) -> Dict[str, Any]:
+    """A cart_details payload shaped like the ones the cart service sends with a checkout request."""
+    rng = random.Random(seed)
+    items = [
+        {
+            "product_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "sku": f"SKU-{rng.randrange(10**6):06d}",
+            "name": f"Product {index}",
+            "quantity": rng.randint(1, 5),
+            "unit_price_cents": rng.randint(199, 49999),
+            "currency": "EUR",
+            "attributes": {"size": rng.choice(["S", "M", "L"]), "color": rng.choice(["red", "blue", "black"])},
+        }
+        for index in range(item_count)
+    ]
+    return {
+        "items": items,
+        "total_price": sum(item["unit_price_cents"] * item["quantity"] for item in items),
+        "currency": "EUR",
+        "shipping_address": {"country": "DE", "postal_code": "10115", "city": "Berlin"},
+    }
+
+
+def saga_context(item_count: int, seed: int = 0) -> Dict[str, Any]:
+    """The saga_states.context written by start_checkout_saga for such a cart."""
+    rng = random.Random(seed)
+    return {
+        "cart_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "cart_details": cart_details(item_count, seed),
+        "current_step": "CHECKOUT_INITIATED",
+        "errors": [],
+    }
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ..schemas.admin import LoggingSettings, LoggingStatus
+from ...dependencies import require_admin_token
+import checkout_orchestrator.core.config as config
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+@router.get("/admin/logging", response_model=LoggingStatus)
+async def get_logging() -> dict:
+    return config.saga_log_policy.describe()
+
+@router.put("/admin/logging", response_model=LoggingStatus)
+async def update_logging(settings: LoggingSettings) -> dict:
+    if settings.sample_rates and any(not 0 <= rate <= 1 for rate in settings.sample_rates.values()):
+        raise HTTPException(status_code=400, detail="Sample rates must be between 0 and 1.")
+    try:
+        config.saga_log_policy.configure(**settings.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return config.saga_log_policy.describe()
+
+@router.put("/admin/logging/debug-sagas/{saga_id}", response_model=LoggingStatus)
+async def enable_saga_debug_logging(saga_id: str) -> dict:
+    # Every event of this saga is logged, with its untruncated payload
+    config.saga_log_policy.enable_debug(saga_id)
+    return config.saga_log_policy.describe()
+
+@router.delete("/admin/logging/debug-sagas/{saga_id}", response_model=LoggingStatus)
+async def disable_saga_debug_logging(saga_id: str) -> dict:
+    config.saga_log_policy.disable_debug(saga_id)
+    return config.saga_log_policy.describe()
@@ -1,27 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from ..schemas.checkout import CheckoutRequest, CheckoutResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pybreaker import CircuitBreakerError
+from ..schemas.checkout import CheckoutAccepted, CheckoutRequest, CheckoutStatus
+import checkout_orchestrator.core.config as config
+from ...core.admission import CheckoutRejected
+from ...core.idempotency import MAX_IDEMPOTENCY_KEY_LENGTH, IdempotencyKeyConflict
+from ...core.saga_events import SagaEventBus, status_event_stream
+from ...core.saga_status import SagaStatusCache
 from ...core.services.checkout_service import CheckoutService
-from ...dependencies import get_checkout_service
+from ...dependencies import get_checkout_service, get_saga_event_bus, get_saga_repository, get_saga_status_cache
+from ...infrastructure.repositories.saga_repository import SagaRepository
 from checkout_orchestrator.utils.uuid_utils import is_valid_uuid # Import the uuid validation utility
 
 router = APIRouter()
 
-@router.post("/checkout")
+@router.post("/checkout", status_code=202, response_model=CheckoutAccepted)
 async def checkout(
     request: CheckoutRequest,
-) -> dict:
+    response: Response,
+    checkout_service: CheckoutService = Depends(get_checkout_service),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> CheckoutAccepted:
     if not is_valid_uuid(request.user_id):
         raise HTTPException(status_code=400, detail="Invalid user_id format.")
     if not is_valid_uuid(request.cart_id):
         raise HTTPException(status_code=400, detail="Invalid cart_id format.")
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key header.")
 
+    # Returns once the saga row is stored and its first event is in the outbox, the spool or acknowledged
+    # by Kafka; the saga runs asynchronously
     try:
-        # Dummy response for testing
-        return {
-            "success": True,
-            "order_id": "dummy_saga_id",
-            "message": "Checkout function called (dependency removed for testing)"
-        }
+        saga_id = await checkout_service.start_checkout_saga(
+            request.cart_id, request.user_id, request.cart_details, idempotency_key=idempotency_key
+        )
+    except CheckoutRejected as e:
+        raise HTTPException(
+            status_code=429, detail="Too many checkouts, retry later.", headers={"Retry-After": e.retry_after_header}
+        )
+    except IdempotencyKeyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different checkout.")
+    except CircuitBreakerError:
+        raise HTTPException(status_code=503, detail="Checkout is temporarily unavailable.", headers={"Retry-After": "30"})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    status_url = f"/api/checkout/{saga_id}"
+    response.headers["Location"] = status_url
+    return CheckoutAccepted(saga_id=saga_id, status="CHECKOUT_INITIATED", status_url=status_url)
+
+@router.get("/checkout/{saga_id}", response_model=CheckoutStatus)
+async def checkout_status(
+    saga_id: str,
+    saga_repository: SagaRepository = Depends(get_saga_repository),
+    status_cache: SagaStatusCache = Depends(get_saga_status_cache),
+) -> CheckoutStatus:
+    if not is_valid_uuid(saga_id):
+        raise HTTPException(status_code=400, detail="Invalid saga_id format.")
+    status = await status_cache.get_or_load(saga_id, lambda: saga_repository.get(saga_id, include_archived=True))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Checkout not found.")
+    return status
+
+@router.get("/checkout/{saga_id}/events")
+async def checkout_status_events(
+    saga_id: str,
+    saga_repository: SagaRepository = Depends(get_saga_repository),
+    status_cache: SagaStatusCache = Depends(get_saga_status_cache),
+    event_bus: SagaEventBus = Depends(get_saga_event_bus),
+) -> StreamingResponse:
+    if not is_valid_uuid(saga_id):
+        raise HTTPException(status_code=400, detail="Invalid saga_id format.")
+
+    def reload():
+        return status_cache.get_or_load(saga_id, lambda: saga_repository.get(saga_id, include_archived=True))
+
+    # Subscribe before reading the current status, so no update can slip in between
+    subscription = event_bus.subscribe(saga_id)
+    try:
+        status = await reload()
+    except Exception:
+        subscription.close()
+        raise
+    if status is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Checkout not found.")
+    return StreamingResponse(
+        status_event_stream(
+            subscription,
+            status,
+            reload,
+            heartbeat_seconds=config.SAGA_EVENTS_HEARTBEAT_SECONDS,
+            max_stream_seconds=config.SAGA_EVENTS_MAX_STREAM_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,115 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import grpc
+from pybreaker import CircuitBreakerError
+
+from checkout_orchestrator import checkout_pb2, checkout_pb2_grpc
+from checkout_orchestrator.api.schemas.checkout import CheckoutStatus
+from checkout_orchestrator.core.admission import CheckoutRejected
+from checkout_orchestrator.core.idempotency import MAX_IDEMPOTENCY_KEY_LENGTH, IdempotencyKeyConflict
+from checkout_orchestrator.core.saga_status import SagaStatusCache
+from checkout_orchestrator.core.services.checkout_service import CheckoutService
+from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository
+from checkout_orchestrator.utils.uuid_utils import is_valid_uuid
+
+logger = logging.getLogger(__name__)
+
+# Saga states collapsed onto checkout.proto's CheckoutState; every other state is PROCESSING.
+# COMPENSATING means the checkout failed and its completed steps are being undone.
+_PROTO_STATES = {
+    "CHECKOUT_INITIATED": checkout_pb2.PENDING,
+    "COMPLETED": checkout_pb2.COMPLETED,
+    "FAILED": checkout_pb2.FAILED,
+    "COMPENSATING": checkout_pb2.FAILED,
+}
+
+
+def _status_response(status: CheckoutStatus) -> checkout_pb2.GetCheckoutStatusResponse:
+    if status.errors:
+        message = str(status.errors[-1].get("reason") or status.errors[-1])
+    elif status.order_id:
+        message = f"Order {status.order_id} created"
+    else:
+        message = status.current_step or status.status
+    return checkout_pb2.GetCheckoutStatusResponse(
+        checkout_id=status.saga_id,
+        state=_PROTO_STATES.get(status.status, checkout_pb2.PROCESSING),
+        message=message,
+    )
+
+
+class CheckoutServicer(checkout_pb2_grpc.CheckoutServiceServicer):
+    """
+    gRPC front of shared/proto/checkout.proto for service-to-service callers (agent-service). Runs next to
+    the FastAPI app on the same event loop and shares its CheckoutService and status cache, so both
+    protocols start identical sagas and read the same status snapshots.
+    """
+
+    def __init__(
+        self,
+        checkout_service: CheckoutService,
+        saga_repository: SagaRepository,
+        status_cache: SagaStatusCache,
+        cart_loader: Callable[[str], Awaitable[Tuple[str, Dict[str, Any]]]],
+    ):
+        self.checkout_service = checkout_service
+        self.saga_repository = saga_repository
+        self.status_cache = status_cache
+        # The request only names the user; the cart is read from the cart service
+        self.cart_loader = cart_loader
+
+    async def InitiateCheckout(self, request, context: grpc.aio.ServicerContext):
+        if not is_valid_uuid(request.user_id):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid user_id format.")
+        try:
+            cart_id, cart_details = await self.cart_loader(request.user_id)
+        except grpc.aio.AioRpcError as e:
+            logger.warning("Could not load the cart of user %s: %s", request.user_id, e.details())
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "Cart service is unavailable.")
+        if not cart_details.get("items"):
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "Cart is empty.")
+        # Same semantics as the HTTP Idempotency-Key header, passed as call metadata
+        idempotency_key = dict(context.invocation_metadata() or ()).get("idempotency-key")
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid idempotency-key metadata.")
+        try:
+            saga_id = await self.checkout_service.start_checkout_saga(
+                cart_id, request.user_id, cart_details, idempotency_key=idempotency_key
+            )
+        except CheckoutRejected as e:
+            # The gRPC counterpart of 429 + Retry-After
+            await context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                "Too many checkouts, retry later.",
+                trailing_metadata=(("retry-after", e.retry_after_header),),
+            )
+        except IdempotencyKeyConflict:
+            await context.abort(
+                grpc.StatusCode.ALREADY_EXISTS, "idempotency-key was already used for a different checkout."
+            )
+        except CircuitBreakerError:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "Checkout is temporarily unavailable.")
+        except Exception as e:
+            logger.exception("InitiateCheckout failed for user %s", request.user_id)
+            await context.abort(grpc.StatusCode.INTERNAL, str(e))
+        return checkout_pb2.InitiateCheckoutResponse(checkout_id=saga_id)
+
+    async def GetCheckoutStatus(self, request, context: grpc.aio.ServicerContext):
+        checkout_id = request.checkout_id
+        if not is_valid_uuid(checkout_id):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid checkout_id format.")
+        status = await self.status_cache.get_or_load(
+            checkout_id, lambda: self.saga_repository.get(checkout_id, include_archived=True)
+        )
+        if status is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Checkout not found.")
+        return _status_response(status)
+
+
+def create_grpc_server(servicer: CheckoutServicer, address: str) -> Tuple[grpc.aio.Server, int]:
+    """An unstarted grpc.aio server serving `servicer` on `address`, and the port it bound."""
+    server = grpc.aio.server()
+    checkout_pb2_grpc.add_CheckoutServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port(address)
+    return server, port
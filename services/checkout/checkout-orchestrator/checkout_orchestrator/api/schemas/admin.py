@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class LoggingSettings(BaseModel):
+    sample_rates: Optional[Dict[str, float]] = None
+    default_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    max_payload_chars: Optional[int] = Field(default=None, ge=0)
+    redact_keys: Optional[List[str]] = None
+
+class LoggingStatus(BaseModel):
+    sample_rates: Dict[str, float]
+    default_rate: float
+    max_payload_chars: int
+    redact_keys: List[str]
+    debug_saga_ids: List[str]
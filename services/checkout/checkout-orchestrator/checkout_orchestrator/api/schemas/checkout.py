@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
+import datetime
 
 class CheckoutRequest(BaseModel):
     cart_id: str
@@ -10,3 +11,17 @@ class CheckoutResponse(BaseModel):
     success: bool
     order_id: str | None = None
     message: str | None = None
+
+class CheckoutAccepted(BaseModel):
+    saga_id: str
+    status: str
+    status_url: str
+
+class CheckoutStatus(BaseModel):
+    saga_id: str
+    status: str
+    current_step: str | None = None
+    errors: List[Dict[str, Any]] = []
+    order_id: str | None = None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any, Dict, List
+from pydantic import BaseModel, PrivateAttr, field_validator
+from typing import Any, Dict, List, Optional, Tuple
 import datetime
 
 class SagaState(BaseModel):
@@ -8,4 +8,67 @@ class SagaState(BaseModel):
     context: Dict[str, Any]
     processed_event_ids: List[str] = [] # New field for idempotency
     created_at: datetime.datetime
-    updated_at: datetime.datetime
\ No newline at end of file
+    updated_at: datetime.datetime
+    # Commands produced by the current transition that still have to go to the outbox (not persisted on the row)
+    _pending_commands: List[Tuple[str, Dict[str, Any]]] = PrivateAttr(default_factory=list)
+    # Event ids handled since the last persist that still have to go to the processed_events table
+    _pending_event_ids: List[str] = PrivateAttr(default_factory=list)
+    # Top-level context values and event ids as stored in the database; None until read or written
+    _persisted_context: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _persisted_event_ids: Optional[List[str]] = PrivateAttr(default=None)
+    _persisted_state: Optional[str] = PrivateAttr(default=None)
+
+    @field_validator("created_at", "updated_at")
+    @classmethod
+    def _assume_utc(cls, value: datetime.datetime) -> datetime.datetime:
+        # SQLite hands timestamps back without their offset; everything is written in UTC
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value
+
+    def add_command(self, topic: str, payload: Dict[str, Any]):
+        self._pending_commands.append((topic, payload))
+
+    def pop_commands(self) -> List[Tuple[str, Dict[str, Any]]]:
+        commands, self._pending_commands = self._pending_commands, []
+        return commands
+
+    def mark_event_processed(self, event_id: str):
+        self._pending_event_ids.append(event_id)
+
+    def has_pending_event(self, event_id: str) -> bool:
+        return event_id in self._pending_event_ids
+
+    def pop_processed_event_ids(self) -> List[str]:
+        event_ids, self._pending_event_ids = self._pending_event_ids, []
+        return event_ids
+
+    def mark_persisted(self, context_snapshot: Dict[str, Any], partial: bool = False):
+        """
+        Records what the database now holds. `context_snapshot` must not share objects with `context`;
+        with `partial`, it only holds the top-level keys that were just written.
+        """
+        if partial and self._persisted_context is not None:
+            for key in [key for key in self._persisted_context if key not in self.context]:
+                del self._persisted_context[key]
+            self._persisted_context.update(context_snapshot)
+        else:
+            self._persisted_context = context_snapshot
+        self._persisted_event_ids = list(self.processed_event_ids)
+        self._persisted_state = self.state
+
+    @property
+    def persisted_state(self) -> Optional[str]:
+        return self._persisted_state
+
+    def context_changes(self) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """Top-level keys set or changed and keys removed since the last persist; None if never persisted."""
+        if self._persisted_context is None:
+            return None
+        persisted = self._persisted_context
+        changed = {key: value for key, value in self.context.items() if key not in persisted or persisted[key] != value}
+        removed = [key for key in persisted if key not in self.context]
+        return changed, removed
+
+    def processed_event_ids_changed(self) -> bool:
+        return self._persisted_event_ids is None or self._persisted_event_ids != self.processed_event_ids
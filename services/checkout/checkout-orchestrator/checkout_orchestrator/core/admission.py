@@ -0,0 +1,154 @@
+import collections
+import math
+import time
+from typing import Callable, Optional
+
+from databases import Database
+from pybreaker import CircuitBreaker, CircuitBreakerListener
+
+from checkout_orchestrator.core.metrics import CHECKOUT_ADMISSIONS
+
+
+class CheckoutRejected(Exception):
+    """Raised instead of starting a saga while the orchestrator sheds load; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Checkout rejected ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+
+    def take(self, now: float) -> float:
+        """Takes a token and returns 0, or returns how long until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+def db_pool_saturation(database: Database) -> float:
+    """Share of the connection pool in use; 0 for backends without a pool (SQLite)."""
+    # databases does not expose its pool; PostgresBackend keeps the asyncpg pool in _pool
+    pool = getattr(getattr(database, "_backend", None), "_pool", None)
+    if pool is None or not hasattr(pool, "get_max_size"):
+        return 0.0
+    return (pool.get_size() - pool.get_idle_size()) / max(pool.get_max_size(), 1)
+
+
+class _BreakerOpenedAt(CircuitBreakerListener):
+    def __init__(self, clock: Callable[[], float]):
+        self.clock = clock
+        self.opened_at: Optional[float] = None
+
+    def state_change(self, cb, old_state, new_state):
+        if new_state.name == "open":
+            self.opened_at = self.clock()
+
+
+class AdmissionController:
+    """
+    Decides, before a saga is created, whether the orchestrator takes on a new checkout. While consumer
+    lag, DB pool saturation or the Kafka breaker show it is past its limits every new checkout is shed;
+    otherwise each one takes a token from its user's bucket and from the global bucket. Rejections carry
+    a retry delay so clients back off instead of piling onto a system that would time them out anyway.
+    Signals are read on every call, so they must be cheap.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 500.0,
+        global_burst: float = 1000.0,
+        user_rate: float = 0.5,
+        user_burst: float = 5.0,
+        max_users: int = 100000,
+        max_consumer_lag: int = 5000,
+        max_db_pool_saturation: float = 0.9,
+        overload_retry_after_s: float = 5.0,
+        max_spool_backlog: int = 100000,
+        consumer_lag: Optional[Callable[[], int]] = None,
+        db_pool_saturation: Optional[Callable[[], float]] = None,
+        spool_backlog: Optional[Callable[[], int]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self.max_consumer_lag = max_consumer_lag
+        self.max_db_pool_saturation = max_db_pool_saturation
+        self.overload_retry_after_s = overload_retry_after_s
+        self.max_spool_backlog = max_spool_backlog
+        # Wired up once the consumer and the database exist; None means the signal is not watched
+        self.consumer_lag = consumer_lag
+        self.db_pool_saturation = db_pool_saturation
+        # With a checkout spool, an open breaker is absorbed by it and only a full spool sheds load
+        self.spool_backlog = spool_backlog
+        self.breaker = breaker
+        self.clock = clock
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        # user_id -> bucket, least recently used first; an evicted user simply starts with a full bucket
+        self._users: "collections.OrderedDict[str, TokenBucket]" = collections.OrderedDict()
+        self._breaker_opened_at = None
+        if breaker is not None:
+            self._breaker_opened_at = _BreakerOpenedAt(clock)
+            breaker.add_listener(self._breaker_opened_at)
+
+    def check(self, user_id: str):
+        """Admits one checkout of `user_id` or raises CheckoutRejected."""
+        now = self.clock()
+        overload = self._overload(now)
+        if overload is not None:
+            self._reject(*overload)
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = self._users[user_id] = TokenBucket(self.user_rate, self.user_burst, now)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        wait = bucket.take(now)
+        if wait > 0:
+            self._reject("user_rate", wait)
+        wait = self._global.take(now)
+        if wait > 0:
+            # The user did not get a checkout out of it
+            bucket.refund()
+            self._reject("global_rate", wait)
+        CHECKOUT_ADMISSIONS.labels("admitted").inc()
+
+    def _overload(self, now: float):
+        if self.breaker is not None and self.breaker.current_state == "open":
+            opened_at = self._breaker_opened_at.opened_at
+            if opened_at is None:
+                opened_at = self._breaker_opened_at.opened_at = now
+            remaining = self.breaker.reset_timeout - (now - opened_at)
+            # Past the reset timeout a call is needed to move the breaker to half-open, so let checkouts probe
+            if remaining > 0:
+                return "kafka_breaker", remaining
+        if self.consumer_lag is not None and self.consumer_lag() > self.max_consumer_lag:
+            return "consumer_lag", self.overload_retry_after_s
+        if self.db_pool_saturation is not None and self.db_pool_saturation() >= self.max_db_pool_saturation:
+            return "db_pool", self.overload_retry_after_s
+        if self.spool_backlog is not None and self.spool_backlog() >= self.max_spool_backlog:
+            return "spool", self.overload_retry_after_s
+        return None
+
+    def _reject(self, reason: str, retry_after: float):
+        CHECKOUT_ADMISSIONS.labels(reason).inc()
+        raise CheckoutRejected(reason, retry_after)
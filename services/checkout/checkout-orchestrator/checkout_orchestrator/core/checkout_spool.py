@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import aiosqlite
+from aiokafka import AIOKafkaProducer
+from pybreaker import CircuitBreaker, CircuitBreakerError
+
+from checkout_orchestrator.core.metrics import CHECKOUT_SPOOL_BACKLOG, CHECKOUT_SPOOL_DRAINED, CHECKOUT_SPOOLED
+from checkout_orchestrator.utils import json_codec
+from .producer import PipelinedProducer, kafka_breaker
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolFull(Exception):
+    """The spool holds `max_entries` events already."""
+
+
+class SpooledEvent(NamedTuple):
+    id: int
+    saga_id: str
+    topic: str
+    payload: Dict[str, Any]
+
+
+class CheckoutSpool:
+    """
+    Append-only local spool of saga-starting events that could not be published (broker down or
+    kafka_breaker open). It is a SQLite file of its own in WAL mode with synchronous=FULL, so an appended
+    event survives a process crash and does not depend on the saga database. Entries are deleted once
+    the SpoolDrainer has had them acknowledged by Kafka.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._db: Optional[aiosqlite.Connection] = None
+        self._backlog = 0
+        self._appended = asyncio.Event()
+
+    async def open(self):
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=FULL")
+        await self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                saga_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                spooled_at REAL NOT NULL
+            )
+            """
+        )
+        await self._db.commit()
+        async with self._db.execute("SELECT COUNT(*) FROM spool") as cursor:
+            (self._backlog,) = await cursor.fetchone()
+        # Left over by a previous run: the drainer picks them up first
+        CHECKOUT_SPOOL_BACKLOG.set(self._backlog)
+        if self._backlog:
+            self._appended.set()
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    @property
+    def backlog(self) -> int:
+        return self._backlog
+
+    async def append(self, saga_id: str, topic: str, payload: Dict[str, Any]):
+        if self._backlog >= self.max_entries:
+            raise SpoolFull(f"Checkout spool is full ({self._backlog} events)")
+        await self._db.execute(
+            "INSERT INTO spool (saga_id, topic, payload, spooled_at) VALUES (?, ?, ?, ?)",
+            (saga_id, topic, json_codec.dumps_str(payload), time.time()),
+        )
+        await self._db.commit()
+        self._backlog += 1
+        CHECKOUT_SPOOLED.inc()
+        CHECKOUT_SPOOL_BACKLOG.set(self._backlog)
+        self._appended.set()
+
+    async def peek(self, limit: int) -> List[SpooledEvent]:
+        """The oldest `limit` events, left in the spool."""
+        async with self._db.execute(
+            "SELECT id, saga_id, topic, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [SpooledEvent(row[0], row[1], row[2], json_codec.loads(row[3])) for row in rows]
+
+    async def delete(self, ids: List[int]):
+        if not ids:
+            return
+        await self._db.executemany("DELETE FROM spool WHERE id = ?", [(spool_id,) for spool_id in ids])
+        await self._db.commit()
+        self._backlog = max(self._backlog - len(ids), 0)
+        CHECKOUT_SPOOL_BACKLOG.set(self._backlog)
+
+    async def wait_for_entries(self, timeout: float):
+        """Returns once something was appended since the last call, or after `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self._appended.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._appended.clear()
+
+
+class SpoolDrainer:
+    """
+    Background task replaying the spool to Kafka, oldest first, one pipelined batch at a time. Sends go
+    through kafka_breaker: while it is open a batch fails right away and is retried after
+    `retry_interval_ms`, and once its reset timeout is over the next batch is the half-open probe.
+    Delivery is at-least-once (a crash between the acks and the delete re-sends the batch); consumers
+    dedupe by event_id.
+    """
+
+    def __init__(
+        self,
+        spool: CheckoutSpool,
+        producer: AIOKafkaProducer,
+        breaker: CircuitBreaker = kafka_breaker,
+        batch_size: int = 200,
+        retry_interval_ms: int = 1000,
+    ):
+        self.spool = spool
+        self.producer = PipelinedProducer(producer, breaker)
+        self.batch_size = batch_size
+        self.retry_interval_ms = retry_interval_ms
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="checkout-spool-drainer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                drained = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except CircuitBreakerError:
+                await asyncio.sleep(self.retry_interval_ms / 1000)
+                continue
+            except Exception as e:
+                logger.error("Checkout spool drain failed, retrying: %s", e)
+                await asyncio.sleep(self.retry_interval_ms / 1000)
+                continue
+            if drained < self.batch_size:
+                await self.spool.wait_for_entries(timeout=self.retry_interval_ms / 1000)
+
+    async def drain_once(self) -> int:
+        """Publishes the oldest batch of spooled events and returns how many were sent."""
+        events = await self.spool.peek(self.batch_size)
+        if not events:
+            return 0
+        async with self.producer.batch() as batch:
+            for event in events:
+                await batch.send(event.topic, json_codec.dumps(event.payload), key=event.saga_id.encode("utf-8"))
+        await self.spool.delete([event.id for event in events])
+        CHECKOUT_SPOOL_DRAINED.inc(len(events))
+        logger.info("Replayed %s spooled checkout events", len(events))
+        return len(events)
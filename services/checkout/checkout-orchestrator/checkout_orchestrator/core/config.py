@@ -4,6 +4,9 @@ from aiokafka import AIOKafkaProducer
 import httpx # Import httpx
 from prometheus_client import CollectorRegistry # Import CollectorRegistry
 from dotenv import load_dotenv # Import load_dotenv
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.log_sampling import SagaLogPolicy
+from checkout_orchestrator.utils import json_codec
 
 load_dotenv() # Load environment variables from .env file
 
@@ -16,13 +19,158 @@ else:
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:29092")
 
 MOCK_KAFKA = os.getenv("MOCK_KAFKA", "false").lower() == "true"
+# With MOCK_KAFKA: partitions per topic of the in-memory broker, whether fake inventory/payment/order/cart
+# services answer the saga commands, their reply latency and failure share per service ("payment=0.1,...").
+MOCK_KAFKA_PARTITIONS = int(os.getenv("MOCK_KAFKA_PARTITIONS", "3"))
+MOCK_KAFKA_RESPONDERS = os.getenv("MOCK_KAFKA_RESPONDERS", "true").lower() == "true"
+MOCK_KAFKA_RESPONDER_LATENCY_MS = float(os.getenv("MOCK_KAFKA_RESPONDER_LATENCY_MS", "0"))
+MOCK_KAFKA_FAILURE_RATES = {
+    service.strip(): float(rate)
+    for service, _, rate in (entry.partition("=") for entry in os.getenv("MOCK_KAFKA_FAILURE_RATES", "").split(",") if entry.strip())
+}
+
+# Producer batching: how long records may wait to be batched, the max batch size in bytes
+# and the compression codec (none, gzip, snappy, lz4 or zstd).
+KAFKA_PRODUCER_LINGER_MS = int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "5"))
+KAFKA_PRODUCER_MAX_BATCH_SIZE = int(os.getenv("KAFKA_PRODUCER_MAX_BATCH_SIZE", "65536"))
+KAFKA_PRODUCER_COMPRESSION = os.getenv("KAFKA_PRODUCER_COMPRESSION", "none").lower()
+
+# Consumer concurrency: number of per-saga worker lanes (0 keeps the sequential loop),
+# the queue depth of each lane and how often processed offsets are committed.
+CONSUMER_LANES = int(os.getenv("CONSUMER_LANES", "0"))
+CONSUMER_LANE_QUEUE_SIZE = int(os.getenv("CONSUMER_LANE_QUEUE_SIZE", "100"))
+CONSUMER_COMMIT_INTERVAL_MS = int(os.getenv("CONSUMER_COMMIT_INTERVAL_MS", "1000"))
+# Batch mode: records pulled per getmany() (0 disables batching) and how long to wait for them.
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "0"))
+CONSUMER_BATCH_TIMEOUT_MS = int(os.getenv("CONSUMER_BATCH_TIMEOUT_MS", "100"))
+
+# Latency budget of each discount/tax call made while moving a saga to payment.
+PRICING_QUOTE_TIMEOUT_MS = int(os.getenv("PRICING_QUOTE_TIMEOUT_MS", "2000"))
+# Discount/tax quote cache keyed by cart content: max entries (0 disables it) and time to live.
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "10000"))
+QUOTE_CACHE_TTL_SECONDS = float(os.getenv("QUOTE_CACHE_TTL_SECONDS", "60"))
+
+# Consumed event ids are kept in the processed_events table for this long (idempotency window).
+PROCESSED_EVENT_TTL_HOURS = int(os.getenv("PROCESSED_EVENT_TTL_HOURS", "168"))
+
+# In-process write-through cache of saga states (0 disables it).
+SAGA_CACHE_MAX_ENTRIES = int(os.getenv("SAGA_CACHE_MAX_ENTRIES", "10000"))
+
+# Status snapshots served by GET /api/checkout/{saga_id}: how many are kept, how long an in-progress one is
+# served before the database is read again, and how long a COMPLETED/FAILED one is kept.
+SAGA_STATUS_CACHE_MAX_ENTRIES = int(os.getenv("SAGA_STATUS_CACHE_MAX_ENTRIES", "10000"))
+SAGA_STATUS_CACHE_TTL_MS = int(os.getenv("SAGA_STATUS_CACHE_TTL_MS", "1000"))
+SAGA_STATUS_FINAL_TTL_SECONDS = float(os.getenv("SAGA_STATUS_FINAL_TTL_SECONDS", "3600"))
+
+# Status streams (GET /api/checkout/{saga_id}/events): updates buffered per slow listener, quiet time before
+# the status is re-read and a keepalive sent, and how long a stream stays open before the client reconnects.
+SAGA_EVENTS_QUEUE_SIZE = int(os.getenv("SAGA_EVENTS_QUEUE_SIZE", "16"))
+SAGA_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("SAGA_EVENTS_HEARTBEAT_SECONDS", "15"))
+SAGA_EVENTS_MAX_STREAM_SECONDS = float(os.getenv("SAGA_EVENTS_MAX_STREAM_SECONDS", "900"))
+
+# gRPC CheckoutService (shared/proto/checkout.proto) served next to the HTTP API, for agent-service.
+# InitiateCheckout only names the user, so the cart is read from cart-crud's CartService.
+GRPC_ENABLED = os.getenv("GRPC_ENABLED", "true").lower() == "true"
+GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+GRPC_SHUTDOWN_GRACE_SECONDS = float(os.getenv("GRPC_SHUTDOWN_GRACE_SECONDS", "5"))
+CART_SERVICE_GRPC_TARGET = os.getenv("CART_SERVICE_GRPC_TARGET", "localhost:3001")
+CART_SERVICE_TIMEOUT_SECONDS = float(os.getenv("CART_SERVICE_TIMEOUT_SECONDS", "2"))
+
+# Duplicate checkout submissions: how long an Idempotency-Key header is remembered, and how long a key
+# derived from (user, cart, cart content) is (only meant to absorb double clicks and client retries).
+CHECKOUT_IDEMPOTENCY_ENABLED = os.getenv("CHECKOUT_IDEMPOTENCY_ENABLED", "true").lower() == "true"
+CHECKOUT_IDEMPOTENCY_TTL_HOURS = float(os.getenv("CHECKOUT_IDEMPOTENCY_TTL_HOURS", "24"))
+CHECKOUT_DERIVED_IDEMPOTENCY_TTL_SECONDS = float(os.getenv("CHECKOUT_DERIVED_IDEMPOTENCY_TTL_SECONDS", "600"))
+
+# Admission control of new checkouts: global and per-user token buckets (checkouts per second, burst),
+# and the overload limits past which every new checkout is shed with 429 until they recover.
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "500"))
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "1000"))
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "0.5"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "5"))
+ADMISSION_MAX_TRACKED_USERS = int(os.getenv("ADMISSION_MAX_TRACKED_USERS", "100000"))
+ADMISSION_MAX_CONSUMER_LAG = int(os.getenv("ADMISSION_MAX_CONSUMER_LAG", "5000"))
+ADMISSION_MAX_DB_POOL_SATURATION = float(os.getenv("ADMISSION_MAX_DB_POOL_SATURATION", "0.9"))
+ADMISSION_OVERLOAD_RETRY_AFTER_SECONDS = float(os.getenv("ADMISSION_OVERLOAD_RETRY_AFTER_SECONDS", "5"))
+
+# Local spool for CheckoutInitiated events that cannot be published (Kafka down, breaker open); drained in
+# batches once Kafka is back. Off unless CHECKOUT_SPOOL_PATH names a file on a persistent volume (the image
+# declares /var/lib/checkout-orchestrator): spooled checkouts must survive a restart. Unused with USE_OUTBOX.
+CHECKOUT_SPOOL_PATH = os.getenv("CHECKOUT_SPOOL_PATH", "")
+CHECKOUT_SPOOL_ENABLED = bool(CHECKOUT_SPOOL_PATH)
+CHECKOUT_SPOOL_MAX_ENTRIES = int(os.getenv("CHECKOUT_SPOOL_MAX_ENTRIES", "100000"))
+CHECKOUT_SPOOL_DRAIN_BATCH_SIZE = int(os.getenv("CHECKOUT_SPOOL_DRAIN_BATCH_SIZE", "200"))
+CHECKOUT_SPOOL_RETRY_INTERVAL_MS = int(os.getenv("CHECKOUT_SPOOL_RETRY_INTERVAL_MS", "1000"))
+
+# Transactional outbox: saga commands are written with the saga update and published by a relay task.
+# It also lets POST /api/checkout answer 202 as soon as the saga row commits; without it the 202 waits for
+# the Kafka ack of CheckoutInitiated.
+USE_OUTBOX = os.getenv("USE_OUTBOX", "false").lower() == "true"
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "500"))
+OUTBOX_RELAY_POLL_INTERVAL_MS = int(os.getenv("OUTBOX_RELAY_POLL_INTERVAL_MS", "100"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+# Archival of COMPLETED/FAILED sagas: on/off, their age before they leave saga_states, sagas moved per
+# transaction, pause between batches, how often to run and the Postgres lock_timeout of one batch.
+SAGA_ARCHIVE_ENABLED = os.getenv("SAGA_ARCHIVE_ENABLED", "true").lower() == "true"
+SAGA_ARCHIVE_AFTER_HOURS = float(os.getenv("SAGA_ARCHIVE_AFTER_HOURS", "168"))
+SAGA_ARCHIVE_BATCH_SIZE = int(os.getenv("SAGA_ARCHIVE_BATCH_SIZE", "1000"))
+SAGA_ARCHIVE_BATCH_PAUSE_MS = int(os.getenv("SAGA_ARCHIVE_BATCH_PAUSE_MS", "50"))
+SAGA_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("SAGA_ARCHIVE_INTERVAL_SECONDS", "300"))
+SAGA_ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv("SAGA_ARCHIVE_LOCK_TIMEOUT_MS", "2000"))
+
+# Saga timeouts: on/off, per-state overrides of the defaults in kafka_consumer ("STATE=seconds,...", 0 disables
+# a state), how often the database is swept for timed out sagas and how many are compensated per transaction.
+SAGA_TIMEOUTS_ENABLED = os.getenv("SAGA_TIMEOUTS_ENABLED", "true").lower() == "true"
+SAGA_TIMEOUT_OVERRIDES = {
+    state.strip(): float(seconds)
+    for state, _, seconds in (entry.partition("=") for entry in os.getenv("SAGA_TIMEOUTS", "").split(",") if entry.strip())
+}
+SAGA_TIMEOUT_SWEEP_INTERVAL_SECONDS = float(os.getenv("SAGA_TIMEOUT_SWEEP_INTERVAL_SECONDS", "30"))
+SAGA_TIMEOUT_BATCH_SIZE = int(os.getenv("SAGA_TIMEOUT_BATCH_SIZE", "500"))
+
+# JSON backend for saga context, events and commands: auto (fastest installed), orjson, msgspec or stdlib.
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+json_codec.set_backend(JSON_CODEC)
+
+# Consumer logging: INFO sampling rate per event type ("EventType=rate,..."), rate of the other event types,
+# payload truncation and the payload keys replaced by "***". Adjustable at runtime via /api/admin/logging.
+SAGA_LOG_SAMPLE_RATES = {
+    event_type.strip(): float(rate)
+    for event_type, _, rate in (entry.partition("=") for entry in os.getenv("SAGA_LOG_SAMPLE_RATES", "").split(",") if entry.strip())
+}
+SAGA_LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("SAGA_LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+SAGA_LOG_MAX_PAYLOAD_CHARS = int(os.getenv("SAGA_LOG_MAX_PAYLOAD_CHARS", "512"))
+SAGA_LOG_REDACT_KEYS = [
+    key.strip()
+    for key in os.getenv("SAGA_LOG_REDACT_KEYS", "payment_details,card_number,cvv,shipping_address,email,phone").split(",")
+    if key.strip()
+]
+
+# Bearer token the /api/admin endpoints require ("Authorization: Bearer <token>"); unset disables them.
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
 
 database = Database(DATABASE_URL)
+kafka_broker: InMemoryBroker = None
 if MOCK_KAFKA:
-    print("Mocking Kafka producer.")
-    kafka_producer = None
+    print("Mocking Kafka with an in-memory broker.")
+    kafka_broker = InMemoryBroker(partitions=MOCK_KAFKA_PARTITIONS)
+    kafka_producer = kafka_broker.producer()
 else:
-    kafka_producer = AIOKafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS)
+    kafka_producer = AIOKafkaProducer(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        linger_ms=KAFKA_PRODUCER_LINGER_MS,
+        max_batch_size=KAFKA_PRODUCER_MAX_BATCH_SIZE,
+        compression_type=None if KAFKA_PRODUCER_COMPRESSION == "none" else KAFKA_PRODUCER_COMPRESSION,
+    )
+
+saga_log_policy = SagaLogPolicy(
+    sample_rates=SAGA_LOG_SAMPLE_RATES,
+    default_rate=SAGA_LOG_DEFAULT_SAMPLE_RATE,
+    max_payload_chars=SAGA_LOG_MAX_PAYLOAD_CHARS,
+    redact_keys=SAGA_LOG_REDACT_KEYS,
+)
 
 # Initialize httpx_client globally, but connect/close in app startup/shutdown events
 httpx_client: httpx.AsyncClient = None
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import random
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from checkout_orchestrator.utils import json_codec
+from .in_memory_kafka import InMemoryBroker
+
+logger = logging.getLogger(__name__)
+
+KAFKA_TOPIC_INVENTORY_COMMAND = "checkout.inventory-command"
+KAFKA_TOPIC_PAYMENT_COMMAND = "checkout.payment-command"
+KAFKA_TOPIC_ORDER_COMMAND = "checkout.order-command"
+KAFKA_TOPIC_CART_COMMAND = "checkout.cart-command"
+KAFKA_TOPIC_CHECKOUT_EVENTS = "checkout.checkout-events"
+
+# service -> (command topic, {command type: (success event, failure event)}).
+# Compensation commands are consumed without a reply: the orchestrator has no transition for one.
+FAKE_SERVICES = {
+    "inventory": (KAFKA_TOPIC_INVENTORY_COMMAND, {"ReserveInventory": ("InventoryReserved", "InventoryReservationFailed")}),
+    "payment": (KAFKA_TOPIC_PAYMENT_COMMAND, {"ProcessPayment": ("PaymentProcessed", "PaymentFailed")}),
+    "order": (KAFKA_TOPIC_ORDER_COMMAND, {"CreateOrder": ("OrderCreated", "OrderCreationFailed")}),
+    "cart": (KAFKA_TOPIC_CART_COMMAND, {"ClearCart": ("CartCleared", "CartClearanceFailed")}),
+}
+
+
+def _success_details(event_type: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if event_type == "InventoryReserved":
+        return {"reservation_details": {"reservation_id": str(uuid.uuid4()), "items": command.get("items", [])}}
+    if event_type == "PaymentProcessed":
+        return {"payment_details": {"payment_id": str(uuid.uuid4()), "amount": command.get("amount")}}
+    if event_type == "OrderCreated":
+        return {"order_details": {"order_id": str(uuid.uuid4())}}
+    return {}
+
+
+class FakeResponder:
+    """
+    Plays one downstream service against the in-memory broker: consumes its command topic in its own
+    consumer group and answers every command on the reply topic, after `latency_ms`, with the failure
+    event for a `failure_rate` share of the commands. Commands are answered concurrently.
+    """
+
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        service: str,
+        latency_ms: float = 0,
+        failure_rate: float = 0.0,
+        rng: Callable[[], float] = random.random,
+    ):
+        if service not in FAKE_SERVICES:
+            raise ValueError(f"Unknown fake service '{service}' (known: {', '.join(FAKE_SERVICES)})")
+        self.service = service
+        self.command_topic, self.replies = FAKE_SERVICES[service]
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.consumer = broker.consumer(
+            self.command_topic, group_id=f"fake-{service}-service", auto_offset_reset="earliest"
+        )
+        self.producer = broker.producer()
+        self._task: Optional[asyncio.Task] = None
+        self._replies: Set[asyncio.Task] = set()
+
+    async def start(self):
+        await self.consumer.start()
+        self._task = asyncio.create_task(self._run(), name=f"fake-{self.service}-service")
+
+    async def stop(self):
+        await self.consumer.stop()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._replies, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        async for msg in self.consumer:
+            try:
+                command = json_codec.loads(msg.value)
+            except ValueError as e:
+                logger.error("Fake %s service could not decode command at offset %s: %s", self.service, msg.offset, e)
+                continue
+            if not isinstance(command, dict) or command.get("type") not in self.replies:
+                continue
+            task = asyncio.create_task(self._reply(command))
+            self._replies.add(task)
+            task.add_done_callback(self._replies.discard)
+
+    async def _reply(self, command: Dict[str, Any]):
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000)
+        success, failure = self.replies[command["type"]]
+        event: Dict[str, Any] = {"type": success, "saga_id": command["saga_id"], "event_id": str(uuid.uuid4())}
+        if self.failure_rate > 0 and self.rng() < self.failure_rate:
+            event.update(type=failure, reason=f"Simulated {self.service} failure")
+        else:
+            event.update(_success_details(success, command))
+        topic = command.get("reply_to_topic") or KAFKA_TOPIC_CHECKOUT_EVENTS
+        await self.producer.send_and_wait(topic, json_codec.dumps(event), key=command["saga_id"].encode("utf-8"))
+
+
+async def start_fake_responders(
+    broker: InMemoryBroker,
+    latency_ms: float = 0,
+    failure_rates: Optional[Dict[str, float]] = None,
+) -> List[FakeResponder]:
+    """Starts a responder for every service in FAKE_SERVICES; stop them with FakeResponder.stop()."""
+    responders = []
+    for service in FAKE_SERVICES:
+        responder = FakeResponder(broker, service, latency_ms, (failure_rates or {}).get(service, 0.0))
+        await responder.start()
+        responders.append(responder)
+    return responders
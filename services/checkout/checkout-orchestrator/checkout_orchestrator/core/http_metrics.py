@@ -0,0 +1,29 @@
+import time
+
+import httpx
+
+from checkout_orchestrator.core.metrics import HTTP_CLIENT_ERRORS, HTTP_CLIENT_LATENCY
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps the transport of an httpx.AsyncClient and records latency and errors per upstream host."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = request.url.host
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception as e:
+            HTTP_CLIENT_ERRORS.labels(upstream, type(e).__name__).inc()
+            raise
+        finally:
+            HTTP_CLIENT_LATENCY.labels(upstream, request.method).observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            HTTP_CLIENT_ERRORS.labels(upstream, f"{response.status_code // 100}xx").inc()
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from checkout_orchestrator.utils import json_codec
+
+# Longest Idempotency-Key header accepted; keys are hashed before they are stored
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class IdempotencyKeyConflict(Exception):
+    """The Idempotency-Key was already used for a different checkout request."""
+
+    def __init__(self, saga_id: str):
+        super().__init__(f"Idempotency key already used for checkout {saga_id} with a different request")
+        self.saga_id = saga_id
+
+
+def checkout_request_hash(user_id: str, cart_id: str, cart_details: Dict[str, Any]) -> str:
+    """Fingerprint of a checkout submission: same user, same cart, same cart content."""
+    digest = hashlib.sha256()
+    for part in (user_id.encode("utf-8"), cart_id.encode("utf-8"), json_codec.dumps_sorted(cart_details)):
+        # Length-prefixed, so no two different requests concatenate to the same bytes
+        digest.update(len(part).to_bytes(4, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def checkout_idempotency_key(user_id: str, request_hash: str, idempotency_key: Optional[str] = None) -> str:
+    """Store key of a submission: the client's Idempotency-Key, or else the request fingerprint itself."""
+    if idempotency_key is None:
+        return f"cart:{request_hash}"
+    # Scoped to the user, so two clients that pick the same key never share a saga
+    return "key:" + hashlib.sha256(f"{user_id}\x00{idempotency_key}".encode("utf-8")).hexdigest()
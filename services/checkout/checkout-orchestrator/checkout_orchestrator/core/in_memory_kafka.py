@@ -0,0 +1,329 @@
+import asyncio
+import inspect
+import itertools
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from aiokafka import ConsumerRebalanceListener, TopicPartition
+from aiokafka.structs import ConsumerRecord, RecordMetadata
+
+# In-process stand-in for the Kafka cluster, used when MOCK_KAFKA is set. It implements the parts of
+# AIOKafkaProducer and AIOKafkaConsumer the orchestrator relies on: keyed partitioning, consumer groups
+# with committed offsets and rebalance callbacks, getone/getmany, seek, highwater and manual commits.
+# Records live in memory only and are never deleted.
+
+
+class InMemoryBroker:
+    def __init__(self, partitions: int = 3):
+        if partitions < 1:
+            raise ValueError("partitions must be >= 1")
+        self.default_partitions = partitions
+        self._logs: Dict[str, List[List[ConsumerRecord]]] = {}
+        self._groups: Dict[str, "_ConsumerGroup"] = {}
+        self._consumers: Set["InMemoryConsumer"] = set()
+        self._round_robin = itertools.count()
+
+    def create_topic(self, topic: str, partitions: Optional[int] = None):
+        """Creates the topic if it does not exist yet; topics are also created on first use."""
+        if topic not in self._logs:
+            self._logs[topic] = [[] for _ in range(partitions or self.default_partitions)]
+
+    def topics(self) -> List[str]:
+        return sorted(self._logs)
+
+    def partitions_for(self, topic: str) -> Set[int]:
+        self.create_topic(topic)
+        return set(range(len(self._logs[topic])))
+
+    def records(self, topic: str) -> List[ConsumerRecord]:
+        """Every record of the topic, partition by partition (for tests and debugging)."""
+        return [record for log in self._logs.get(topic, ()) for record in log]
+
+    def end_offset(self, tp: TopicPartition) -> int:
+        self.create_topic(tp.topic)
+        return len(self._logs[tp.topic][tp.partition])
+
+    def _partition(self, topic: str, key: Optional[bytes]) -> int:
+        count = len(self._logs[topic])
+        if key is None:
+            return next(self._round_robin) % count
+        # Stable across runs, so a saga's records always land in the same partition
+        return zlib.crc32(key) % count
+
+    def append(
+        self,
+        topic: str,
+        value: Optional[bytes],
+        key: Optional[bytes] = None,
+        partition: Optional[int] = None,
+        timestamp_ms: Optional[int] = None,
+        headers: Optional[Sequence[Tuple[str, bytes]]] = None,
+    ) -> RecordMetadata:
+        self.create_topic(topic)
+        if partition is None:
+            partition = self._partition(topic, key)
+        log = self._logs[topic][partition]
+        timestamp = timestamp_ms if timestamp_ms is not None else int(time.time() * 1000)
+        log.append(
+            ConsumerRecord(
+                topic=topic,
+                partition=partition,
+                offset=len(log),
+                timestamp=timestamp,
+                timestamp_type=0,
+                key=key,
+                value=value,
+                checksum=None,
+                serialized_key_size=len(key) if key is not None else -1,
+                serialized_value_size=len(value) if value is not None else -1,
+                headers=tuple(headers or ()),
+            )
+        )
+        tp = TopicPartition(topic, partition)
+        for consumer in self._consumers:
+            consumer._notify(tp)
+        return RecordMetadata(topic, partition, tp, len(log) - 1, timestamp, 0, 0)
+
+    def read(self, tp: TopicPartition, offset: int, max_records: int) -> List[ConsumerRecord]:
+        return self._logs[tp.topic][tp.partition][offset:offset + max_records]
+
+    def producer(self, **kwargs) -> "InMemoryProducer":
+        return InMemoryProducer(self, **kwargs)
+
+    def consumer(self, *topics: str, **kwargs) -> "InMemoryConsumer":
+        """Same arguments as AIOKafkaConsumer; connection settings such as bootstrap_servers are ignored."""
+        return InMemoryConsumer(self, *topics, **kwargs)
+
+    def committed(self, group_id: str, tp: TopicPartition) -> Optional[int]:
+        group = self._groups.get(group_id)
+        return group.committed.get(tp) if group is not None else None
+
+    def _group(self, group_id: str) -> "_ConsumerGroup":
+        if group_id not in self._groups:
+            self._groups[group_id] = _ConsumerGroup()
+        return self._groups[group_id]
+
+    async def _join(self, consumer: "InMemoryConsumer"):
+        self._consumers.add(consumer)
+        if consumer.group_id is None:
+            await consumer._reassign({TopicPartition(t, p) for t in consumer.topics for p in self.partitions_for(t)})
+            return
+        group = self._group(consumer.group_id)
+        group.members.append(consumer)
+        await self._rebalance(group)
+
+    async def _leave(self, consumer: "InMemoryConsumer"):
+        self._consumers.discard(consumer)
+        if consumer.group_id is not None:
+            group = self._group(consumer.group_id)
+            if consumer in group.members:
+                group.members.remove(consumer)
+                await self._rebalance(group)
+
+    async def _rebalance(self, group: "_ConsumerGroup"):
+        # Round-robin assignment of every subscribed partition over the members subscribed to its topic
+        assignments: Dict[InMemoryConsumer, Set[TopicPartition]] = {member: set() for member in group.members}
+        topics = sorted({topic for member in group.members for topic in member.topics})
+        for topic in topics:
+            members = [member for member in group.members if topic in member.topics]
+            for partition in sorted(self.partitions_for(topic)):
+                assignments[members[partition % len(members)]].add(TopicPartition(topic, partition))
+        # Everybody gives up what moves away before anybody starts on what it gained
+        for member, assigned in assignments.items():
+            await member._revoke(member.assignment() - assigned)
+        for member, assigned in assignments.items():
+            await member._reassign(assigned)
+
+
+class _ConsumerGroup:
+    def __init__(self):
+        self.members: List["InMemoryConsumer"] = []
+        self.committed: Dict[TopicPartition, int] = {}
+
+
+class InMemoryProducer:
+    """AIOKafkaProducer look-alike: every send is acknowledged as soon as it is appended."""
+
+    def __init__(self, broker: InMemoryBroker, **kwargs):
+        self.broker = broker
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def send(
+        self,
+        topic: str,
+        value: Optional[bytes] = None,
+        key: Optional[bytes] = None,
+        partition: Optional[int] = None,
+        timestamp_ms: Optional[int] = None,
+        headers: Optional[Sequence[Tuple[str, bytes]]] = None,
+    ) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(self.broker.append(topic, value, key, partition, timestamp_ms, headers))
+        return future
+
+    async def send_and_wait(self, topic: str, value: Optional[bytes] = None, key: Optional[bytes] = None, **kwargs):
+        return await (await self.send(topic, value, key=key, **kwargs))
+
+
+class InMemoryConsumer:
+    """AIOKafkaConsumer look-alike reading from an InMemoryBroker."""
+
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        *topics: str,
+        group_id: Optional[str] = None,
+        auto_offset_reset: str = "latest",
+        enable_auto_commit: bool = True,
+        **kwargs,
+    ):
+        self.broker = broker
+        self.group_id = group_id
+        self.auto_offset_reset = auto_offset_reset
+        self.enable_auto_commit = enable_auto_commit
+        self.topics: Set[str] = set(topics)
+        self.listener: Optional[ConsumerRebalanceListener] = None
+        self._positions: Dict[TopicPartition, int] = {}
+        self._wakeup = asyncio.Event()
+        self._next_partition = 0
+        self._running = False
+
+    def subscribe(self, topics: Iterable[str], listener: Optional[ConsumerRebalanceListener] = None):
+        self.topics = set(topics)
+        self.listener = listener
+
+    async def start(self):
+        for topic in self.topics:
+            self.broker.create_topic(topic)
+        self._running = True
+        await self.broker._join(self)
+
+    async def stop(self):
+        if not self._running:
+            return
+        if self.enable_auto_commit:
+            await self.commit()
+        self._running = False
+        self._wakeup.set()
+        await self.broker._leave(self)
+
+    def assignment(self) -> Set[TopicPartition]:
+        return set(self._positions)
+
+    def highwater(self, tp: TopicPartition) -> Optional[int]:
+        return self.broker.end_offset(tp) if tp in self._positions else None
+
+    async def position(self, tp: TopicPartition) -> int:
+        return self._positions[tp]
+
+    def seek(self, tp: TopicPartition, offset: int):
+        if tp not in self._positions:
+            raise ValueError(f"{tp} is not assigned to this consumer")
+        self._positions[tp] = offset
+        self._wakeup.set()
+
+    async def committed(self, tp: TopicPartition) -> Optional[int]:
+        return self.broker.committed(self.group_id, tp) if self.group_id is not None else None
+
+    async def commit(self, offsets: Optional[Dict[TopicPartition, int]] = None):
+        if self.group_id is None:
+            return
+        if offsets is None:
+            offsets = dict(self._positions)
+        self.broker._group(self.group_id).committed.update(offsets)
+
+    async def getmany(
+        self, *partitions: TopicPartition, timeout_ms: int = 0, max_records: Optional[int] = None
+    ) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            records = await self._fetch(set(partitions) or None, max_records or 500)
+            remaining = deadline - time.monotonic()
+            if records or remaining <= 0 or not self._running:
+                return records
+            await self._wait(remaining)
+
+    async def getone(self, *partitions: TopicPartition) -> ConsumerRecord:
+        while self._running:
+            records = await self._fetch(set(partitions) or None, 1)
+            if records:
+                return next(iter(records.values()))[0]
+            await self._wait(None)
+        raise StopAsyncIteration
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ConsumerRecord:
+        # Ends the iteration once the consumer is stopped, like aiokafka does
+        return await self.getone()
+
+    async def _fetch(self, partitions: Optional[Set[TopicPartition]], max_records: int):
+        if self.enable_auto_commit:
+            # Everything handed out before this call counts as consumed
+            await self.commit()
+        # Partitions take turns being first, so a busy partition cannot starve the others
+        assigned = sorted(self._positions)
+        if not assigned:
+            return {}
+        start = self._next_partition % len(assigned)
+        self._next_partition += 1
+        records = {}
+        for tp in assigned[start:] + assigned[:start]:
+            if partitions is not None and tp not in partitions:
+                continue
+            batch = self.broker.read(tp, self._positions[tp], max_records)
+            if batch:
+                records[tp] = batch
+                self._positions[tp] += len(batch)
+                max_records -= len(batch)
+                if max_records <= 0:
+                    break
+        return records
+
+    async def _wait(self, timeout: Optional[float]):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self, tp: TopicPartition):
+        if tp in self._positions:
+            self._wakeup.set()
+
+    async def _revoke(self, revoked: Set[TopicPartition]):
+        if not revoked:
+            return
+        if self.enable_auto_commit:
+            await self.commit({tp: self._positions[tp] for tp in revoked})
+        if self.listener is not None:
+            await _maybe_await(self.listener.on_partitions_revoked(revoked))
+        for tp in revoked:
+            self._positions.pop(tp, None)
+
+    async def _reassign(self, assigned: Set[TopicPartition]):
+        added = assigned - set(self._positions)
+        for tp in added:
+            committed = await self.committed(tp)
+            if committed is None:
+                committed = 0 if self.auto_offset_reset == "earliest" else self.broker.end_offset(tp)
+            self._positions[tp] = committed
+        if added:
+            self._wakeup.set()
+        if self.listener is not None:
+            await _maybe_await(self.listener.on_partitions_assigned(set(self._positions)))
+
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
@@ -1,20 +1,42 @@
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, ConsumerRebalanceListener, TopicPartition
 from databases import Database
 from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+from checkout_orchestrator.infrastructure.repositories.processed_event_repository import ProcessedEventRepository
 from checkout_orchestrator.api.schemas.saga import SagaState
 import asyncio
-import json
 import logging
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, Optional, Set, Tuple
 import uuid
 import httpx
 import os
+import time
 from ..utils.uuid_utils import is_valid_uuid # Import the uuid validation utility
+from ..utils import json_codec
 import datetime # Import datetime for timezone-aware timestamps
+from .lanes import SagaLanePool
+from .log_sampling import SagaLogPolicy, SampledLogFilter
+from .metrics import (
+    CONSUMER_LAG,
+    CONSUMER_RECORDS,
+    SAGA_DURATION,
+    SAGA_EVENTS_REJECTED,
+    SAGA_TRANSITION_FAILURES,
+    SAGA_TRANSITION_LATENCY,
+    SAGA_UPDATE_CONFLICTS,
+)
+from .producer import PipelinedProducer
+from .quote_cache import QuoteCache, cart_quote_key
+from .saga_cache import SagaStateCache
+from .saga_events import SagaEventBus
+from .saga_status import SagaStatusCache
+from .timer_wheel import TimerWheel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+# INFO records of events that were not sampled are dropped, see SagaLogPolicy
+logger.addFilter(SampledLogFilter())
 
 # Define Kafka Topics (same as in CheckoutService for consistency)
 KAFKA_TOPIC_CHECKOUT_INITIATED = "checkout.checkout-initiated"
@@ -24,6 +46,8 @@ KAFKA_TOPIC_ORDER_COMMAND = "checkout.order-command"
 KAFKA_TOPIC_CART_COMMAND = "checkout.cart-command"
 KAFKA_TOPIC_CHECKOUT_EVENTS = "checkout.checkout-events" # For events like InventoryReserved, PaymentProcessed, OrderCreated etc.
 
+_JSON_HEADERS = {"content-type": "application/json"}
+
 # Saga States
 SAGA_STATE_INITIATED = "CHECKOUT_INITIATED"
 SAGA_STATE_INVENTORY_RESERVATION_PENDING = "INVENTORY_RESERVATION_PENDING"
@@ -37,6 +61,39 @@ SAGA_STATE_COMPLETED = "COMPLETED"
 SAGA_STATE_FAILED = "FAILED"
 SAGA_STATE_COMPENSATING = "COMPENSATING"
 
+# (current state, event type) -> name of the KafkaConsumerManager handler that performs the transition.
+# Any other combination is rejected as out of order (or unknown) and leaves the saga state as it is.
+SAGA_TRANSITIONS = {
+    (SAGA_STATE_INITIATED, "CheckoutInitiated"): "handle_checkout_initiated",
+    (SAGA_STATE_INVENTORY_RESERVATION_PENDING, "InventoryReserved"): "handle_inventory_reserved",
+    (SAGA_STATE_INVENTORY_RESERVATION_PENDING, "InventoryReservationFailed"): "handle_inventory_reservation_failed",
+    (SAGA_STATE_PAYMENT_PROCESSING_PENDING, "PaymentProcessed"): "handle_payment_processed",
+    (SAGA_STATE_PAYMENT_PROCESSING_PENDING, "PaymentFailed"): "handle_payment_failed",
+    (SAGA_STATE_ORDER_CREATION_PENDING, "OrderCreated"): "handle_order_created",
+    (SAGA_STATE_ORDER_CREATION_PENDING, "OrderCreationFailed"): "handle_order_creation_failed",
+    (SAGA_STATE_CART_CLEARANCE_PENDING, "CartCleared"): "handle_cart_cleared",
+    (SAGA_STATE_CART_CLEARANCE_PENDING, "CartClearanceFailed"): "handle_cart_clearance_failed",
+}
+_TRANSITION_EVENT_TYPES = frozenset(event_type for _, event_type in SAGA_TRANSITIONS)
+
+# States a saga ends up in, as reported by the saga duration histogram
+_SAGA_OUTCOMES = {
+    SAGA_STATE_COMPLETED: "completed",
+    SAGA_STATE_FAILED: "failed",
+    SAGA_STATE_COMPENSATING: "compensating",
+}
+
+TransitionHandler = Callable[[SagaState, Dict[str, Any]], Awaitable[None]]
+
+# Seconds a saga may wait for a reply in each state before it is timed out and compensated
+DEFAULT_SAGA_TIMEOUTS = {
+    SAGA_STATE_INITIATED: 600,
+    SAGA_STATE_INVENTORY_RESERVATION_PENDING: 120,
+    SAGA_STATE_PAYMENT_PROCESSING_PENDING: 300,
+    SAGA_STATE_ORDER_CREATION_PENDING: 120,
+    SAGA_STATE_CART_CLEARANCE_PENDING: 300,
+}
+
 # Base url for services
 DISCOUNT_ENGINE_BASE_URL = os.getenv("DISCOUNT_ENGINE_SERVICE_URL")
 
@@ -52,6 +109,19 @@ TAX_SERVICE_URL = os.getenv("TAX_CALCULATION_SERVICE_URL")
 if not TAX_SERVICE_URL:
     raise RuntimeError("TAX_CALCULATION_SERVICE_URL not set")
 
+TAX_ENDPOINT = TAX_SERVICE_URL.rstrip("/") + "/api/tax/calculate"
+
+class _SagaRebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, manager: "KafkaConsumerManager"):
+        self.manager = manager
+
+    async def on_partitions_revoked(self, revoked):
+        await self.manager.on_partitions_revoked(revoked)
+
+    async def on_partitions_assigned(self, assigned):
+        pass
+
+
 class KafkaConsumerManager:
     def __init__(
         self,
@@ -60,111 +130,570 @@ class KafkaConsumerManager:
         saga_repository: SagaRepository,
         producer: AIOKafkaProducer,
         httpx_client: httpx.AsyncClient,
+        lanes: int = 0,
+        lane_queue_size: int = 100,
+        commit_interval_ms: int = 1000,
+        batch_size: int = 0,
+        batch_timeout_ms: int = 100,
+        outbox_repository: OutboxRepository = None,
+        quote_timeout_ms: int = 2000,
+        quote_cache: QuoteCache = None,
+        processed_event_repository: ProcessedEventRepository = None,
+        processed_event_ttl: datetime.timedelta = datetime.timedelta(days=7),
+        saga_cache: SagaStateCache = None,
+        saga_timeouts: Dict[str, float] = None,
+        timeout_sweep_interval_s: float = 30.0,
+        timeout_batch_size: int = 500,
+        log_policy: SagaLogPolicy = None,
+        consumer_factory: Callable[..., AIOKafkaConsumer] = AIOKafkaConsumer,
+        status_cache: SagaStatusCache = None,
+        event_bus: SagaEventBus = None,
     ):
-        self.consumer = AIOKafkaConsumer(
-            KAFKA_TOPIC_CHECKOUT_INITIATED,
-            KAFKA_TOPIC_CHECKOUT_EVENTS, # Consumer needs to listen to events from other services
+        # lanes == 0 and batch_size == 0 keep the original one-record-at-a-time loop with auto commit.
+        # With lanes, offsets are committed manually once every earlier record of the partition is done;
+        # in batch mode they are committed after the whole batch has been persisted.
+        self.lanes = lanes
+        self.lane_queue_size = lane_queue_size
+        self.commit_interval_ms = commit_interval_ms
+        self.batch_size = batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+        # Cleared while a batch is being applied and committed; revocation waits for it
+        self._batch_idle = asyncio.Event()
+        self._batch_idle.set()
+        # InMemoryBroker.consumer when Kafka is mocked
+        self.consumer = consumer_factory(
             bootstrap_servers=bootstrap_servers,
             group_id="checkout-orchestrator-group",
-            auto_offset_reset="earliest"
+            auto_offset_reset="earliest",
+            enable_auto_commit=lanes <= 0 and batch_size <= 0,
+        )
+        self.consumer.subscribe(
+            [
+                KAFKA_TOPIC_CHECKOUT_INITIATED,
+                KAFKA_TOPIC_CHECKOUT_EVENTS, # Consumer needs to listen to events from other services
+            ],
+            listener=_SagaRebalanceListener(self),
         )
         self.database = database
         self.saga_repository = saga_repository
-        self.producer = producer
+        # Commands of one event (or one batch) are sent together and their acks awaited once
+        self.producer = PipelinedProducer(producer)
         self.running = False
         self.httpx_client = httpx_client
+        self.lane_pool: SagaLanePool = None
+        # With an outbox, commands are stored with the saga update and published by the OutboxRelay
+        self.outbox_repository = outbox_repository
+        # Latency budget of each pricing call (discount, tax) made while handling InventoryReserved
+        self.quote_timeout_ms = quote_timeout_ms
+        # Optional: identical carts (retries, re-submits) reuse a recent quote instead of calling upstream again
+        self.quote_cache = quote_cache
+        # Without it, processed event ids are kept in the saga's own processed_event_ids JSON list
+        self.processed_event_repository = processed_event_repository
+        self.processed_event_ttl = processed_event_ttl
+        # Saves the SELECT for sagas this instance just wrote; cleared when partitions are revoked
+        self.saga_cache = saga_cache
+        # Status snapshots served by GET /api/checkout/{saga_id}, refreshed after every commit
+        self.status_cache = status_cache
+        # Pushes committed saga updates to the status streams (GET /api/checkout/{saga_id}/events)
+        self.event_bus = event_bus
+        # state -> seconds; None disables timeouts. Sagas written by this instance are tracked in the
+        # timer wheel, everything else (restarts, other replicas) is found by the periodic indexed sweep.
+        self.saga_timeouts = {state: seconds for state, seconds in (saga_timeouts or {}).items() if seconds > 0}
+        self.timeout_sweep_interval_s = timeout_sweep_interval_s
+        self.timeout_batch_size = timeout_batch_size
+        self.timer_wheel = TimerWheel(tick_seconds=1.0)
+        # Sampling, truncation and redaction of the per-event logs; logs everything by default
+        self.log_policy = log_policy or SagaLogPolicy()
+        # Lag of the assigned partitions as of the last record consumed from each; read by admission control
+        self._partition_lag: Dict[TopicPartition, int] = {}
+        self.transitions = self._compile_transitions()
+
+    def _compile_transitions(self) -> Dict[Tuple[str, str], TransitionHandler]:
+        # Resolved once, so dispatching an event is a single dict lookup; a typo in the table fails at startup
+        transitions = {}
+        for key, handler_name in SAGA_TRANSITIONS.items():
+            handler = getattr(self, handler_name, None)
+            if handler is None:
+                raise ValueError(f"Saga transition {key} refers to unknown handler '{handler_name}'")
+            transitions[key] = handler
+        return transitions
 
     async def start_consumer(self):
         logger.info("Starting Kafka consumer...")
         await self.consumer.start()
         self.running = True
+        background_tasks = []
+        if self.processed_event_repository is not None:
+            background_tasks.append(asyncio.create_task(self._prune_processed_events_periodically()))
+        if self.saga_timeouts:
+            background_tasks.append(asyncio.create_task(self._expire_timed_out_sagas_periodically()))
         try:
-            # Consume messages
-            async for msg in self.consumer:
-                logger.info(f"Consumed message: topic={msg.topic}, partition={msg.partition}, offset={msg.offset}, key={msg.key}, value={msg.value.decode('utf-8')}")
-                await self.process_message(msg)
+            if self.batch_size > 0:
+                await self._consume_batches()
+            elif self.lanes > 0:
+                await self._consume_with_lanes()
+            else:
+                # Consume messages
+                async for msg in self.consumer:
+                    self._track_consumed(msg.topic, msg.partition, msg.offset)
+                    await self.process_message(msg)
         except asyncio.CancelledError:
             logger.info("Kafka consumer task cancelled.")
         finally:
+            for task in background_tasks:
+                task.cancel()
+            if self.lane_pool is not None:
+                await self.lane_pool.stop()
+                try:
+                    await self.commit_processed_offsets()
+                except Exception as e:
+                    logger.error("Failed to commit consumer offsets on shutdown: %s", e)
+                self.lane_pool = None
             await self.consumer.stop()
             self.running = False
             logger.info("Kafka consumer stopped.")
 
     async def stop_consumer(self):
         if self.running:
+            if self.lane_pool is not None:
+                await self.lane_pool.drain()
+                await self.commit_processed_offsets()
             await self.consumer.stop()
             self.running = False
 
-    async def process_message(self, msg):
+    async def _consume_with_lanes(self):
+        logger.info("Consuming with %s saga lanes (queue size %s)", self.lanes, self.lane_queue_size)
+        self.lane_pool = SagaLanePool(self._process_event, self.lanes, self.lane_queue_size)
+        self.lane_pool.start()
+        commit_task = asyncio.create_task(self._commit_periodically())
         try:
-            event_data = json.loads(msg.value.decode('utf-8'))
-            saga_id = event_data.get("saga_id")
-            event_type = event_data.get("type", "UNKNOWN_EVENT")
-            event_id = event_data.get("event_id", f"{msg.topic}-{msg.partition}-{msg.offset}") # Use event_id from payload or Kafka offset
+            async for msg in self.consumer:
+                self._track_consumed(msg.topic, msg.partition, msg.offset)
+                event_data = self._decode(msg)
+                if event_data is None:
+                    # Nothing to process, but the committed offset still has to move past it
+                    self.lane_pool.skip(msg)
+                    continue
+                # submit() blocks while the saga's lane is full, which throttles fetching
+                await self.lane_pool.submit(event_data.get("saga_id"), msg, event_data)
+        finally:
+            commit_task.cancel()
+            await asyncio.gather(commit_task, return_exceptions=True)
+
+    async def _consume_batches(self):
+        logger.info("Consuming in batches of up to %s records", self.batch_size)
+        while True:
+            records = await self.consumer.getmany(timeout_ms=self.batch_timeout_ms, max_records=self.batch_size)
+            if not records:
+                continue
+            for tp, msgs in records.items():
+                self._track_consumed(tp.topic, tp.partition, msgs[-1].offset, len(msgs))
+            self._batch_idle.clear()
+            try:
+                await self._apply_batch(records)
+            finally:
+                self._batch_idle.set()
+
+    async def _apply_batch(self, records):
+        try:
+            await self.process_batch(records)
+        except Exception as e:
+            # Nothing of this batch was persisted: rewind so it is fetched again
+            logger.error("Failed to process batch of %s records: %s", sum(len(m) for m in records.values()), e, exc_info=True)
+            for tp, msgs in records.items():
+                try:
+                    self.consumer.seek(tp, msgs[0].offset)
+                except Exception as seek_error:
+                    # Revoked meanwhile: the next owner starts from the last committed offset anyway
+                    logger.warning("Could not rewind %s to offset %s: %s", tp, msgs[0].offset, seek_error)
+            return
+        # A rebalance may have taken partitions away while the batch was applied; theirs are not ours to commit
+        assignment = self.consumer.assignment()
+        offsets = {tp: msgs[-1].offset + 1 for tp, msgs in records.items() if tp in assignment}
+        if not offsets:
+            return
+        try:
+            await self.consumer.commit(offsets)
+        except Exception as e:
+            # Already persisted; whoever consumes these partitions next gets the records again and skips them
+            logger.error("Failed to commit consumer offsets %s: %s", offsets, e)
+
+    def _track_consumed(self, topic: str, partition: int, last_offset: int, count: int = 1):
+        CONSUMER_RECORDS.labels(topic).inc(count)
+        tp = TopicPartition(topic, partition)
+        if tp not in self.consumer.assignment():
+            return
+        highwater = self.consumer.highwater(tp)
+        if highwater is not None:
+            lag = max(highwater - last_offset - 1, 0)
+            self._partition_lag[tp] = lag
+            CONSUMER_LAG.labels(topic, str(partition)).set(lag)
+
+    def consumer_lag(self) -> int:
+        """Records behind the end of the assigned partitions, summed."""
+        return sum(self._partition_lag.values())
+
+    async def _prune_processed_events_periodically(self):
+        while True:
+            try:
+                cutoff = datetime.datetime.now(datetime.timezone.utc) - self.processed_event_ttl
+                await self.processed_event_repository.prune_before(cutoff)
+            except Exception as e:
+                logger.error("Failed to prune processed events: %s", e)
+            await asyncio.sleep(3600)
+
+    async def _expire_timed_out_sagas_periodically(self):
+        last_sweep = None
+        while True:
+            try:
+                due = self.timer_wheel.advance(time.time())
+                for start in range(0, len(due), self.timeout_batch_size):
+                    await self.expire_timed_out_sagas(due[start:start + self.timeout_batch_size])
+                if last_sweep is None or time.monotonic() - last_sweep >= self.timeout_sweep_interval_s:
+                    last_sweep = time.monotonic()
+                    while await self.expire_timed_out_sagas() >= self.timeout_batch_size:
+                        pass
+            except Exception as e:
+                logger.error("Failed to expire timed out sagas: %s", e, exc_info=True)
+            await asyncio.sleep(self.timer_wheel.tick_seconds)
+
+    async def expire_timed_out_sagas(self, saga_ids=None) -> int:
+        """
+        Times out up to `timeout_batch_size` sagas past their state's deadline (only among `saga_ids`
+        when given) and persists them with their compensation commands in one transaction.
+        Returns how many timed out sagas were found.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cutoffs = {state: now - datetime.timedelta(seconds=seconds) for state, seconds in self.saga_timeouts.items()}
+        async with self.database.transaction():
+            # The deadline is checked again against the stored row, so sagas that moved on meanwhile are left alone
+            sagas = await self.saga_repository.find_timed_out(cutoffs, self.timeout_batch_size, saga_ids)
+            timed_out = []
+            for saga_state in sagas:
+                try:
+                    await self.handle_saga_timeout(saga_state)
+                    timed_out.append(saga_state)
+                except Exception as e:
+                    logger.error("Error timing out saga %s: %s", saga_state.id, e, exc_info=True)
+            if timed_out:
+                await self._persist_many(timed_out)
+        return len(sagas)
+
+    def _schedule_timeouts(self, saga_states):
+        for saga_state in saga_states:
+            seconds = self.saga_timeouts.get(saga_state.state)
+            if seconds is None:
+                self.timer_wheel.cancel(saga_state.id)
+            else:
+                deadline = saga_state.updated_at.timestamp() + seconds
+                self.timer_wheel.schedule(saga_state.id, deadline)
+
+    async def _commit_periodically(self):
+        while True:
+            await asyncio.sleep(self.commit_interval_ms / 1000)
+            try:
+                await self.commit_processed_offsets()
+            except Exception as e:
+                logger.error("Failed to commit consumer offsets: %s", e, exc_info=True)
+
+    async def commit_processed_offsets(self):
+        if self.lane_pool is None:
+            return
+        offsets = self.lane_pool.pop_committable()
+        if offsets:
+            await self.consumer.commit(
+                {TopicPartition(topic, partition): offset for (topic, partition), offset in offsets.items()}
+            )
+
+    async def on_partitions_revoked(self, revoked):
+        # Finish what was already handed to the lanes (or the batch being applied, which commits its own
+        # offsets) so the next owner does not replay it, and so nothing is cached after the clear below
+        if self.lane_pool is not None:
+            await self.lane_pool.drain()
+            await self.commit_processed_offsets()
+            for tp in revoked:
+                self.lane_pool.forget(tp.topic, tp.partition)
+        else:
+            await self._batch_idle.wait()
+        # Another instance may now advance the sagas we cached
+        if self.saga_cache is not None:
+            self.saga_cache.clear()
+        # Their timeouts are left to the sweep of whichever instance runs it first
+        self.timer_wheel.clear()
+        for tp in revoked:
+            self._partition_lag.pop(tp, None)
+            try:
+                CONSUMER_LAG.remove(tp.topic, str(tp.partition))
+            except KeyError:
+                pass
+
+    def _decode(self, msg):
+        try:
+            event_data = json_codec.loads(msg.value)
+            if not isinstance(event_data, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as e:
+            logger.error("Failed to decode Kafka message at %s-%s-%s: %s. Value: %s", msg.topic, msg.partition, msg.offset, e, self.log_policy.payload(msg.value))
+            return None
+        self._log_consumed(msg, event_data)
+        return event_data
+
+    def _log_consumed(self, msg, event_data: Dict[str, Any]):
+        saga_id = event_data.get("saga_id")
+        with self.log_policy.event(event_data.get("type"), saga_id):
+            logger.info(
+                "Consumed message: topic=%s, partition=%s, offset=%s, key=%s, value=%s",
+                msg.topic, msg.partition, msg.offset, msg.key, self.log_policy.payload(event_data, saga_id),
+            )
 
+    async def process_message(self, msg):
+        event_data = self._decode(msg)
+        if event_data is None:
+            return
+        await self._process_event(msg, event_data)
+
+    async def _process_event(self, msg, event_data: Dict[str, Any]):
+        saga_id = event_data.get("saga_id")
+        try:
             if not saga_id:
-                logger.warning(f"Received event without saga_id: {event_data}")
+                logger.warning("Received event without saga_id: %s", self.log_policy.payload(event_data))
                 return
 
-            saga_state = await self.saga_repository.get(saga_id)
+            saga_state = await self._get_saga(saga_id)
             if not saga_state:
-                logger.warning(f"Saga state not found for saga_id: {saga_id}. Event: {event_data}")
-                # Potentially a late event or error in initial saga creation.
-                # If this is CheckoutInitiated, it means initial create failed.
-                if event_type == "CheckoutInitiated":
-                    logger.error(f"CheckoutInitiated event received but saga_state not found for {saga_id}. Possible initial saga creation failure.")
-                return
-
-            # Idempotency Check
-            if event_id in saga_state.processed_event_ids:
-                logger.info(f"Event {event_id} for saga {saga_id} already processed. Skipping.")
+                self._log_missing_saga(saga_id, event_data)
                 return
 
-            # Add event_id to processed list and update saga state BEFORE processing
-            saga_state.processed_event_ids.append(event_id)
+            if await self._apply_event(msg, saga_state, event_data):
+                # Persist updated saga state after processing
+                await self._persist(saga_state)
 
-            logger.info(f"Processing event '{event_type}' with event_id '{event_id}' for saga '{saga_id}' in state '{saga_state.state}'")
+        except Exception as e:
+            # The cached object may have been changed by the failed handler
+            if self.saga_cache is not None and saga_id:
+                self.saga_cache.invalidate(saga_id)
+            logger.error("Error processing Kafka message for saga %s: %s", saga_id, e, exc_info=True)
+
+    async def _get_saga(self, saga_id: str) -> Optional[SagaState]:
+        if self.saga_cache is not None:
+            saga_state = self.saga_cache.get(saga_id)
+            if saga_state is not None:
+                return saga_state
+        return await self.saga_repository.get(saga_id)
+
+    async def _get_sagas(self, saga_ids) -> Dict[str, SagaState]:
+        if self.saga_cache is None:
+            return await self.saga_repository.get_many(saga_ids)
+        sagas, missing = self.saga_cache.get_many(saga_ids)
+        if missing:
+            sagas.update(await self.saga_repository.get_many(missing))
+        return sagas
+
+    def _log_missing_saga(self, saga_id: str, event_data: Dict[str, Any]):
+        logger.warning("Saga state not found for saga_id: %s. Event: %s", saga_id, self.log_policy.payload(event_data, saga_id))
+        # Potentially a late event or error in initial saga creation.
+        # If this is CheckoutInitiated, it means initial create failed.
+        if event_data.get("type") == "CheckoutInitiated":
+            logger.error("CheckoutInitiated event received but saga_state not found for %s. Possible initial saga creation failure.", saga_id)
+
+    @staticmethod
+    def _event_id(msg, event_data: Dict[str, Any]) -> str:
+        return event_data.get("event_id", f"{msg.topic}-{msg.partition}-{msg.offset}") # Use event_id from payload or Kafka offset
+
+    async def _already_processed(
+        self, saga_state: SagaState, event_id: str, known_processed: Optional[Set[Tuple[str, str]]] = None
+    ) -> bool:
+        # Sagas written before the processed_events table still carry their ids in the JSON list
+        if event_id in saga_state.processed_event_ids or saga_state.has_pending_event(event_id):
+            return True
+        if self.processed_event_repository is None:
+            return False
+        if known_processed is not None:
+            return (saga_state.id, event_id) in known_processed
+        return await self.processed_event_repository.exists(saga_state.id, event_id)
+
+    async def _apply_event(
+        self,
+        msg,
+        saga_state: SagaState,
+        event_data: Dict[str, Any],
+        known_processed: Optional[Set[Tuple[str, str]]] = None,
+    ) -> bool:
+        """
+        Runs the saga step for one event against an in-memory saga state without persisting it.
+        Returns False when the event was already processed and the saga is unchanged.
+        `known_processed` lets a batch answer the idempotency check from one prefetch query.
+        """
+        saga_id = saga_state.id
+        event_type = event_data.get("type", "UNKNOWN_EVENT")
+        # One sampling decision covers every INFO record of this event, handler logs included
+        with self.log_policy.event(event_type, saga_id):
+            event_id = self._event_id(msg, event_data)
 
-            # Saga orchestration logic based on current state and event type
-            if event_type == "CheckoutInitiated" and saga_state.state == SAGA_STATE_INITIATED:
-                await self.handle_checkout_initiated(saga_state, event_data)
-            elif event_type == "InventoryReserved" and saga_state.state == SAGA_STATE_INVENTORY_RESERVATION_PENDING:
-                await self.handle_inventory_reserved(saga_state, event_data)
-            elif event_type == "InventoryReservationFailed" and saga_state.state == SAGA_STATE_INVENTORY_RESERVATION_PENDING:
-                await self.handle_inventory_reservation_failed(saga_state, event_data)
-            elif event_type == "PaymentProcessed" and saga_state.state == SAGA_STATE_PAYMENT_PROCESSING_PENDING:
-                await self.handle_payment_processed(saga_state, event_data)
-            elif event_type == "PaymentFailed" and saga_state.state == SAGA_STATE_PAYMENT_PROCESSING_PENDING:
-                await self.handle_payment_failed(saga_state, event_data)
-            elif event_type == "OrderCreated" and saga_state.state == SAGA_STATE_ORDER_CREATION_PENDING:
-                await self.handle_order_created(saga_state, event_data)
-            elif event_type == "OrderCreationFailed" and saga_state.state == SAGA_STATE_ORDER_CREATION_PENDING:
-                await self.handle_order_creation_failed(saga_state, event_data)
-            elif event_type == "CartCleared" and saga_state.state == SAGA_STATE_CART_CLEARANCE_PENDING:
-                await self.handle_cart_cleared(saga_state, event_data)
-            elif event_type == "CartClearanceFailed" and saga_state.state == SAGA_STATE_CART_CLEARANCE_PENDING:
-                await self.handle_cart_clearance_failed(saga_state, event_data)
+            # Idempotency Check
+            if await self._already_processed(saga_state, event_id, known_processed):
+                logger.info("Event %s for saga %s already processed. Skipping.", event_id, saga_id)
+                SAGA_EVENTS_REJECTED.labels(saga_state.state, self._event_type_label(event_type), "duplicate").inc()
+                return False
+
+            # Record event_id as processed; it is persisted together with the saga state
+            if self.processed_event_repository is None:
+                saga_state.processed_event_ids.append(event_id)
             else:
-                logger.warning(f"No handler for event_type '{event_type}' in state '{saga_state.state}' for saga {saga_id}")
+                saga_state.mark_event_processed(event_id)
 
-            # Persist updated saga state after processing
-            saga_state.updated_at = datetime.datetime.now(datetime.timezone.utc)
-            await self.saga_repository.update(saga_state)
+            logger.info("Processing event '%s' with event_id '%s' for saga '%s' in state '%s'", event_type, event_id, saga_id, saga_state.state)
 
-        except json.JSONDecodeError:
-            logger.error(f"Failed to decode JSON from Kafka message: {msg.value.decode('utf-8')}")
-        except Exception as e:
-            logger.error(f"Error processing Kafka message for saga {saga_id}: {e}", exc_info=True)
+            # Saga orchestration logic based on current state and event type
+            state = saga_state.state
+            handler = self.transitions.get((state, event_type))
+            if handler is None:
+                reason = "out_of_order" if event_type in _TRANSITION_EVENT_TYPES else "unknown_event"
+                SAGA_EVENTS_REJECTED.labels(state, self._event_type_label(event_type), reason).inc()
+                logger.warning("No handler for event_type '%s' in state '%s' for saga %s", event_type, state, saga_id)
+            else:
+                started = time.perf_counter()
+                try:
+                    await handler(saga_state, event_data)
+                except Exception:
+                    SAGA_TRANSITION_FAILURES.labels(state, event_type).inc()
+                    raise
+                finally:
+                    SAGA_TRANSITION_LATENCY.labels(state, event_type).observe(time.perf_counter() - started)
+                # Timeouts and archiving run off updated_at, so rejected events must not move it
+                saga_state.updated_at = datetime.datetime.now(datetime.timezone.utc)
+            return True
+
+    @staticmethod
+    def _event_type_label(event_type: str) -> str:
+        # Event types come from the message; keep arbitrary values out of the metric labels
+        return event_type if event_type in _TRANSITION_EVENT_TYPES else "other"
+
+    async def process_batch(self, records) -> None:
+        """
+        Applies a getmany() batch: every referenced saga is loaded with one query, events are
+        applied in memory in partition order and all changed sagas are written back in one transaction.
+        """
+        events = []
+        for msgs in records.values():
+            for msg in msgs:
+                event_data = self._decode(msg)
+                if event_data is None:
+                    continue
+                if not event_data.get("saga_id"):
+                    logger.warning("Received event without saga_id: %s", self.log_policy.payload(event_data))
+                    continue
+                events.append((msg, event_data))
+        if not events:
+            return
+
+        sagas = await self._get_sagas({event_data["saga_id"] for _, event_data in events})
+        known_processed = None
+        if self.processed_event_repository is not None:
+            known_processed = await self.processed_event_repository.existing(
+                (event_data["saga_id"], self._event_id(msg, event_data)) for msg, event_data in events
+            )
+        changed: Dict[str, SagaState] = {}
+        for msg, event_data in events:
+            saga_id = event_data["saga_id"]
+            saga_state = sagas.get(saga_id)
+            if saga_state is None:
+                self._log_missing_saga(saga_id, event_data)
+                continue
+            # Work on a copy so a failing handler leaves the saga as it was, like the per-record path does
+            candidate = saga_state.model_copy(deep=True)
+            try:
+                if await self._apply_event(msg, candidate, event_data, known_processed):
+                    sagas[saga_id] = changed[saga_id] = candidate
+            except Exception as e:
+                logger.error("Error processing Kafka message for saga %s: %s", saga_id, e, exc_info=True)
+
+        if changed:
+            await self._persist_many(list(changed.values()))
+
+    async def _publish(self, saga_state: SagaState, topic: str, payload: Dict[str, Any]):
+        # Sent (or written to the outbox) when the saga is persisted, see _persist
+        saga_state.add_command(topic, payload)
+
+    async def _send_commands(self, saga_states):
+        # All commands are enqueued first and acknowledged together before the sagas are persisted
+        async with self.producer.batch() as batch:
+            for saga_state in saga_states:
+                for topic, payload in saga_state.pop_commands():
+                    await batch.send(topic, json_codec.dumps(payload), key=saga_state.id.encode('utf-8'))
+
+    async def _persist(self, saga_state: SagaState):
+        await self._persist_many([saga_state])
+
+    async def _persist_many(self, saga_states):
+        # Sagas reaching an outcome with this write; measured once it has committed
+        finished = [
+            saga_state
+            for saga_state in saga_states
+            if saga_state.state in _SAGA_OUTCOMES and saga_state.persisted_state != saga_state.state
+        ]
+        # Saga rows, processed event ids and commands commit or roll back together. Rows are written first:
+        # a saga whose row moved on since it was read (timed out, or advanced by another replica) is dropped
+        # together with its commands before anything is sent.
+        async with self.database.transaction():
+            if len(saga_states) == 1:
+                written = [saga_states[0]] if await self.saga_repository.update(saga_states[0]) is not None else []
+            else:
+                written = await self.saga_repository.update_many(saga_states)
+            written_ids = {saga_state.id for saga_state in written}
+            conflicted = [saga_state for saga_state in saga_states if saga_state.id not in written_ids]
+            for saga_state in conflicted:
+                saga_state.pop_commands()
+                saga_state.pop_processed_event_ids()
+            if self.outbox_repository is None:
+                # Still inside the transaction, so a failed send leaves the rows as they were
+                await self._send_commands(written)
+            if self.processed_event_repository is not None:
+                await self.processed_event_repository.add_many(
+                    [(saga_state.id, event_id) for saga_state in written for event_id in saga_state.pop_processed_event_ids()]
+                )
+            if self.outbox_repository is not None:
+                for saga_state in written:
+                    await self.outbox_repository.add_many(saga_state.id, saga_state.pop_commands())
+        if conflicted:
+            SAGA_UPDATE_CONFLICTS.inc(len(conflicted))
+            logger.warning(
+                "Sagas changed since they were read, dropped their transition and reloaded them: %s",
+                ", ".join(saga_state.id for saga_state in conflicted),
+            )
+            if self.saga_cache is not None:
+                for saga_state in conflicted:
+                    self.saga_cache.invalidate(saga_state.id)
+            reloaded = await self.saga_repository.get_many(saga_state.id for saga_state in conflicted)
+            self._committed(list(reloaded.values()))
+        self._committed(written)
+        for saga_state in finished:
+            if saga_state.id in written_ids:
+                SAGA_DURATION.labels(_SAGA_OUTCOMES[saga_state.state]).observe(
+                    max((saga_state.updated_at - saga_state.created_at).total_seconds(), 0.0)
+                )
+
+    def _committed(self, saga_states):
+        # Only cache what has been committed
+        if self.saga_cache is not None:
+            for saga_state in saga_states:
+                self.saga_cache.put(saga_state)
+        for saga_state in saga_states:
+            status = self.status_cache.put(saga_state) if self.status_cache is not None else None
+            if self.event_bus is not None:
+                self.event_bus.publish(saga_state, status)
+        if self.saga_timeouts:
+            self._schedule_timeouts(saga_states)
 
     async def handle_checkout_initiated(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.info(f"Handling CheckoutInitiated event for saga {saga_state.id}")
+        logger.info("Handling CheckoutInitiated event for saga %s", saga_state.id)
 
         # Validate product_ids in cart_details
         items = saga_state.context["cart_details"]["items"]
         for item in items:
             product_id = item.get("product_id")
             if not product_id or not is_valid_uuid(product_id):
-                logger.error(f"Invalid product_id '{product_id}' in cart_details for saga {saga_state.id}. Failing saga.")
+                logger.error("Invalid product_id '%s' in cart_details for saga %s. Failing saga.", product_id, saga_state.id)
                 saga_state.state = SAGA_STATE_FAILED
                 saga_state.context["current_step"] = "CHECKOUT_INITIATED_VALIDATION_FAILED"
                 saga_state.context["errors"].append({"step": "checkout_initiated_validation", "reason": f"Invalid product ID: {product_id}"})
@@ -184,54 +713,96 @@ class KafkaConsumerManager:
             "event_id": str(uuid.uuid4()), # Unique ID for this command/event
             "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS, # Inventory service should reply here
         }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_INVENTORY_COMMAND,
-            json.dumps(inventory_command_payload).encode('utf-8')
-        )
-        logger.info(f"Published ReserveInventory command for saga {saga_state.id}")
+        await self._publish(saga_state, KAFKA_TOPIC_INVENTORY_COMMAND, inventory_command_payload)
+        logger.info("Published ReserveInventory command for saga %s", saga_state.id)
 
     async def handle_inventory_reserved(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.info(f"Handling InventoryReserved event for saga {saga_state.id}")
+        logger.info("Handling InventoryReserved event for saga %s", saga_state.id)
         saga_state.state = SAGA_STATE_PAYMENT_PROCESSING_PENDING
         saga_state.context["current_step"] = "PAYMENT_REQUEST_SENT"
         saga_state.context["inventory_reservation_details"] = event_data.get("reservation_details")
 
-        # Need to make sync post request for the discount and tax
+        # Discount and tax do not depend on each other: quote both at once, each within its own budget.
+        # The saga is persisted once by the caller after the handler returns.
+        quotes = [
+            asyncio.ensure_future(self._with_quote_budget("Discount engine", self._quote_discount(saga_state))),
+            asyncio.ensure_future(self._with_quote_budget("Tax service", self._quote_tax(saga_state))),
+        ]
+        try:
+            total_discount_cent, tax_cents = await asyncio.gather(*quotes)
+        except BaseException:
+            # One failed quote fails the step; don't leave the other request running
+            for quote in quotes:
+                quote.cancel()
+            await asyncio.gather(*quotes, return_exceptions=True)
+            raise
+        saga_state.context["totalDiscountCents"] = total_discount_cent
+        saga_state.context["taxCents"] = tax_cents
+
+        final_amount = saga_state.context["cart_details"]["total_price"] + saga_state.context["taxCents"] - saga_state.context["totalDiscountCents"]
+        saga_state.context["finalAmountCents"] = final_amount
+        # Publish command to Payment Service
+        payment_command_payload = {
+            "type": "ProcessPayment",
+            "saga_id": saga_state.id,
+            "user_id": saga_state.context["user_id"],
+            "amount": saga_state.context["finalAmountCents"],
+            "event_id": str(uuid.uuid4()),
+            "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
+        }
+        await self._publish(saga_state, KAFKA_TOPIC_PAYMENT_COMMAND, payment_command_payload)
+        logger.info("Published ProcessPayment command for saga %s", saga_state.id)
+
+    async def _with_quote_budget(self, upstream: str, quote):
+        try:
+            return await asyncio.wait_for(quote, timeout=self.quote_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"{upstream} did not answer within {self.quote_timeout_ms}ms")
+
+    async def _cached_quote(self, kind: str, saga_state: SagaState, loader):
+        if self.quote_cache is None:
+            return await loader(saga_state)
+        key = cart_quote_key(
+            saga_state.context["cart_id"],
+            saga_state.context["user_id"],
+            saga_state.context["cart_details"]["items"],
+        )
+        return await self.quote_cache.get_or_load(kind, key, lambda: loader(saga_state))
+
+    async def _quote_discount(self, saga_state: SagaState) -> int:
+        return await self._cached_quote("discount", saga_state, self._fetch_discount)
+
+    async def _quote_tax(self, saga_state: SagaState) -> int:
+        return await self._cached_quote("tax", saga_state, self._fetch_tax)
+
+    async def _post_json(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        # Encoded with the shared codec rather than httpx's stdlib json
+        return await self.httpx_client.post(url, content=json_codec.dumps(payload), headers=_JSON_HEADERS)
+
+    async def _fetch_discount(self, saga_state: SagaState) -> int:
         payment_discount_payload = {
             "cartId": saga_state.context["cart_id"],
             "user_id": saga_state.context["user_id"],
             "items": saga_state.context["cart_details"]["items"]
         }
-
-        discount_response = await self.httpx_client.post("/api/discounts/calculate",json = payment_discount_payload, headers = {"Content-Type": "application/json"})
+        discount_response = await self._post_json(DISCOUNT_ENDPOINT, payment_discount_payload)
 
         if discount_response.status_code != 200:
-            print(f"Discount engine returned {discount_respons.status_code}: {discount_response.text}")
-            raise
-        try:
-            data = discount_response.json()
-        except ValueError as e:
-            raise ValueError("Invalid JSON from discount engine")
+            raise RuntimeError(
+                f"Discount engine returned {discount_response.status_code}: {discount_response.text}"
+            )
 
-        # Extract the total_discount_cent from the response
         try:
-            total_discount_cent  = data["totalDiscountCents"]
-        except KeyError as e:
-            raise KeyError("Missing totalDiscountcents in response")
-
-        # Store in the saga_state
-        saga_state.context["totalDiscountCents"] = total_discount_cent
-        await self.saga_repository.save(saga_state)
+            return json_codec.loads(discount_response.content)["totalDiscountCents"]
+        except (ValueError, KeyError):
+            raise RuntimeError("Invalid response from discount engine")
 
+    async def _fetch_tax(self, saga_state: SagaState) -> int:
         payment_tax_payload = {
             "cartId": saga_state.context["cart_id"],
             "items": saga_state.context["cart_details"]["items"],
         }
-
-        tax_response = await self.httpx_client.post(
-            f"{TAX_SERVICE_URL.rstrip('/')}/api/tax/calculate",
-            json=payment_tax_payload,
-        )
+        tax_response = await self._post_json(TAX_ENDPOINT, payment_tax_payload)
 
         if tax_response.status_code != 200:
             raise RuntimeError(
@@ -239,42 +810,21 @@ class KafkaConsumerManager:
             )
 
         try:
-            tax_data = tax_response.json()
-            tax_cents = tax_data["taxCents"]
+            return json_codec.loads(tax_response.content)["taxCents"]
         except (ValueError, KeyError):
             raise RuntimeError("Invalid response from tax service")
 
-        saga_state.context["taxCents"] = tax_cents
-        await self.saga_repository.update(saga_state)
-
-        final_amount = saga_state.context["cart_details"]["total_price"] + saga_state.context["taxCents"] - saga_state.context["totalDiscountCents"]
-        saga_state.context["finalAmountCents"] = final_amount
-        # Publish command to Payment Service
-        payment_command_payload = {
-            "type": "ProcessPayment",
-            "saga_id": saga_state.id,
-            "user_id": saga_state.context["user_id"],
-            "amount": saga_state.context["finalAmountCents"],
-            "event_id": str(uuid.uuid4()),
-            "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
-        }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_PAYMENT_COMMAND,
-            json.dumps(payment_command_payload).encode('utf-8')
-        )
-        logger.info(f"Published ProcessPayment command for saga {saga_state.id}")
-
     async def handle_inventory_reservation_failed(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.error(f"Handling InventoryReservationFailed event for saga {saga_state.id}. Reason: {event_data.get('reason')}")
+        logger.error("Handling InventoryReservationFailed event for saga %s. Reason: %s", saga_state.id, event_data.get('reason'))
         saga_state.state = SAGA_STATE_FAILED
         saga_state.context["current_step"] = "INVENTORY_RESERVATION_FAILED"
         saga_state.context["errors"].append({"step": "inventory", "reason": event_data.get("reason")})
         # For inventory reservation failure, typically the inventory service handles any partial reservations or rollbacks.
         # The orchestrator simply marks the saga as failed. No explicit compensation command from orchestrator.
-        logger.info(f"Saga {saga_state.id} marked as FAILED due to inventory reservation failure.")
+        logger.info("Saga %s marked as FAILED due to inventory reservation failure.", saga_state.id)
 
     async def handle_payment_processed(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.info(f"Handling PaymentProcessed event for saga {saga_state.id}")
+        logger.info("Handling PaymentProcessed event for saga %s", saga_state.id)
         saga_state.state = SAGA_STATE_ORDER_CREATION_PENDING
         saga_state.context["current_step"] = "ORDER_CREATION_SENT"
         saga_state.context["payment_details"] = event_data.get("payment_details")
@@ -290,23 +840,20 @@ class KafkaConsumerManager:
             "event_id": str(uuid.uuid4()),
             "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
         }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_ORDER_COMMAND,
-            json.dumps(order_command_payload).encode('utf-8')
-        )
-        logger.info(f"Published CreateOrder command for saga {saga_state.id}")
+        await self._publish(saga_state, KAFKA_TOPIC_ORDER_COMMAND, order_command_payload)
+        logger.info("Published CreateOrder command for saga %s", saga_state.id)
 
     async def handle_payment_failed(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.error(f"Handling PaymentFailed event for saga {saga_state.id}. Reason: {event_data.get('reason')}")
+        logger.error("Handling PaymentFailed event for saga %s. Reason: %s", saga_state.id, event_data.get('reason'))
         saga_state.state = SAGA_STATE_COMPENSATING
         saga_state.context["current_step"] = "PAYMENT_FAILED_COMPENSATION_PENDING"
         saga_state.context["errors"].append({"step": "payment", "reason": event_data.get("reason")})
         # Publish compensating transaction to Inventory Service (release reservation)
         await self._publish_compensate_inventory_command(saga_state)
-        logger.info(f"Saga {saga_state.id} marked as COMPENSATING due to payment failure.")
+        logger.info("Saga %s marked as COMPENSATING due to payment failure.", saga_state.id)
 
     async def handle_order_created(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.info(f"Handling OrderCreated event for saga {saga_state.id}")
+        logger.info("Handling OrderCreated event for saga %s", saga_state.id)
         saga_state.state = SAGA_STATE_CART_CLEARANCE_PENDING
         saga_state.context["current_step"] = "CART_CLEARANCE_SENT"
         saga_state.context["order_details"] = event_data.get("order_details")
@@ -320,38 +867,59 @@ class KafkaConsumerManager:
             "event_id": str(uuid.uuid4()),
             "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
         }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_CART_COMMAND,
-            json.dumps(cart_command_payload).encode('utf-8')
-        )
-        logger.info(f"Published ClearCart command for saga {saga_state.id}")
+        await self._publish(saga_state, KAFKA_TOPIC_CART_COMMAND, cart_command_payload)
+        logger.info("Published ClearCart command for saga %s", saga_state.id)
 
     async def handle_order_creation_failed(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.error(f"Handling OrderCreationFailed event for saga {saga_state.id}. Reason: {event_data.get('reason')}")
+        logger.error("Handling OrderCreationFailed event for saga %s. Reason: %s", saga_state.id, event_data.get('reason'))
         saga_state.state = SAGA_STATE_COMPENSATING
         saga_state.context["current_step"] = "ORDER_CREATION_FAILED_COMPENSATION_PENDING"
         saga_state.context["errors"].append({"step": "order_creation", "reason": event_data.get("reason")})
         # Publish compensating transactions
         await self._publish_compensate_payment_command(saga_state)
         await self._publish_compensate_inventory_command(saga_state)
-        logger.info(f"Saga {saga_state.id} marked as COMPENSATING due to order creation failure.")
+        logger.info("Saga %s marked as COMPENSATING due to order creation failure.", saga_state.id)
 
     async def handle_cart_cleared(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.info(f"Handling CartCleared event for saga {saga_state.id}")
+        logger.info("Handling CartCleared event for saga %s", saga_state.id)
         saga_state.state = SAGA_STATE_COMPLETED
         saga_state.context["current_step"] = "SAGA_COMPLETED"
-        logger.info(f"Saga {saga_state.id} completed successfully.")
+        logger.info("Saga %s completed successfully.", saga_state.id)
 
     async def handle_cart_clearance_failed(self, saga_state: SagaState, event_data: Dict[str, Any]):
-        logger.error(f"Handling CartClearanceFailed event for saga {saga_state.id}. Reason: {event_data.get('reason')}")
+        logger.error("Handling CartClearanceFailed event for saga %s. Reason: %s", saga_state.id, event_data.get('reason'))
         saga_state.state = SAGA_STATE_COMPENSATING
         saga_state.context["current_step"] = "CART_CLEARANCE_FAILED_COMPENSATION_PENDING"
         saga_state.context["errors"].append({"step": "cart_clearance", "reason": event_data.get("reason")})
         # Compensating transactions already published by previous failures or if this is the only one.
-        logger.info(f"Saga {saga_state.id} marked as COMPENSATING due to cart clearance failure.")
+        logger.info("Saga %s marked as COMPENSATING due to cart clearance failure.", saga_state.id)
+
+    async def handle_saga_timeout(self, saga_state: SagaState):
+        timed_out_state = saga_state.state
+        logger.error("Saga %s timed out in state %s after %ss", saga_state.id, timed_out_state, self.saga_timeouts[timed_out_state])
+        saga_state.context["current_step"] = f"{timed_out_state}_TIMED_OUT"
+        saga_state.context.setdefault("errors", []).append(
+            {"step": "timeout", "reason": f"No reply within {self.saga_timeouts[timed_out_state]}s in state {timed_out_state}"}
+        )
+        if timed_out_state == SAGA_STATE_INITIATED:
+            # Nothing was requested from other services yet
+            saga_state.state = SAGA_STATE_FAILED
+        else:
+            saga_state.state = SAGA_STATE_COMPENSATING
+            # The reply may only be late, so undo whatever the pending step could have done as well.
+            # A stuck cart clearance is handled like CartClearanceFailed: the order stands.
+            if timed_out_state in (SAGA_STATE_PAYMENT_PROCESSING_PENDING, SAGA_STATE_ORDER_CREATION_PENDING):
+                await self._publish_compensate_payment_command(saga_state)
+            if timed_out_state in (
+                SAGA_STATE_INVENTORY_RESERVATION_PENDING,
+                SAGA_STATE_PAYMENT_PROCESSING_PENDING,
+                SAGA_STATE_ORDER_CREATION_PENDING,
+            ):
+                await self._publish_compensate_inventory_command(saga_state)
+        saga_state.updated_at = datetime.datetime.now(datetime.timezone.utc)
 
     async def _publish_compensate_inventory_command(self, saga_state: SagaState):
-        logger.info(f"Publishing CompensateInventory command for saga {saga_state.id}")
+        logger.info("Publishing CompensateInventory command for saga %s", saga_state.id)
         compensate_payload = {
             "type": "CompensateInventory",
             "saga_id": saga_state.id,
@@ -362,13 +930,10 @@ class KafkaConsumerManager:
             "event_id": str(uuid.uuid4()),
             "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
         }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_INVENTORY_COMMAND,
-            json.dumps(compensate_payload).encode('utf-8')
-        )
+        await self._publish(saga_state, KAFKA_TOPIC_INVENTORY_COMMAND, compensate_payload)
 
     async def _publish_compensate_payment_command(self, saga_state: SagaState):
-        logger.info(f"Publishing CompensatePayment command for saga {saga_state.id}")
+        logger.info("Publishing CompensatePayment command for saga %s", saga_state.id)
         compensate_payload = {
             "type": "CompensatePayment",
             "saga_id": saga_state.id,
@@ -377,7 +942,4 @@ class KafkaConsumerManager:
             "event_id": str(uuid.uuid4()),
             "reply_to_topic": KAFKA_TOPIC_CHECKOUT_EVENTS,
         }
-        await self.producer.send_and_wait(
-            KAFKA_TOPIC_PAYMENT_COMMAND,
-            json.dumps(compensate_payload).encode('utf-8')
-        )
+        await self._publish(saga_state, KAFKA_TOPIC_PAYMENT_COMMAND, compensate_payload)
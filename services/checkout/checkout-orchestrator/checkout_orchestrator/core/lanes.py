@@ -0,0 +1,137 @@
+import asyncio
+import collections
+import logging
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PartitionKey = Tuple[str, int]  # (topic, partition)
+
+
+class PartitionOffsetTracker:
+    """
+    Tracks the offsets of one partition that have been handed to a lane.
+    The committable offset only advances past a record once it and every
+    record before it have been fully processed.
+    """
+
+    def __init__(self):
+        # offset -> done flag, kept in consumption order (offsets only grow within a partition)
+        self._pending: "collections.OrderedDict[int, bool]" = collections.OrderedDict()
+        self._committable: Optional[int] = None
+
+    def track(self, offset: int):
+        self._pending[offset] = False
+
+    def complete(self, offset: int):
+        if offset not in self._pending:
+            return
+        self._pending[offset] = True
+        while self._pending:
+            first_offset, done = next(iter(self._pending.items()))
+            if not done:
+                break
+            self._pending.popitem(last=False)
+            # Kafka commits the offset of the *next* record to read
+            self._committable = first_offset + 1
+
+    @property
+    def committable(self) -> Optional[int]:
+        return self._committable
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+
+class SagaLanePool:
+    """
+    A fixed set of worker lanes, each with a bounded queue. Records are routed
+    to a lane by saga_id, so the events of one saga are handled in order while
+    unrelated sagas run concurrently. A full lane blocks `submit`, which in turn
+    stops the consumer loop from fetching more records.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[None]],
+        lanes: int,
+        queue_size: int,
+    ):
+        if lanes < 1:
+            raise ValueError("lanes must be >= 1")
+        self.handler = handler
+        self.lanes = lanes
+        self.queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(lanes)]
+        self.trackers: Dict[PartitionKey, PartitionOffsetTracker] = {}
+        self._last_committed: Dict[PartitionKey, int] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def lane_for(self, saga_id: Optional[str]) -> int:
+        # crc32 instead of hash() so routing does not depend on PYTHONHASHSEED
+        return zlib.crc32((saga_id or "").encode("utf-8")) % self.lanes
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._run_lane(index), name=f"saga-lane-{index}")
+            for index in range(self.lanes)
+        ]
+
+    def _tracker(self, msg) -> PartitionOffsetTracker:
+        key = (msg.topic, msg.partition)
+        tracker = self.trackers.get(key)
+        if tracker is None:
+            tracker = self.trackers[key] = PartitionOffsetTracker()
+        return tracker
+
+    async def submit(self, saga_id: Optional[str], msg, event_data: Dict[str, Any]):
+        self._tracker(msg).track(msg.offset)
+        await self.queues[self.lane_for(saga_id)].put((msg, event_data))
+
+    def skip(self, msg):
+        """Marks a record that needs no processing (e.g. undecodable) as done."""
+        tracker = self._tracker(msg)
+        tracker.track(msg.offset)
+        tracker.complete(msg.offset)
+
+    async def _run_lane(self, index: int):
+        queue = self.queues[index]
+        while True:
+            msg, event_data = await queue.get()
+            try:
+                await self.handler(msg, event_data)
+            except Exception as e:
+                # The handler is expected to deal with its own errors; never let one record kill the lane
+                logger.error(f"Unhandled error in saga lane {index}: {e}", exc_info=True)
+            finally:
+                # The partition may have been revoked (and its tracker dropped) meanwhile
+                tracker = self.trackers.get((msg.topic, msg.partition))
+                if tracker is not None:
+                    tracker.complete(msg.offset)
+                queue.task_done()
+
+    def pop_committable(self) -> Dict[PartitionKey, int]:
+        """Returns the offsets that advanced since the last call, per partition."""
+        offsets = {}
+        for key, tracker in self.trackers.items():
+            offset = tracker.committable
+            if offset is not None and offset != self._last_committed.get(key):
+                offsets[key] = offset
+                self._last_committed[key] = offset
+        return offsets
+
+    def forget(self, topic: str, partition: int):
+        """Drops the bookkeeping of a partition this consumer no longer owns."""
+        self.trackers.pop((topic, partition), None)
+        self._last_committed.pop((topic, partition), None)
+
+    async def drain(self):
+        for queue in self.queues:
+            await queue.join()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
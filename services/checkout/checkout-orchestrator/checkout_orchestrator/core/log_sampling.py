@@ -0,0 +1,145 @@
+import contextlib
+import contextvars
+import logging
+import random
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from checkout_orchestrator.utils import json_codec
+
+# Whether INFO/DEBUG records of the event being handled in the current task are kept
+_event_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("saga_event_sampled", default=True)
+
+REDACTED = "***"
+
+
+class SampledLogFilter(logging.Filter):
+    """Drops INFO and DEBUG records of events that were not sampled; warnings and errors always pass."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or _event_sampled.get()
+
+
+class LazyPayload:
+    """Renders a message payload (redacted and truncated) only if a log record is actually emitted."""
+
+    __slots__ = ("value", "policy", "full")
+
+    def __init__(self, value: Any, policy: "SagaLogPolicy", full: bool):
+        self.value = value
+        self.policy = policy
+        self.full = full
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            text = bytes(value).decode("utf-8", errors="replace")
+        else:
+            try:
+                text = json_codec.dumps_str(self.policy.redact(value))
+            except TypeError:
+                text = repr(value)
+        if self.full or len(text) <= self.policy.max_payload_chars:
+            return text
+        return f"{text[:self.policy.max_payload_chars]}... ({len(text)} chars)"
+
+    __repr__ = __str__
+
+
+class SagaLogPolicy:
+    """
+    Decides how much the saga consumer logs: a sampling rate per event type (1 logs every event,
+    0 none), payload truncation and redaction of sensitive keys. Sagas put in debug mode log every
+    event with the untruncated payload. Everything can be changed at runtime, see the admin endpoints,
+    except that the keys redacted at startup stay redacted: runtime changes can only add keys.
+    """
+
+    def __init__(
+        self,
+        sample_rates: Optional[Dict[str, float]] = None,
+        default_rate: float = 1.0,
+        max_payload_chars: int = 512,
+        redact_keys: Iterable[str] = (),
+        rng: Callable[[], float] = random.random,
+    ):
+        self.sample_rates: Dict[str, float] = dict(sample_rates or {})
+        self.default_rate = default_rate
+        self.max_payload_chars = max_payload_chars
+        self.redact_keys = frozenset(redact_keys)
+        self.required_redact_keys = self.redact_keys
+        self.debug_saga_ids = set()
+        self.rng = rng
+
+    def configure(
+        self,
+        sample_rates: Optional[Dict[str, float]] = None,
+        default_rate: Optional[float] = None,
+        max_payload_chars: Optional[int] = None,
+        redact_keys: Optional[Iterable[str]] = None,
+    ):
+        """Raises ValueError, changing nothing, if `redact_keys` leaves out a key redacted at startup."""
+        if redact_keys is not None:
+            redact_keys = frozenset(redact_keys)
+            missing = self.required_redact_keys - redact_keys
+            if missing:
+                raise ValueError(f"Keys redacted at startup cannot be unredacted: {', '.join(sorted(missing))}")
+        if sample_rates is not None:
+            self.sample_rates = dict(sample_rates)
+        if default_rate is not None:
+            self.default_rate = default_rate
+        if max_payload_chars is not None:
+            self.max_payload_chars = max_payload_chars
+        if redact_keys is not None:
+            self.redact_keys = redact_keys
+
+    def enable_debug(self, saga_id: str):
+        self.debug_saga_ids.add(saga_id)
+
+    def disable_debug(self, saga_id: str):
+        self.debug_saga_ids.discard(saga_id)
+
+    def is_debug(self, saga_id: Optional[str]) -> bool:
+        return saga_id is not None and saga_id in self.debug_saga_ids
+
+    def sampled(self, event_type: Optional[str], saga_id: Optional[str] = None) -> bool:
+        if self.is_debug(saga_id):
+            return True
+        rate = self.sample_rates.get(event_type, self.default_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        if saga_id is None:
+            return self.rng() < rate
+        # Keyed on the saga, so a sampled saga is logged across all its steps, on every replica
+        return (zlib.crc32(saga_id.encode("utf-8")) & 0xFFFFFFFF) / 2**32 < rate
+
+    @contextlib.contextmanager
+    def event(self, event_type: Optional[str], saga_id: Optional[str]):
+        """Applies one sampling decision to every INFO record logged while the event is handled."""
+        token = _event_sampled.set(self.sampled(event_type, saga_id))
+        try:
+            yield
+        finally:
+            _event_sampled.reset(token)
+
+    def payload(self, value: Any, saga_id: Optional[str] = None) -> LazyPayload:
+        return LazyPayload(value, self, full=self.is_debug(saga_id))
+
+    def redact(self, value: Any) -> Any:
+        if not self.redact_keys:
+            return value
+        if isinstance(value, dict):
+            return {key: REDACTED if key in self.redact_keys else self.redact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        return value
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "sample_rates": self.sample_rates,
+            "default_rate": self.default_rate,
+            "max_payload_chars": self.max_payload_chars,
+            "redact_keys": sorted(self.redact_keys),
+            "debug_saga_ids": sorted(self.debug_saga_ids),
+        }
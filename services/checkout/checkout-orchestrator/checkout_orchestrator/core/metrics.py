@@ -0,0 +1,135 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from checkout_orchestrator.core.config import registry
+
+# Everything here is registered in the registry served by /metrics in main.py
+
+QUOTE_CACHE_HITS = Counter(
+    "checkout_quote_cache_hits", "Pricing quotes served from the cache", ["kind"], registry=registry
+)
+QUOTE_CACHE_MISSES = Counter(
+    "checkout_quote_cache_misses", "Pricing quotes fetched from the upstream service", ["kind"], registry=registry
+)
+QUOTE_CACHE_COALESCED = Counter(
+    "checkout_quote_cache_coalesced",
+    "Pricing quote lookups that waited on an identical in-flight request",
+    ["kind"],
+    registry=registry,
+)
+QUOTE_CACHE_EVICTIONS = Counter(
+    "checkout_quote_cache_evictions", "Pricing quotes evicted to respect the cache size bound", registry=registry
+)
+
+SAGA_CACHE_HITS = Counter("checkout_saga_cache_hits", "Saga states served from the in-process cache", registry=registry)
+SAGA_CACHE_MISSES = Counter(
+    "checkout_saga_cache_misses", "Saga state lookups that had to go to the database", registry=registry
+)
+SAGA_CACHE_EVICTIONS = Counter(
+    "checkout_saga_cache_evictions", "Saga states evicted to respect the cache size bound", registry=registry
+)
+SAGA_CACHE_SIZE = Gauge("checkout_saga_cache_size", "Saga states currently cached", registry=registry)
+
+SAGA_STATUS_LOOKUPS = Counter(
+    "checkout_saga_status_lookups",
+    "Checkout status reads, by result: hit (cached snapshot), miss (read from the database) or coalesced "
+    "(waited on an identical in-flight database read)",
+    ["result"],
+    registry=registry,
+)
+CHECKOUT_IDEMPOTENT_REPLAYS = Counter(
+    "checkout_idempotent_replays",
+    "Duplicate checkout submissions answered with the existing saga, by key source (header or derived)",
+    ["source"],
+    registry=registry,
+)
+CHECKOUT_ADMISSIONS = Counter(
+    "checkout_admissions",
+    "Admission decisions on new checkouts: admitted, or the reason it was shed "
+    "(kafka_breaker, consumer_lag, db_pool, spool, user_rate, global_rate)",
+    ["result"],
+    registry=registry,
+)
+CHECKOUT_SPOOLED = Counter(
+    "checkout_spooled", "CheckoutInitiated events written to the local spool because Kafka was unavailable",
+    registry=registry,
+)
+CHECKOUT_SPOOL_DRAINED = Counter(
+    "checkout_spool_drained", "Spooled CheckoutInitiated events published to Kafka by the drainer", registry=registry
+)
+CHECKOUT_SPOOL_BACKLOG = Gauge(
+    "checkout_spool_backlog", "CheckoutInitiated events waiting in the local spool", registry=registry
+)
+SAGA_STATUS_SUBSCRIBERS = Gauge(
+    "checkout_saga_status_subscribers", "Open checkout status streams (SSE) on this instance", registry=registry
+)
+SAGA_STATUS_UPDATES_DROPPED = Counter(
+    "checkout_saga_status_updates_dropped",
+    "Status updates a slow stream subscriber never saw because a newer one replaced them",
+    registry=registry,
+)
+
+SAGA_TRANSITION_LATENCY = Histogram(
+    "checkout_saga_transition_seconds",
+    "Time spent in the handler of one saga transition, by state before the event and event type",
+    ["state", "event_type"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry,
+)
+SAGA_TRANSITION_FAILURES = Counter(
+    "checkout_saga_transition_failures",
+    "Saga transitions whose handler raised, by state before the event and event type",
+    ["state", "event_type"],
+    registry=registry,
+)
+SAGA_UPDATE_CONFLICTS = Counter(
+    "checkout_saga_update_conflicts",
+    "Saga writes dropped because the stored saga had changed state since it was read (timeout or another replica)",
+    registry=registry,
+)
+SAGA_EVENTS_REJECTED = Counter(
+    "checkout_saga_events_rejected",
+    "Saga events that did not trigger a transition: duplicate, out_of_order (no transition from the "
+    "saga's current state) or unknown_event (event type no transition handles)",
+    ["state", "event_type", "reason"],
+    registry=registry,
+)
+
+CONSUMER_RECORDS = Counter(
+    "checkout_consumer_records", "Kafka records consumed by the saga consumer (rate() gives records/sec)", ["topic"],
+    registry=registry,
+)
+CONSUMER_LAG = Gauge(
+    "checkout_consumer_lag",
+    "Records between the partition's high watermark and the last record fetched by the saga consumer",
+    ["topic", "partition"],
+    registry=registry,
+)
+SAGA_DURATION = Histogram(
+    "checkout_saga_duration_seconds",
+    "Time from saga creation to its outcome (completed, failed or compensating)",
+    ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+    registry=registry,
+)
+
+SAGA_REPOSITORY_QUERY_LATENCY = Histogram(
+    "checkout_saga_repository_query_seconds",
+    "Latency of SagaRepository operations, by method",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=registry,
+)
+
+HTTP_CLIENT_LATENCY = Histogram(
+    "checkout_http_client_request_seconds",
+    "Latency of outgoing HTTP requests until the response headers arrive, by upstream host",
+    ["upstream", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry,
+)
+HTTP_CLIENT_ERRORS = Counter(
+    "checkout_http_client_errors",
+    "Outgoing HTTP requests that failed, by upstream host and reason (4xx, 5xx or the exception type)",
+    ["upstream", "reason"],
+    registry=registry,
+)
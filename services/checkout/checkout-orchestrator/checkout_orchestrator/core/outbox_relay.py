@@ -0,0 +1,87 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from aiokafka import AIOKafkaProducer
+from databases import Database
+
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+from .producer import PipelinedProducer
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Background task that drains the outbox table. Each batch is sent pipelined (all sends
+    are enqueued before any ack is awaited) and the rows are marked published once every
+    send of the batch has been acknowledged. Delivery is at-least-once: a crash between
+    the acks and the UPDATE re-sends the batch, which consumers dedupe by event_id.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        outbox_repository: OutboxRepository,
+        producer: AIOKafkaProducer,
+        batch_size: int = 500,
+        poll_interval_ms: int = 100,
+        retention: datetime.timedelta = datetime.timedelta(hours=24),
+    ):
+        self.database = database
+        self.outbox_repository = outbox_repository
+        self.producer = PipelinedProducer(producer)
+        self.batch_size = batch_size
+        self.poll_interval_ms = poll_interval_ms
+        self.retention = retention
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="outbox-relay")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        logger.info("Outbox relay started.")
+        while True:
+            try:
+                published = await self.relay_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Outbox relay failed, retrying: %s", e, exc_info=True)
+                published = 0
+            if published < self.batch_size:
+                # Caught up: purge old rows now and then, then wait for new commands
+                await self._purge_if_due()
+                await asyncio.sleep(self.poll_interval_ms / 1000)
+
+    async def relay_once(self) -> int:
+        """Publishes one batch of outbox rows and returns how many were sent."""
+        # The transaction holds the row locks (FOR UPDATE SKIP LOCKED on Postgres) until the batch is marked
+        async with self.database.transaction():
+            rows = await self.outbox_repository.fetch_unpublished(self.batch_size)
+            if not rows:
+                return 0
+            async with self.producer.batch() as batch:
+                for row in rows:
+                    await batch.send(row["topic"], row["payload"].encode("utf-8"), key=row["saga_id"].encode("utf-8"))
+            await self.outbox_repository.mark_published([row["id"] for row in rows])
+        logger.debug("Relayed %s outbox commands", len(rows))
+        return len(rows)
+
+    async def _purge_if_due(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if now - self._last_purge < datetime.timedelta(minutes=1):
+            return
+        self._last_purge = now
+        try:
+            await self.outbox_repository.delete_published_before(now - self.retention)
+        except Exception as e:
+            logger.error("Failed to purge published outbox rows: %s", e)
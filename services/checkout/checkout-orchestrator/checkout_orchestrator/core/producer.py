@@ -0,0 +1,77 @@
+import asyncio
+from typing import List, Optional
+
+from aiokafka import AIOKafkaProducer
+from pybreaker import CircuitBreaker
+
+# Create a circuit breaker for the Kafka producer
+kafka_breaker = CircuitBreaker(fail_max=5, reset_timeout=60)
+
+
+class ProducerBatch:
+    """
+    Sends issued through one batch are only enqueued in the producer's accumulator;
+    their acks are awaited together when the `async with` block exits, so a handler
+    publishing several commands pays for one broker round-trip instead of one per command.
+    The whole batch counts as a single call against the circuit breaker; errors raised by the
+    caller inside the block (encoding, cancellation) release it as a success, like pybreaker's
+    excluded exceptions, so only failed sends and acks can open it.
+    """
+
+    def __init__(self, producer: AIOKafkaProducer, breaker: CircuitBreaker):
+        self.producer = producer
+        self.breaker = breaker
+        self._futures: List[asyncio.Future] = []
+        self._guard = None
+        self._send_error: Optional[BaseException] = None
+
+    async def __aenter__(self) -> "ProducerBatch":
+        # Raises CircuitBreakerError right away while the breaker is open
+        self._guard = self.breaker.calling()
+        self._guard.__enter__()
+        return self
+
+    async def send(self, topic: str, value: bytes, key: Optional[bytes] = None):
+        try:
+            future = await self.producer.send(topic, value, key=key)
+        except Exception as error:
+            self._send_error = error
+            raise
+        self._futures.append(future)
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        futures, self._futures = self._futures, []
+        if exc_type is not None:
+            # The caller is failing anyway; do not leave unobserved futures behind
+            for future in futures:
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            if exc is not None and exc is self._send_error:
+                return self._guard.__exit__(exc_type, exc, tb)
+            self._guard.__exit__(None, None, None)
+            return False
+        try:
+            await asyncio.gather(*futures)
+        except Exception as error:
+            # Lets the breaker count the failed acks; it re-raises the error or a CircuitBreakerError
+            self._guard.__exit__(type(error), error, error.__traceback__)
+            raise
+        self._guard.__exit__(None, None, None)
+        return False
+
+
+class PipelinedProducer:
+    """Wraps AIOKafkaProducer so every send goes through `kafka_breaker` and can be pipelined."""
+
+    def __init__(self, producer: AIOKafkaProducer, breaker: CircuitBreaker = kafka_breaker):
+        self.producer = producer
+        self.breaker = breaker
+
+    def batch(self) -> ProducerBatch:
+        return ProducerBatch(self.producer, self.breaker)
+
+    async def send_and_wait(self, topic: str, value: bytes, key: Optional[bytes] = None):
+        async with self.batch() as batch:
+            await batch.send(topic, value, key=key)
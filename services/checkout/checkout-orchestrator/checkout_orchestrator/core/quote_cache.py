@@ -0,0 +1,107 @@
+import asyncio
+import collections
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from checkout_orchestrator.utils import json_codec
+from checkout_orchestrator.core.metrics import (
+    QUOTE_CACHE_COALESCED,
+    QUOTE_CACHE_EVICTIONS,
+    QUOTE_CACHE_HITS,
+    QUOTE_CACHE_MISSES,
+)
+
+
+def cart_quote_key(cart_id: str, user_id: str, items: List[Dict[str, Any]]) -> str:
+    """Canonical hash of a cart: the same cart content gives the same key whatever the item order."""
+    canonical_items = sorted(json_codec.dumps_sorted(item).decode("utf-8") for item in items)
+    return hashlib.sha256(json_codec.dumps([cart_id, user_id, canonical_items])).hexdigest()
+
+
+class _LoadAbandoned(Exception):
+    """Handed to coalesced waiters when the lookup they waited on was cancelled."""
+
+
+class QuoteCache:
+    """
+    TTL + LRU cache for pricing quotes (discount, tax) keyed by cart content.
+    Concurrent lookups of the same missing key share one upstream call.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # (kind, key) -> (expires_at, value), least recently used first
+        self._entries: "collections.OrderedDict[Tuple[str, str], Tuple[float, Any]]" = collections.OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, cache_key: Tuple[str, str]):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    def _put(self, cache_key: Tuple[str, str], value: Any):
+        self._entries[cache_key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            QUOTE_CACHE_EVICTIONS.inc()
+
+    async def get_or_load(self, kind: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        cache_key = (kind, key)
+        while True:
+            entry = self._get(cache_key)
+            if entry is not None:
+                QUOTE_CACHE_HITS.labels(kind).inc()
+                return entry[1]
+
+            in_flight = self._in_flight.get(cache_key)
+            if in_flight is None:
+                break
+            QUOTE_CACHE_COALESCED.labels(kind).inc()
+            try:
+                # shield: one cancelled waiter must not cancel the shared upstream call
+                return await asyncio.shield(in_flight)
+            except _LoadAbandoned:
+                # The caller doing the upstream call was cancelled; look again, loading ourselves if need be
+                continue
+
+        QUOTE_CACHE_MISSES.labels(kind).inc()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Cancelling the future would cancel every waiter along with us; they retry instead
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            # Failures are not cached; waiters see the same error and the next lookup retries
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self._put(cache_key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[cache_key]
+
@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SagaArchiver:
+    """
+    Background task that moves COMPLETED/FAILED sagas older than `max_age` from saga_states to
+    the archive table. Work is split into small transactions with a pause in between, so row
+    locks are only held for one batch and the consumer's writes interleave with the archiving.
+    """
+
+    def __init__(
+        self,
+        saga_repository: SagaRepository,
+        max_age: datetime.timedelta = datetime.timedelta(days=7),
+        batch_size: int = 1000,
+        interval_s: float = 300.0,
+        batch_pause_ms: int = 50,
+        lock_timeout_ms: int = 2000,
+    ):
+        self.saga_repository = saga_repository
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.interval_s = interval_s
+        self.batch_pause_ms = batch_pause_ms
+        self.lock_timeout_ms = lock_timeout_ms
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="saga-archiver")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        logger.info("Saga archiver started.")
+        while True:
+            try:
+                archived = await self.archive_once()
+                if archived:
+                    logger.info("Archived %s terminal sagas", archived)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Saga archiving failed, retrying later: %s", e, exc_info=True)
+            await asyncio.sleep(self.interval_s)
+
+    async def archive_once(self) -> int:
+        """Archives every terminal saga past the age limit, batch by batch, and returns how many were moved."""
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - self.max_age
+        await self.saga_repository.ensure_archive_partitions(cutoff)
+        total = 0
+        while True:
+            moved = await self.saga_repository.archive_terminal_batch(cutoff, self.batch_size, self.lock_timeout_ms)
+            total += moved
+            if moved < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_pause_ms / 1000)
@@ -0,0 +1,62 @@
+import collections
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.metrics import (
+    SAGA_CACHE_EVICTIONS,
+    SAGA_CACHE_HITS,
+    SAGA_CACHE_MISSES,
+    SAGA_CACHE_SIZE,
+)
+
+
+class SagaStateCache:
+    """
+    Write-through LRU cache of the saga states this consumer instance persisted last.
+    Entries are only put after the saga's transaction committed, so the cache never runs
+    ahead of the database. It relies on this instance owning the partitions the saga's
+    events arrive on: the consumer clears it whenever partitions are revoked.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "collections.OrderedDict[str, SagaState]" = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, saga_id: str) -> Optional[SagaState]:
+        saga_state = self._entries.get(saga_id)
+        if saga_state is None:
+            SAGA_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(saga_id)
+        SAGA_CACHE_HITS.inc()
+        return saga_state
+
+    def get_many(self, saga_ids: Iterable[str]) -> Tuple[Dict[str, SagaState], List[str]]:
+        """Returns the cached sagas and the ids that have to be loaded from the database."""
+        found, missing = {}, []
+        for saga_id in dict.fromkeys(saga_ids):
+            saga_state = self.get(saga_id)
+            if saga_state is None:
+                missing.append(saga_id)
+            else:
+                found[saga_id] = saga_state
+        return found, missing
+
+    def put(self, saga_state: SagaState):
+        self._entries[saga_state.id] = saga_state
+        self._entries.move_to_end(saga_state.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            SAGA_CACHE_EVICTIONS.inc()
+        SAGA_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate(self, saga_id: str):
+        self._entries.pop(saga_id, None)
+        SAGA_CACHE_SIZE.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        SAGA_CACHE_SIZE.set(0)
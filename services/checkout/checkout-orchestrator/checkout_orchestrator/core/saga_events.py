@@ -0,0 +1,122 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from checkout_orchestrator.api.schemas.checkout import CheckoutStatus
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.metrics import SAGA_STATUS_SUBSCRIBERS, SAGA_STATUS_UPDATES_DROPPED
+from checkout_orchestrator.core.saga_status import checkout_status
+
+
+class SagaSubscription:
+    """Status updates of one saga for one listener. Only the latest updates are kept for a slow reader."""
+
+    def __init__(self, bus: "SagaEventBus", saga_id: str, queue_size: int):
+        self.bus = bus
+        self.saga_id = saga_id
+        self._queue: "asyncio.Queue[CheckoutStatus]" = asyncio.Queue(maxsize=queue_size)
+
+    def _offer(self, status: CheckoutStatus):
+        if self._queue.full():
+            # Every snapshot supersedes the previous one, so dropping the oldest loses nothing that matters
+            self._queue.get_nowait()
+            SAGA_STATUS_UPDATES_DROPPED.inc()
+        self._queue.put_nowait(status)
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[CheckoutStatus]:
+        """The next update, or None when none arrived within `timeout` seconds."""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+    def __enter__(self) -> "SagaSubscription":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SagaEventBus:
+    """
+    In-process pub/sub of saga status changes. The consumer publishes every committed saga update;
+    status streams subscribe per saga id. Publishing to a saga nobody listens to costs a dict lookup.
+    """
+
+    def __init__(self, queue_size: int = 16):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[SagaSubscription]] = {}
+
+    def subscribe(self, saga_id: str) -> SagaSubscription:
+        subscription = SagaSubscription(self, saga_id, self.queue_size)
+        self._subscriptions.setdefault(saga_id, set()).add(subscription)
+        SAGA_STATUS_SUBSCRIBERS.inc()
+        return subscription
+
+    def _unsubscribe(self, subscription: SagaSubscription):
+        subscriptions = self._subscriptions.get(subscription.saga_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.saga_id]
+        SAGA_STATUS_SUBSCRIBERS.dec()
+
+    def has_subscribers(self, saga_id: str) -> bool:
+        return saga_id in self._subscriptions
+
+    def publish(self, saga_state: SagaState, status: Optional[CheckoutStatus] = None):
+        subscriptions = self._subscriptions.get(saga_state.id)
+        if not subscriptions:
+            return
+        status = status or checkout_status(saga_state)
+        for subscription in subscriptions:
+            subscription._offer(status)
+
+
+# No transition leaves these states, so a status stream ends once it has sent one of them
+_STREAM_END_STATES = frozenset(("COMPLETED", "FAILED", "COMPENSATING"))
+
+
+def _frame(status: CheckoutStatus) -> str:
+    return f"event: status\ndata: {status.model_dump_json()}\n\n"
+
+
+async def status_event_stream(
+    subscription: SagaSubscription,
+    status: CheckoutStatus,
+    reload: Callable[[], Awaitable[Optional[CheckoutStatus]]],
+    heartbeat_seconds: float = 15.0,
+    max_stream_seconds: float = 900.0,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events body of one saga's status stream: the current status, then every change published
+    on the bus. When the bus stays quiet for `heartbeat_seconds` the status is re-read through `reload`,
+    which catches sagas advanced by another instance, and a keepalive comment is sent if nothing changed.
+    The subscription must be taken before `status` is read so no update falls in between.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_stream_seconds
+    try:
+        yield _frame(status)
+        while status.status not in _STREAM_END_STATES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                # Clients reconnect and pick up the current status again
+                return
+            update = await subscription.next(timeout=min(heartbeat_seconds, remaining))
+            if update is None:
+                update = await reload()
+                if update is None or update == status:
+                    yield ": keepalive\n\n"
+                    continue
+            if update == status or update.updated_at < status.updated_at:
+                continue
+            status = update
+            yield _frame(status)
+    finally:
+        subscription.close()
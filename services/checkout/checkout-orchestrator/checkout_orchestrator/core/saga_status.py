@@ -0,0 +1,109 @@
+import asyncio
+import collections
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from checkout_orchestrator.api.schemas.checkout import CheckoutStatus
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.metrics import SAGA_STATUS_LOOKUPS
+
+# Final states: their snapshot never changes again
+_FINAL_STATES = frozenset(("COMPLETED", "FAILED"))
+
+
+def checkout_status(saga_state: SagaState) -> CheckoutStatus:
+    order_details = saga_state.context.get("order_details") or {}
+    return CheckoutStatus(
+        saga_id=saga_state.id,
+        status=saga_state.state,
+        current_step=saga_state.context.get("current_step"),
+        errors=list(saga_state.context.get("errors") or []),
+        order_id=order_details.get("order_id") if isinstance(order_details, dict) else None,
+        created_at=saga_state.created_at,
+        updated_at=saga_state.updated_at,
+    )
+
+
+class SagaStatusCache:
+    """
+    Read path of GET /api/checkout/{saga_id}. Holds immutable status snapshots: the API puts the initial
+    one, the consumer puts one after every committed saga update, and misses (sagas advanced by another
+    instance, expired entries) are read from the database, with concurrent reads of one saga coalesced.
+    In-progress snapshots expire after `ttl_seconds` so pollers never lag far behind other instances;
+    final ones are kept for `final_ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 1.0,
+        final_ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.final_ttl_seconds = final_ttl_seconds
+        self.clock = clock
+        # saga_id -> (expires_at, status), least recently used first
+        self._entries: "collections.OrderedDict[str, Tuple[float, CheckoutStatus]]" = collections.OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, saga_id: str) -> Optional[CheckoutStatus]:
+        entry = self._entries.get(saga_id)
+        if entry is None:
+            return None
+        expires_at, status = entry
+        if expires_at <= self.clock():
+            del self._entries[saga_id]
+            return None
+        self._entries.move_to_end(saga_id)
+        return status
+
+    def put(self, saga_state: SagaState) -> CheckoutStatus:
+        status = checkout_status(saga_state)
+        current = self._entries.get(saga_state.id)
+        if current is not None and current[1].updated_at > status.updated_at:
+            # A slow database read must not replace a newer snapshot put by the consumer
+            return current[1]
+        ttl = self.final_ttl_seconds if status.status in _FINAL_STATES else self.ttl_seconds
+        self._entries[saga_state.id] = (self.clock() + ttl, status)
+        self._entries.move_to_end(saga_state.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return status
+
+    def evict(self, saga_id: str):
+        self._entries.pop(saga_id, None)
+
+    async def get_or_load(
+        self, saga_id: str, loader: Callable[[], Awaitable[Optional[SagaState]]]
+    ) -> Optional[CheckoutStatus]:
+        status = self.get(saga_id)
+        if status is not None:
+            SAGA_STATUS_LOOKUPS.labels("hit").inc()
+            return status
+
+        in_flight = self._in_flight.get(saga_id)
+        if in_flight is not None:
+            SAGA_STATUS_LOOKUPS.labels("coalesced").inc()
+        else:
+            SAGA_STATUS_LOOKUPS.labels("miss").inc()
+            in_flight = asyncio.ensure_future(self._load(saga_id, loader))
+            # Nobody may be left to retrieve a failure
+            in_flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._in_flight[saga_id] = in_flight
+        # shield: one disconnecting poller, the one that started the read included, must not cancel the shared read
+        return await asyncio.shield(in_flight)
+
+    async def _load(
+        self, saga_id: str, loader: Callable[[], Awaitable[Optional[SagaState]]]
+    ) -> Optional[CheckoutStatus]:
+        try:
+            saga_state = await loader()
+            # Unknown ids are not cached: the saga may be committed by the time the client retries
+            return self.put(saga_state) if saga_state is not None else None
+        finally:
+            del self._in_flight[saga_id]
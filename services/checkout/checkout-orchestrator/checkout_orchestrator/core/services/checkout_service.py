@@ -2,11 +2,12 @@ import httpx # Keep httpx for now as it's still used in this version.
 from databases import Database
 from aiokafka import AIOKafkaProducer
 from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+from checkout_orchestrator.infrastructure.repositories.idempotency_repository import IdempotencyRepository
 from checkout_orchestrator.api.schemas.saga import SagaState
 from checkout_orchestrator.api.schemas.checkout import CheckoutRequest
 import datetime
-import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import uuid # For generating saga IDs
 
 # Import generated protobuf classes
@@ -21,33 +22,83 @@ KAFKA_TOPIC_ORDER_COMMAND = "checkout.order-command"
 KAFKA_TOPIC_CART_COMMAND = "checkout.cart-command"
 KAFKA_TOPIC_CHECKOUT_EVENTS = "checkout.checkout-events" # For events like InventoryReserved, PaymentProcessed, OrderCreated etc.
 
-from pybreaker import CircuitBreaker
 from pybreaker import CircuitBreakerError
-
-# Create a circuit breaker for the Kafka producer
-kafka_breaker = CircuitBreaker(fail_max=5, reset_timeout=60)
+from checkout_orchestrator.core.admission import AdmissionController
+from checkout_orchestrator.core.checkout_spool import CheckoutSpool, SpoolFull
+from checkout_orchestrator.core.idempotency import IdempotencyKeyConflict, checkout_idempotency_key, checkout_request_hash
+from checkout_orchestrator.core.metrics import CHECKOUT_IDEMPOTENT_REPLAYS
+from checkout_orchestrator.core.producer import PipelinedProducer, kafka_breaker
+from checkout_orchestrator.core.saga_status import SagaStatusCache
+from checkout_orchestrator.utils import json_codec
 
 class CheckoutService:
     def __init__(
         self,
         database: Database,
         producer: AIOKafkaProducer,
-        saga_repository: SagaRepository
+        saga_repository: SagaRepository,
+        outbox_repository: OutboxRepository = None,
+        status_cache: SagaStatusCache = None,
+        idempotency_repository: IdempotencyRepository = None,
+        idempotency_ttl: datetime.timedelta = datetime.timedelta(hours=24),
+        derived_idempotency_ttl: datetime.timedelta = datetime.timedelta(minutes=10),
+        admission_controller: AdmissionController = None,
+        spool: CheckoutSpool = None,
     ):
         self.database = database
         self.producer = producer
+        # Applies kafka_breaker to every send (the decorator alone never saw async failures)
+        self.pipelined_producer = PipelinedProducer(producer, kafka_breaker)
         self.saga_repository = saga_repository
+        # With an outbox, CheckoutInitiated is stored with the saga row and published by the OutboxRelay
+        self.outbox_repository = outbox_repository
+        # Seeded with the initial state so the client's first status poll is answered from memory
+        self.status_cache = status_cache
+        # Turns duplicate submissions into the saga of the first one. Keys derived from the cart content
+        # live shorter than client-chosen ones: they only have to cover double clicks and retries.
+        self.idempotency_repository = idempotency_repository
+        self.idempotency_ttl = idempotency_ttl
+        self.derived_idempotency_ttl = derived_idempotency_ttl
+        # Sheds new checkouts (CheckoutRejected) while the orchestrator is overloaded or a user floods it
+        self.admission_controller = admission_controller
+        # Takes CheckoutInitiated when it cannot be published, so the saga still starts once Kafka is back
+        self.spool = spool
         # These URLs would come from a config service in a real app
         self.cart_service_url = "http://localhost:3001"
         self.inventory_service_url = "http://localhost:8085"
         self.payment_service_url = "http://localhost:8086"
         self.order_service_url = "http://localhost:8087"
 
-    @kafka_breaker
-    async def publish_to_kafka(self, topic, payload):
-        await self.producer.send_and_wait(topic, payload)
+    async def publish_to_kafka(self, topic, payload, key=None):
+        await self.pipelined_producer.send_and_wait(topic, payload, key=key)
+
+    async def start_checkout_saga(
+        self, cart_id: str, user_id: str, cart_details: Dict[str, Any], idempotency_key: Optional[str] = None
+    ) -> str:
+        """
+        Returns the id of the new saga, or of the saga an earlier identical submission started. Raises
+        IdempotencyKeyConflict when `idempotency_key` was used for a different request, and
+        CheckoutRejected when admission control sheds the checkout.
+        With an outbox this returns once the saga row is committed. Without one it also waits for Kafka to
+        acknowledge CheckoutInitiated (or for the spool to take it); if neither does, the saga is removed
+        again and the error is raised.
+        """
+        claim = None
+        if self.idempotency_repository is not None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            request_hash = checkout_request_hash(user_id, cart_id, cart_details)
+            key = checkout_idempotency_key(user_id, request_hash, idempotency_key)
+            source = "header" if idempotency_key is not None else "derived"
+            # Duplicates normally stop here, before anything is written
+            existing = await self.idempotency_repository.get(key, now)
+            if existing is not None:
+                return self._replay(existing, request_hash, source)
+            ttl = self.idempotency_ttl if idempotency_key is not None else self.derived_idempotency_ttl
+            claim = (key, request_hash, source, now, now + ttl)
+        # After the duplicate check: replaying an existing saga costs nothing and is never shed
+        if self.admission_controller is not None:
+            self.admission_controller.check(user_id)
 
-    async def start_checkout_saga(self, cart_id: str, user_id: str, cart_details: Dict[str, Any]) -> str:
         saga_id = str(uuid.uuid4()) # Generate a unique saga ID
 
         # Initial saga context
@@ -67,32 +118,88 @@ class CheckoutService:
             created_at=datetime.datetime.now(datetime.timezone.utc),
             updated_at=datetime.datetime.now(datetime.timezone.utc),
         )
-        await self.saga_repository.create(initial_saga_state)
 
         # Publish CheckoutInitiated event to Kafka
         # This event will kick off the first step of the saga (e.g., Inventory Reservation)
         # For simplicity, sending a dict as JSON. In real app, use Protobuf.
         checkout_initiated_payload = {
+            "type": "CheckoutInitiated", # The consumer dispatches on this
             "saga_id": saga_id,
+            "event_id": str(uuid.uuid4()),
             "user_id": user_id,
             "cart_id": cart_id,
             "cart_details": cart_details,
             "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
         }
+        # The key is claimed with the saga row: a racing duplicate that loses the claim writes nothing
+        async with self.database.transaction():
+            if claim is not None:
+                key, request_hash, source, now, expires_at = claim
+                owner = await self.idempotency_repository.claim(key, saga_id, request_hash, now, expires_at)
+                if owner["saga_id"] != saga_id:
+                    return self._replay(owner, request_hash, source)
+            await self.saga_repository.create(initial_saga_state)
+            if self.outbox_repository is not None:
+                # The saga row and its first event commit together; nothing waits for the broker
+                await self.outbox_repository.add_many(
+                    saga_id, [(KAFKA_TOPIC_CHECKOUT_INITIATED, checkout_initiated_payload)]
+                )
+        self._cache_status(initial_saga_state)
+        if self.outbox_repository is not None:
+            return saga_id
+
         try:
             await self.publish_to_kafka(
                 KAFKA_TOPIC_CHECKOUT_INITIATED,
-                json.dumps(checkout_initiated_payload).encode('utf-8')
+                json_codec.dumps(checkout_initiated_payload),
+                key=saga_id.encode('utf-8'),
             )
             print(f"Checkout saga {saga_id} initiated and event published.")
-        except CircuitBreakerError:
-            # Handle the circuit breaker being open
-            # For example, you could log an error, or try to enqueue the request for later
-            print(f"Circuit breaker is open for Kafka producer. Could not initiate checkout saga {saga_id}.")
+        except Exception as e:
+            # Breaker open or broker failing: the spooled event is published by the SpoolDrainer later
+            if self.spool is not None and await self._spool(saga_id, checkout_initiated_payload):
+                return saga_id
+            if isinstance(e, CircuitBreakerError):
+                print(f"Circuit breaker is open for Kafka producer. Could not initiate checkout saga {saga_id}.")
+            try:
+                await self._discard_saga(claim, saga_id)
+            except Exception as cleanup_error:
+                print(f"Could not remove checkout saga {saga_id} after a failed start: {cleanup_error}")
             raise
 
         return saga_id
 
+    def _replay(self, owner, request_hash: str, source: str) -> str:
+        if owner["request_hash"] != request_hash:
+            raise IdempotencyKeyConflict(owner["saga_id"])
+        CHECKOUT_IDEMPOTENT_REPLAYS.labels(source).inc()
+        return owner["saga_id"]
+
+    async def _spool(self, saga_id: str, payload: Dict[str, Any]) -> bool:
+        try:
+            await self.spool.append(saga_id, KAFKA_TOPIC_CHECKOUT_INITIATED, payload)
+        except SpoolFull as e:
+            print(f"{e}. Could not initiate checkout saga {saga_id}.")
+            return False
+        except Exception as e:
+            print(f"Could not spool checkout saga {saga_id}: {e}")
+            return False
+        print(f"Kafka unavailable, checkout saga {saga_id} spooled for later publishing.")
+        return True
+
+    async def _discard_saga(self, claim, saga_id: str):
+        # The client only gets an error: the row must not wait for the timeout sweep, nor answer a retry
+        async with self.database.transaction():
+            await self.saga_repository.delete(saga_id)
+            if claim is not None:
+                await self.idempotency_repository.release(claim[0], saga_id)
+        if self.status_cache is not None:
+            self.status_cache.evict(saga_id)
+
+    def _cache_status(self, saga_state: SagaState):
+        if self.status_cache is not None:
+            self.status_cache.put(saga_state)
+
     # The rest of the saga orchestration logic will be implemented in a Kafka consumer
     # that reacts to events like InventoryReserved, PaymentProcessed etc.
     async def perform_checkout(self, cart_id: str, user_id: str) -> dict:
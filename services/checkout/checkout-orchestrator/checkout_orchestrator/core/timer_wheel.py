@@ -0,0 +1,79 @@
+import math
+from typing import Dict, Hashable, List, Optional, Set
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: scheduling, rescheduling and cancelling a key are O(1), and advancing
+    only looks at the slots the clock moved across. Deadlines further away than one revolution
+    stay in their slot until the clock actually reaches them.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512):
+        if tick_seconds <= 0 or slots < 1:
+            raise ValueError("tick_seconds must be > 0 and slots >= 1")
+        self.tick_seconds = tick_seconds
+        self.slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        # key -> deadline; the single source of truth, a slot entry without a matching deadline is stale
+        self._deadlines: Dict[Hashable, float] = {}
+        self._current_tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def _tick(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.tick_seconds)
+
+    def _deadline_tick(self, deadline: float) -> int:
+        # The first tick at or after the deadline, so every key in a visited slot of this revolution is due
+        return math.ceil(deadline / self.tick_seconds)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Schedules `key` to expire at `deadline` (same clock as `advance`), replacing any earlier deadline."""
+        self.cancel(key)
+        self._deadlines[key] = deadline
+        tick = self._deadline_tick(deadline)
+        if self._current_tick is not None and tick <= self._current_tick:
+            # Already due: put it in the next slot advance() looks at
+            tick = self._current_tick + 1
+        self.slots[tick % len(self.slots)].add(key)
+
+    def cancel(self, key: Hashable):
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            for slot in self._candidate_slots(deadline):
+                slot.discard(key)
+
+    def _candidate_slots(self, deadline: float):
+        tick = self._deadline_tick(deadline)
+        yield self.slots[tick % len(self.slots)]
+        if self._current_tick is not None and tick <= self._current_tick:
+            yield self.slots[(self._current_tick + 1) % len(self.slots)]
+
+    def clear(self):
+        for slot in self.slots:
+            slot.clear()
+        self._deadlines.clear()
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Moves the clock to `now` and returns the keys whose deadline has passed."""
+        now_tick = self._tick(now)
+        # One revolution at most visits every slot once, however long the clock was stalled
+        start = now_tick - len(self.slots) + 1
+        if self._current_tick is not None:
+            if now_tick <= self._current_tick:
+                return []
+            start = max(start, self._current_tick + 1)
+        expired = []
+        for tick in range(start, now_tick + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key in list(slot):
+                if self._deadlines.get(key, math.inf) <= now:
+                    slot.discard(key)
+                    del self._deadlines[key]
+                    expired.append(key)
+        self._current_tick = now_tick
+        return expired
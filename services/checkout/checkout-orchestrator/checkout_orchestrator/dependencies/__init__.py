@@ -1,9 +1,50 @@
 from databases import Database
+from fastapi import Depends, Header, HTTPException
 from aiokafka import AIOKafkaProducer
-import httpx
+from ..core.admission import AdmissionController, db_pool_saturation
+from ..core.checkout_spool import CheckoutSpool
+from ..core.producer import kafka_breaker
+from ..core.saga_events import SagaEventBus
+from ..core.saga_status import SagaStatusCache
 from ..core.services.checkout_service import CheckoutService
 from ..infrastructure.repositories.saga_repository import SagaRepository
-from ..core.config import database, kafka_producer, httpx_client # Import the shared instances
+from ..infrastructure.repositories.outbox_repository import OutboxRepository
+from ..infrastructure.repositories.idempotency_repository import IdempotencyRepository
+import datetime
+import hmac
+from typing import Optional
+import checkout_orchestrator.core.config as config
+from ..core.config import database, kafka_producer # Import the shared instances
+
+# Shared by the checkout endpoints and the consumer, which refreshes it after every committed saga update
+saga_status_cache = SagaStatusCache(
+    max_entries=config.SAGA_STATUS_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.SAGA_STATUS_CACHE_TTL_MS / 1000,
+    final_ttl_seconds=config.SAGA_STATUS_FINAL_TTL_SECONDS,
+)
+# The consumer publishes committed saga updates here; status streams subscribe to it
+saga_event_bus = SagaEventBus(queue_size=config.SAGA_EVENTS_QUEUE_SIZE)
+# Opened by main at startup; holds CheckoutInitiated events while Kafka is unavailable
+checkout_spool = (
+    CheckoutSpool(config.CHECKOUT_SPOOL_PATH, max_entries=config.CHECKOUT_SPOOL_MAX_ENTRIES)
+    if config.CHECKOUT_SPOOL_ENABLED and not config.USE_OUTBOX
+    else None
+)
+# Shared by every intake (HTTP and gRPC); main hooks up the consumer lag once the consumer exists
+admission_controller = AdmissionController(
+    global_rate=config.ADMISSION_GLOBAL_RATE,
+    global_burst=config.ADMISSION_GLOBAL_BURST,
+    user_rate=config.ADMISSION_USER_RATE,
+    user_burst=config.ADMISSION_USER_BURST,
+    max_users=config.ADMISSION_MAX_TRACKED_USERS,
+    max_consumer_lag=config.ADMISSION_MAX_CONSUMER_LAG,
+    max_db_pool_saturation=config.ADMISSION_MAX_DB_POOL_SATURATION,
+    overload_retry_after_s=config.ADMISSION_OVERLOAD_RETRY_AFTER_SECONDS,
+    max_spool_backlog=config.CHECKOUT_SPOOL_MAX_ENTRIES,
+    db_pool_saturation=lambda: db_pool_saturation(database),
+    spool_backlog=(lambda: checkout_spool.backlog) if checkout_spool is not None else None,
+    breaker=kafka_breaker if checkout_spool is None else None,
+) if config.ADMISSION_CONTROL_ENABLED else None
 
 async def get_database() -> Database:
     return database
@@ -17,20 +58,38 @@ async def get_saga_repository() -> SagaRepository:
     # create_saga_table is now called in main.py startup event
     return repo
 
+async def get_saga_status_cache() -> SagaStatusCache:
+    return saga_status_cache
+
+async def get_saga_event_bus() -> SagaEventBus:
+    return saga_event_bus
+
+async def require_admin_token(authorization: Optional[str] = Header(None)):
+    # The admin endpoints change what the consumer logs, so they are never open to whoever reaches the API
+    if not config.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_API_TOKEN to enable it.")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), config.ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token.", headers={"WWW-Authenticate": "Bearer"})
+
+def create_checkout_service(db: Database, producer: AIOKafkaProducer, saga_repo: SagaRepository) -> CheckoutService:
+    # Used by the HTTP endpoints and the gRPC server alike, so both start sagas the same way
+    return CheckoutService(
+        db,
+        producer,
+        saga_repo,
+        outbox_repository=OutboxRepository(db) if config.USE_OUTBOX else None,
+        status_cache=saga_status_cache,
+        idempotency_repository=IdempotencyRepository(db) if config.CHECKOUT_IDEMPOTENCY_ENABLED else None,
+        idempotency_ttl=datetime.timedelta(hours=config.CHECKOUT_IDEMPOTENCY_TTL_HOURS),
+        derived_idempotency_ttl=datetime.timedelta(seconds=config.CHECKOUT_DERIVED_IDEMPOTENCY_TTL_SECONDS),
+        admission_controller=admission_controller,
+        spool=checkout_spool,
+    )
+
 async def get_checkout_service(
-    db: Database = None,
-    producer: AIOKafkaProducer = None,
-    saga_repo: SagaRepository = None,
-    client: httpx.AsyncClient = None # Add client parameter
+    db: Database = Depends(get_database),
+    producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    saga_repo: SagaRepository = Depends(get_saga_repository),
 ) -> CheckoutService:
-    # Use global instances if not provided (expected in actual app run)
-    if db is None:
-        db = database
-    if producer is None:
-        producer = kafka_producer
-    if saga_repo is None:
-        saga_repo = await get_saga_repository()
-    if client is None: # Use the global httpx_client from config if not provided
-        client = httpx_client
-    
-    return CheckoutService(db, producer, saga_repo, client) # Pass client to CheckoutService
\ No newline at end of file
+    return create_checkout_service(db, producer, saga_repo)
@@ -0,0 +1,35 @@
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import grpc
+
+from checkout_orchestrator import cart_pb2, cart_pb2_grpc
+
+# Carts have no id of their own (one per user), so the saga context gets a stable one derived from the user
+_CART_ID_NAMESPACE = uuid.UUID("1b5d2f6c-8f0e-4c43-9a55-3f1d0c6f4a21")
+
+
+def cart_id_for_user(user_id: str) -> str:
+    return str(uuid.uuid5(_CART_ID_NAMESPACE, user_id))
+
+
+class CartClient:
+    """Reads a user's cart from the cart-crud CartService over gRPC, for checkouts started by user id only."""
+
+    def __init__(self, target: str, timeout_s: float = 2.0, channel: Optional[grpc.aio.Channel] = None):
+        self.channel = channel or grpc.aio.insecure_channel(target)
+        self.stub = cart_pb2_grpc.CartServiceStub(self.channel)
+        self.timeout_s = timeout_s
+
+    async def load_cart(self, user_id: str) -> Tuple[str, Dict[str, Any]]:
+        """(cart_id, cart_details) in the shape POST /api/checkout accepts; prices are in cents."""
+        response = await self.stub.GetCart(cart_pb2.GetCartRequest(user_id=user_id), timeout=self.timeout_s)
+        items = [
+            {"product_id": item.product_id, "quantity": item.quantity, "price_cents": item.price_cents}
+            for item in response.cart.items
+        ]
+        total_price = sum(item["price_cents"] * item["quantity"] for item in items)
+        return cart_id_for_user(user_id), {"items": items, "total_price": total_price}
+
+    async def close(self):
+        await self.channel.close()
@@ -0,0 +1,82 @@
+from databases import Database
+from databases.interfaces import Record
+import datetime
+from typing import Optional
+
+class IdempotencyRepository:
+    """
+    Checkout submissions already turned into a saga, keyed by idempotency key (primary key) until they
+    expire. A claim is an upsert that only replaces expired rows, so of two racing duplicates exactly one
+    owns the key and the other reads the winner's saga id, on SQLite and Postgres alike.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def create_idempotency_table(self):
+        query = """
+        CREATE TABLE IF NOT EXISTS checkout_idempotency_keys (
+            idempotency_key VARCHAR(255) PRIMARY KEY,
+            saga_id VARCHAR(255) NOT NULL,
+            request_hash VARCHAR(64) NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        );
+        """
+        await self.database.execute(query)
+        await self.database.execute(
+            "CREATE INDEX IF NOT EXISTS idx_checkout_idempotency_keys_expires_at "
+            "ON checkout_idempotency_keys (expires_at)"
+        )
+
+    async def get(self, idempotency_key: str, now: datetime.datetime) -> Optional[Record]:
+        """The live (saga_id, request_hash) of the key, or None when it is unknown or expired."""
+        query = """
+        SELECT saga_id, request_hash FROM checkout_idempotency_keys
+        WHERE idempotency_key = :idempotency_key AND expires_at > :now
+        """
+        return await self.database.fetch_one(query, {"idempotency_key": idempotency_key, "now": now})
+
+    async def claim(
+        self,
+        idempotency_key: str,
+        saga_id: str,
+        request_hash: str,
+        now: datetime.datetime,
+        expires_at: datetime.datetime,
+    ) -> Record:
+        """Claims the key for `saga_id` unless a live claim exists; returns the (saga_id, request_hash) owning it."""
+        query = """
+        INSERT INTO checkout_idempotency_keys (idempotency_key, saga_id, request_hash, created_at, expires_at)
+        VALUES (:idempotency_key, :saga_id, :request_hash, :now, :expires_at)
+        ON CONFLICT (idempotency_key) DO UPDATE SET
+            saga_id = excluded.saga_id,
+            request_hash = excluded.request_hash,
+            created_at = excluded.created_at,
+            expires_at = excluded.expires_at
+        WHERE checkout_idempotency_keys.expires_at <= :now
+        """
+        await self.database.execute(
+            query,
+            {
+                "idempotency_key": idempotency_key,
+                "saga_id": saga_id,
+                "request_hash": request_hash,
+                "now": now,
+                "expires_at": expires_at,
+            },
+        )
+        return await self.database.fetch_one(
+            "SELECT saga_id, request_hash FROM checkout_idempotency_keys WHERE idempotency_key = :idempotency_key",
+            {"idempotency_key": idempotency_key},
+        )
+
+    async def release(self, idempotency_key: str, saga_id: str):
+        """Frees the key again, for a saga that could not be started, so a retry is not sent to it."""
+        await self.database.execute(
+            "DELETE FROM checkout_idempotency_keys WHERE idempotency_key = :idempotency_key AND saga_id = :saga_id",
+            {"idempotency_key": idempotency_key, "saga_id": saga_id},
+        )
+
+    async def prune_expired(self, now: datetime.datetime):
+        await self.database.execute("DELETE FROM checkout_idempotency_keys WHERE expires_at <= :now", {"now": now})
@@ -0,0 +1,73 @@
+from databases import Database
+from databases.interfaces import Record
+from checkout_orchestrator.utils import json_codec
+import datetime
+from typing import Any, Dict, List, Tuple
+
+class OutboxRepository:
+    """
+    Saga commands waiting to be published to Kafka. Rows are inserted in the same
+    transaction as the saga_states update and drained by the OutboxRelay.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self.database.url.dialect == "postgresql"
+
+    async def create_outbox_table(self):
+        id_column = "BIGSERIAL PRIMARY KEY" if self._is_postgres else "INTEGER PRIMARY KEY AUTOINCREMENT"
+        query = f"""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id {id_column},
+            saga_id VARCHAR(255) NOT NULL,
+            topic VARCHAR(255) NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            published_at TIMESTAMP NULL
+        );
+        """
+        await self.database.execute(query)
+        # The relay only ever looks at unpublished rows, so keep that index small
+        await self.database.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_unpublished ON outbox (id) WHERE published_at IS NULL"
+        )
+
+    async def add_many(self, saga_id: str, commands: List[Tuple[str, Dict[str, Any]]]):
+        if not commands:
+            return
+        query = """
+        INSERT INTO outbox (saga_id, topic, payload, created_at)
+        VALUES (:saga_id, :topic, :payload, :created_at)
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        await self.database.execute_many(
+            query,
+            [
+                {"saga_id": saga_id, "topic": topic, "payload": json_codec.dumps_str(payload), "created_at": now}
+                for topic, payload in commands
+            ],
+        )
+
+    async def fetch_unpublished(self, limit: int) -> List[Record]:
+        query = "SELECT id, saga_id, topic, payload FROM outbox WHERE published_at IS NULL ORDER BY id LIMIT :limit"
+        if self._is_postgres:
+            # Lets several orchestrator replicas relay concurrently without sending the same row twice
+            query += " FOR UPDATE SKIP LOCKED"
+        return await self.database.fetch_all(query, {"limit": limit})
+
+    async def mark_published(self, ids: List[int]):
+        if not ids:
+            return
+        placeholders = ", ".join(f":id_{i}" for i in range(len(ids)))
+        query = f"UPDATE outbox SET published_at = :published_at WHERE id IN ({placeholders})"
+        values: Dict[str, Any] = {f"id_{i}": outbox_id for i, outbox_id in enumerate(ids)}
+        values["published_at"] = datetime.datetime.now(datetime.timezone.utc)
+        await self.database.execute(query, values)
+
+    async def delete_published_before(self, cutoff: datetime.datetime):
+        await self.database.execute(
+            "DELETE FROM outbox WHERE published_at IS NOT NULL AND published_at < :cutoff", {"cutoff": cutoff}
+        )
@@ -0,0 +1,59 @@
+from databases import Database
+import datetime
+from typing import Iterable, List, Set, Tuple
+
+class ProcessedEventRepository:
+    """
+    Idempotency store for consumed saga events. One row per (saga_id, event_id), looked up
+    through the primary key, so checking an event costs the same however long the saga lives.
+    Rows older than the retention window are pruned; by then Kafka will not redeliver them.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def create_processed_events_table(self):
+        query = """
+        CREATE TABLE IF NOT EXISTS processed_events (
+            saga_id VARCHAR(255) NOT NULL,
+            event_id VARCHAR(255) NOT NULL,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (saga_id, event_id)
+        );
+        """
+        await self.database.execute(query)
+        await self.database.execute(
+            "CREATE INDEX IF NOT EXISTS idx_processed_events_processed_at ON processed_events (processed_at)"
+        )
+
+    async def exists(self, saga_id: str, event_id: str) -> bool:
+        query = "SELECT 1 FROM processed_events WHERE saga_id = :saga_id AND event_id = :event_id"
+        return await self.database.fetch_one(query, {"saga_id": saga_id, "event_id": event_id}) is not None
+
+    async def existing(self, keys: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """Returns which of the given (saga_id, event_id) pairs were already processed, in one query."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return set()
+        placeholders = ", ".join(f"(:saga_id_{i}, :event_id_{i})" for i in range(len(keys)))
+        values = {}
+        for i, (saga_id, event_id) in enumerate(keys):
+            values[f"saga_id_{i}"] = saga_id
+            values[f"event_id_{i}"] = event_id
+        query = f"SELECT saga_id, event_id FROM processed_events WHERE (saga_id, event_id) IN ({placeholders})"
+        rows = await self.database.fetch_all(query, values)
+        return {(row["saga_id"], row["event_id"]) for row in rows}
+
+    async def add_many(self, keys: List[Tuple[str, str]]):
+        # A duplicate (saga_id, event_id) violates the primary key and rolls back the caller's transaction,
+        # which is what we want when two consumers race on the same event.
+        if not keys:
+            return
+        query = "INSERT INTO processed_events (saga_id, event_id, processed_at) VALUES (:saga_id, :event_id, :processed_at)"
+        now = datetime.datetime.now(datetime.timezone.utc)
+        await self.database.execute_many(
+            query, [{"saga_id": saga_id, "event_id": event_id, "processed_at": now} for saga_id, event_id in keys]
+        )
+
+    async def prune_before(self, cutoff: datetime.datetime):
+        await self.database.execute("DELETE FROM processed_events WHERE processed_at < :cutoff", {"cutoff": cutoff})
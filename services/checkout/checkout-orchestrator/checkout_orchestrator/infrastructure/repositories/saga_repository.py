@@ -1,72 +1,395 @@
 from databases import Database
 from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.metrics import SAGA_REPOSITORY_QUERY_LATENCY
+from checkout_orchestrator.utils import json_codec
 import datetime
-import json
-from typing import Optional
+import functools
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Sagas in these states never change again (see kafka_consumer); partial indexes leave them out
+_ACTIVE_SAGA_PREDICATE = "state NOT IN ('COMPLETED', 'FAILED')"
+_TERMINAL_SAGA_PREDICATE = "state IN ('COMPLETED', 'FAILED')"
+_SAGA_COLUMNS = "id, state, context, processed_event_ids, created_at, updated_at"
+
+def _timed(operation: str):
+    """Records the latency of a repository method in SAGA_REPOSITORY_QUERY_LATENCY."""
+    histogram = SAGA_REPOSITORY_QUERY_LATENCY.labels(operation)
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
 
 class SagaRepository:
+    """
+    On Postgres, context and processed_event_ids are JSONB and an update only sends the top-level
+    context keys that changed since the saga was read or last written (see SagaState.context_changes).
+    SQLite keeps JSON text and patches it with json_set/json_remove.
+    """
+
     def __init__(self, database: Database):
         self.database = database
+        # Months (first day) whose archive partition is known to exist
+        self._archive_partitions = set()
 
     async def create_saga_table(self):
-        query = """
-        CREATE TABLE IF NOT EXISTS saga_states (
-            id VARCHAR(255) PRIMARY KEY,
-            state VARCHAR(255) NOT NULL,
-            context TEXT NOT NULL,
-            processed_event_ids TEXT DEFAULT '[]' NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        );
+        if self._is_postgres:
+            query = """
+            CREATE TABLE IF NOT EXISTS saga_states (
+                id VARCHAR(255) PRIMARY KEY,
+                state VARCHAR(255) NOT NULL,
+                context JSONB NOT NULL,
+                processed_event_ids JSONB DEFAULT '[]'::jsonb NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT now(),
+                updated_at TIMESTAMPTZ DEFAULT now()
+            );
+            """
+        else:
+            query = """
+            CREATE TABLE IF NOT EXISTS saga_states (
+                id VARCHAR(255) PRIMARY KEY,
+                state VARCHAR(255) NOT NULL,
+                context TEXT NOT NULL,
+                processed_event_ids TEXT DEFAULT '[]' NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        await self.database.execute(query)
+        if self._is_postgres:
+            await self._migrate_text_columns_to_jsonb()
+        # Serves the timeout sweep over in-flight sagas: one index range scan per pending state, oldest first
+        await self.database.execute(
+            "CREATE INDEX IF NOT EXISTS idx_saga_states_active_state_updated_at "
+            f"ON saga_states (state, updated_at) WHERE {_ACTIVE_SAGA_PREDICATE}"
+        )
+
+    async def create_archive_table(self):
+        """
+        Terminal sagas are moved to saga_states_archive by archive_terminal_batch. On Postgres the
+        archive is range-partitioned by month of updated_at, so old months can be dropped or detached whole.
         """
+        if self._is_postgres:
+            query = """
+            CREATE TABLE IF NOT EXISTS saga_states_archive (
+                id VARCHAR(255) NOT NULL,
+                state VARCHAR(255) NOT NULL,
+                context JSONB NOT NULL,
+                processed_event_ids JSONB NOT NULL,
+                created_at TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ NOT NULL,
+                archived_at TIMESTAMPTZ DEFAULT now() NOT NULL,
+                PRIMARY KEY (id, updated_at)
+            ) PARTITION BY RANGE (updated_at);
+            """
+        else:
+            query = """
+            CREATE TABLE IF NOT EXISTS saga_states_archive (
+                id VARCHAR(255) PRIMARY KEY,
+                state VARCHAR(255) NOT NULL,
+                context TEXT NOT NULL,
+                processed_event_ids TEXT NOT NULL,
+                created_at DATETIME,
+                updated_at DATETIME NOT NULL,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            """
         await self.database.execute(query)
+        # Lets the archiver pick the oldest terminal sagas without touching in-flight ones
+        await self.database.execute(
+            "CREATE INDEX IF NOT EXISTS idx_saga_states_terminal_updated_at "
+            f"ON saga_states (updated_at) WHERE {_TERMINAL_SAGA_PREDICATE}"
+        )
+
+    async def _migrate_text_columns_to_jsonb(self):
+        # Tables created before JSONB storage hold the documents as TEXT
+        rows = await self.database.fetch_all(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'saga_states' AND column_name IN ('context', 'processed_event_ids') AND data_type = 'text'
+            """
+        )
+        for row in rows:
+            column = row["column_name"]
+            await self.database.execute(f"ALTER TABLE saga_states ALTER COLUMN {column} DROP DEFAULT")
+            await self.database.execute(
+                f"ALTER TABLE saga_states ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+            )
+            if column == "processed_event_ids":
+                await self.database.execute(
+                    "ALTER TABLE saga_states ALTER COLUMN processed_event_ids SET DEFAULT '[]'::jsonb"
+                )
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self.database.url.dialect == "postgresql"
 
+    def _json_param(self, name: str) -> str:
+        return f"CAST(:{name} AS JSONB)" if self._is_postgres else f":{name}"
+
+    @_timed("create")
     async def create(self, saga_state: SagaState) -> SagaState:
-        query = """
+        query = f"""
         INSERT INTO saga_states (id, state, context, processed_event_ids, created_at, updated_at)
-        VALUES (:id, :state, :context, :processed_event_ids, :created_at, :updated_at)
+        VALUES (:id, :state, {self._json_param("context")}, {self._json_param("processed_event_ids")}, :created_at, :updated_at)
         """
+        context = json_codec.dumps_str(saga_state.context)
         values = {
             "id": saga_state.id,
             "state": saga_state.state,
-            "context": json.dumps(saga_state.context),
-            "processed_event_ids": json.dumps(saga_state.processed_event_ids),
+            "context": context,
+            "processed_event_ids": json_codec.dumps_str(saga_state.processed_event_ids),
             "created_at": saga_state.created_at,
             "updated_at": saga_state.updated_at,
         }
         await self.database.execute(query, values)
+        saga_state.mark_persisted(json_codec.loads(context))
+        return saga_state
+
+    @staticmethod
+    def _to_saga_state(row) -> SagaState:
+        saga_state = SagaState(
+            id=row["id"],
+            state=row["state"],
+            context=json_codec.loads(row["context"]),
+            processed_event_ids=json_codec.loads(row["processed_event_ids"]),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+        # A second, independent decode is the baseline later updates are diffed against
+        saga_state.mark_persisted(json_codec.loads(row["context"]))
         return saga_state
 
-    async def get(self, saga_id: str) -> Optional[SagaState]:
-        query = "SELECT id, state, context, processed_event_ids, created_at, updated_at FROM saga_states WHERE id = :id"
+    @_timed("get")
+    async def get(self, saga_id: str, include_archived: bool = False) -> Optional[SagaState]:
+        """
+        Only looks in the hot table unless `include_archived` is set; the saga flow never needs
+        archived sagas, historical lookups (status queries, support tooling) opt in explicitly.
+        """
+        query = f"SELECT {_SAGA_COLUMNS} FROM saga_states WHERE id = :id"
         row = await self.database.fetch_one(query, {"id": saga_id})
+        if row is None and include_archived:
+            query = f"SELECT {_SAGA_COLUMNS} FROM saga_states_archive WHERE id = :id ORDER BY updated_at DESC LIMIT 1"
+            row = await self.database.fetch_one(query, {"id": saga_id})
         if row:
-            return SagaState(
-                id=row["id"],
-                state=row["state"],
-                context=json.loads(row["context"]),
-                processed_event_ids=json.loads(row["processed_event_ids"]),
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
+            return self._to_saga_state(row)
         return None
 
-    async def update(self, saga_state: SagaState) -> SagaState:
-        query = """
-        UPDATE saga_states
-        SET state = :state, context = :context, processed_event_ids = :processed_event_ids, updated_at = :updated_at
-        WHERE id = :id
+    @_timed("get_many")
+    async def get_many(self, saga_ids: Iterable[str]) -> Dict[str, SagaState]:
+        # One round-trip for a whole consumer batch; missing ids are simply absent from the result
+        saga_ids = list(dict.fromkeys(saga_ids))
+        if not saga_ids:
+            return {}
+        placeholders = ", ".join(f":id_{i}" for i in range(len(saga_ids)))
+        query = f"SELECT {_SAGA_COLUMNS} FROM saga_states WHERE id IN ({placeholders})"
+        rows = await self.database.fetch_all(query, {f"id_{i}": saga_id for i, saga_id in enumerate(saga_ids)})
+        return {row["id"]: self._to_saga_state(row) for row in rows}
+
+    @_timed("find_timed_out")
+    async def find_timed_out(
+        self,
+        state_cutoffs: Dict[str, datetime.datetime],
+        limit: int,
+        saga_ids: Optional[Iterable[str]] = None,
+    ) -> List[SagaState]:
         """
-        values = {
+        Sagas still in one of the given states whose last update is older than that state's cutoff,
+        oldest first, optionally restricted to `saga_ids`. On Postgres the rows stay locked until the
+        caller's transaction ends and rows locked by another replica are skipped.
+        """
+        if not state_cutoffs:
+            return []
+        values: Dict[str, object] = {"limit": limit}
+        conditions = []
+        for i, (state, cutoff) in enumerate(state_cutoffs.items()):
+            conditions.append(f"(state = :state_{i} AND updated_at < :cutoff_{i})")
+            values[f"state_{i}"] = state
+            values[f"cutoff_{i}"] = cutoff
+        query = (
+            f"SELECT {_SAGA_COLUMNS} FROM saga_states "
+            f"WHERE {_ACTIVE_SAGA_PREDICATE} AND ({' OR '.join(conditions)})"
+        )
+        if saga_ids is not None:
+            saga_ids = list(dict.fromkeys(saga_ids))
+            if not saga_ids:
+                return []
+            query += f" AND id IN ({', '.join(f':id_{i}' for i in range(len(saga_ids)))})"
+            values.update({f"id_{i}": saga_id for i, saga_id in enumerate(saga_ids)})
+        query += " ORDER BY updated_at LIMIT :limit"
+        if self._is_postgres:
+            query += " FOR UPDATE SKIP LOCKED"
+        rows = await self.database.fetch_all(query, values)
+        return [self._to_saga_state(row) for row in rows]
+
+    def _context_assignment(
+        self, saga_state: SagaState, values: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        SQL expression for the new context (None when the stored one is up to date) and the top-level
+        values it writes, None meaning the whole document.
+        """
+        changes = saga_state.context_changes()
+        if changes is not None:
+            changed, removed = changes
+            if not changed and not removed:
+                return None, {}
+            if self._is_postgres:
+                # jsonb || replaces whole top-level values, it does not merge nested objects
+                expression = "context"
+                for i, key in enumerate(removed):
+                    expression += f" - CAST(:removed_{i} AS TEXT)"
+                    values[f"removed_{i}"] = key
+                if changed:
+                    expression = f"{expression} || CAST(:context_patch AS JSONB)"
+                    values["context_patch"] = json_codec.dumps_str(changed)
+                return expression, changed
+            if not any('"' in key for key in (*changed, *removed)):
+                expression = "context"
+                if removed:
+                    paths = ", ".join(f":removed_{i}" for i in range(len(removed)))
+                    expression = f"json_remove({expression}, {paths})"
+                    values.update({f"removed_{i}": f'$."{key}"' for i, key in enumerate(removed)})
+                if changed:
+                    assignments = []
+                    for i, (key, value) in enumerate(changed.items()):
+                        assignments.append(f":path_{i}, json(:value_{i})")
+                        values[f"path_{i}"] = f'$."{key}"'
+                        values[f"value_{i}"] = json_codec.dumps_str(value)
+                    expression = f"json_set({expression}, {', '.join(assignments)})"
+                return expression, changed
+        # Never read from the database (or a key json paths cannot express): write the whole document
+        values["context"] = json_codec.dumps_str(saga_state.context)
+        return self._json_param("context"), None
+
+    def _update_statement(self, saga_state: SagaState) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+        values: Dict[str, Any] = {
             "id": saga_state.id,
             "state": saga_state.state,
-            "context": json.dumps(saga_state.context),
-            "processed_event_ids": json.dumps(saga_state.processed_event_ids),
-            "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            "updated_at": saga_state.updated_at,
         }
-        await self.database.execute(query, values)
+        assignments = ["state = :state", "updated_at = :updated_at"]
+        context_expression, written = self._context_assignment(saga_state, values)
+        if context_expression is not None:
+            assignments.append(f"context = {context_expression}")
+        if saga_state.processed_event_ids_changed():
+            assignments.append(f"processed_event_ids = {self._json_param('processed_event_ids')}")
+            values["processed_event_ids"] = json_codec.dumps_str(saga_state.processed_event_ids)
+        query = f"UPDATE saga_states SET {', '.join(assignments)} WHERE id = :id"
+        if saga_state.persisted_state is not None:
+            # Optimistic guard: a timeout or another handler that moved the saga on since it was read wins
+            query += " AND state = :persisted_state"
+            values["persisted_state"] = saga_state.persisted_state
+        return query + " RETURNING id", values, written
+
+    @staticmethod
+    def _mark_written(saga_state: SagaState, written: Optional[Dict[str, Any]]):
+        # Fresh copies, so later in-place changes to the context still show up as differences
+        if written is None:
+            saga_state.mark_persisted(json_codec.loads(json_codec.dumps(saga_state.context)))
+        else:
+            saga_state.mark_persisted(json_codec.loads(json_codec.dumps(written)), partial=True)
+
+    @_timed("update")
+    async def update(self, saga_state: SagaState) -> Optional[SagaState]:
+        """Returns None, leaving `saga_state` as it was, when the stored row is no longer in the state it was read in."""
+        query, values, written = self._update_statement(saga_state)
+        if await self.database.fetch_one(query, values) is None:
+            return None
+        self._mark_written(saga_state, written)
         return saga_state
 
+    @_timed("update_many")
+    async def update_many(self, saga_states: List[SagaState]) -> List[SagaState]:
+        """
+        Writes each saga with the same guard as `update` and returns the ones that were written.
+        Callers wrap this in a transaction together with whatever else has to commit with the sagas.
+        """
+        updated = []
+        for saga_state in saga_states:
+            # `databases` runs execute_many one statement at a time as well, RETURNING costs no extra round-trip
+            query, values, written = self._update_statement(saga_state)
+            if await self.database.fetch_one(query, values) is not None:
+                self._mark_written(saga_state, written)
+                updated.append(saga_state)
+        return updated
+
+    async def ensure_archive_partitions(self, cutoff: datetime.datetime):
+        """Creates the monthly archive partitions the terminal sagas older than `cutoff` will land in."""
+        if not self._is_postgres:
+            return
+        oldest = await self.database.fetch_val(
+            f"SELECT MIN(updated_at) FROM saga_states WHERE {_TERMINAL_SAGA_PREDICATE} AND updated_at < :cutoff",
+            {"cutoff": cutoff},
+        )
+        if oldest is None:
+            return
+        month = datetime.datetime(oldest.year, oldest.month, 1, tzinfo=datetime.timezone.utc)
+        while month <= cutoff:
+            next_month = datetime.datetime(
+                month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=datetime.timezone.utc
+            )
+            if month not in self._archive_partitions:
+                await self.database.execute(
+                    f"CREATE TABLE IF NOT EXISTS saga_states_archive_{month:%Y_%m} PARTITION OF saga_states_archive "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+                )
+                self._archive_partitions.add(month)
+            month = next_month
+
+    @_timed("archive_terminal_batch")
+    async def archive_terminal_batch(self, cutoff: datetime.datetime, limit: int, lock_timeout_ms: int = 2000) -> int:
+        """
+        Moves up to `limit` COMPLETED/FAILED sagas last updated before `cutoff` to the archive, oldest
+        first, in one short transaction. Returns how many were moved.
+        """
+        async with self.database.transaction():
+            if self._is_postgres:
+                # Rows in use elsewhere are skipped and any other lock wait is capped, so a batch never stalls the hot path
+                await self.database.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout_ms)}ms'")
+                query = f"""
+                WITH moved AS (
+                    DELETE FROM saga_states WHERE id IN (
+                        SELECT id FROM saga_states
+                        WHERE {_TERMINAL_SAGA_PREDICATE} AND updated_at < :cutoff
+                        ORDER BY updated_at LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {_SAGA_COLUMNS}
+                ), archived AS (
+                    INSERT INTO saga_states_archive ({_SAGA_COLUMNS})
+                    SELECT {_SAGA_COLUMNS} FROM moved
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM archived
+                """
+                return await self.database.fetch_val(query, {"cutoff": cutoff, "limit": limit})
+
+            rows = await self.database.fetch_all(
+                f"SELECT id FROM saga_states WHERE {_TERMINAL_SAGA_PREDICATE} AND updated_at < :cutoff "
+                "ORDER BY updated_at LIMIT :limit",
+                {"cutoff": cutoff, "limit": limit},
+            )
+            if not rows:
+                return 0
+            placeholders = ", ".join(f":id_{i}" for i in range(len(rows)))
+            values = {f"id_{i}": row["id"] for i, row in enumerate(rows)}
+            await self.database.execute(
+                f"INSERT INTO saga_states_archive ({_SAGA_COLUMNS}) "
+                f"SELECT {_SAGA_COLUMNS} FROM saga_states WHERE id IN ({placeholders})",
+                values,
+            )
+            await self.database.execute(f"DELETE FROM saga_states WHERE id IN ({placeholders})", values)
+            return len(rows)
+
+    @_timed("delete")
     async def delete(self, saga_id: str):
         query = "DELETE FROM saga_states WHERE id = :id"
         await self.database.execute(query, {"id": saga_id})
\ No newline at end of file
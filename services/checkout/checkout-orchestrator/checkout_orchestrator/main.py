@@ -1,27 +1,53 @@
 from fastapi import FastAPI, Response # Add Response
+from prometheus_client import generate_latest
 import os
-from .api.endpoints import checkout
+from .api.endpoints import admin, checkout
+from .api.rpc.checkout import CheckoutServicer, create_grpc_server
 import asyncio
+import datetime
 import httpx # Added import for httpx
-from .core.kafka_consumer import KafkaConsumerManager
+from .core.checkout_spool import SpoolDrainer
+from .core.fake_responders import start_fake_responders
+from .core.http_metrics import InstrumentedTransport
+from .core.kafka_consumer import DEFAULT_SAGA_TIMEOUTS, KafkaConsumerManager
+from .core.outbox_relay import OutboxRelay
+from .core.quote_cache import QuoteCache
+from .core.saga_archiver import SagaArchiver
+from .core.saga_cache import SagaStateCache
+from .infrastructure.clients.cart_client import CartClient
 from .infrastructure.repositories.saga_repository import SagaRepository
+from .infrastructure.repositories.outbox_repository import OutboxRepository
+from .infrastructure.repositories.idempotency_repository import IdempotencyRepository
+from .infrastructure.repositories.processed_event_repository import ProcessedEventRepository
 import checkout_orchestrator.core.config as config
+from .dependencies import (
+    admission_controller,
+    checkout_spool,
+    create_checkout_service,
+    saga_event_bus,
+    saga_status_cache,
+)
 from checkout_orchestrator.core.config import database, kafka_producer, httpx_client, KAFKA_BOOTSTRAP_SERVERS, registry, MOCK_KAFKA # Import shared instances and MOCK_KAFKA
 
 kafka_consumer_manager: KafkaConsumerManager = None
+outbox_relay: OutboxRelay = None
+saga_archiver: SagaArchiver = None
+spool_drainer: SpoolDrainer = None
+fake_responders = []
+grpc_server = None
+cart_client: CartClient = None
+idempotency_pruner: asyncio.Task = None
 
 app = FastAPI(title="Checkout Orchestrator")
 
 app.include_router(checkout.router, prefix="/api", tags=["Checkout"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
 
 # Prometheus Metrics Endpoint
 @app.get("/metrics")
 async def metrics():
-    # Only generate metrics if Kafka is not mocked
-    if not MOCK_KAFKA:
-        from prometheus_client import generate_latest # Moved import here to avoid issue when Kafka is mocked.
-        return Response(content=generate_latest(registry).decode("utf-8"), media_type="text/plain")
-    return Response(content="Kafka is mocked, metrics not available.", media_type="text/plain")
+    # Served under MOCK_KAFKA as well: mock mode runs full sagas and is used for local benchmarking
+    return Response(content=generate_latest(registry).decode("utf-8"), media_type="text/plain")
 
 
 @app.on_event("startup")
@@ -29,11 +55,8 @@ async def startup_db_kafka():
     await database.connect()
     print("Connected to database.")
 
-    if not MOCK_KAFKA:
-        await kafka_producer.start()
-        print("Kafka producer started.")
-    else:
-        print("Kafka producer is mocked, skipping startup.")
+    await kafka_producer.start()
+    print("Kafka producer started." if not MOCK_KAFKA else "In-memory Kafka producer started.")
 
     # Initializing httpx connection
     # httpx_client is already declared in config.py, now initialize it
@@ -44,43 +67,176 @@ async def startup_db_kafka():
             write=10.0,
             pool=5.0,
         ),
-        limits=httpx.Limits(
-            max_connections=100,
-            max_keepalive_connections=20,
+        # Records per-upstream latency and errors; the limits live on the wrapped transport
+        transport=InstrumentedTransport(
+            httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                ),
+            )
         ),
     )
     print("httpx_client is successfully initialized")
 
     # Initialize and start Kafka Consumer Manager
-    global kafka_consumer_manager
+    global kafka_consumer_manager, outbox_relay, saga_archiver, fake_responders, grpc_server, cart_client
+    global idempotency_pruner, spool_drainer
     saga_repository = SagaRepository(database)
     await saga_repository.create_saga_table() # Ensure saga table is created on startup
+    processed_event_repository = ProcessedEventRepository(database)
+    await processed_event_repository.create_processed_events_table()
+    await saga_repository.create_archive_table()
+    outbox_repository = None
+    if config.USE_OUTBOX:
+        outbox_repository = OutboxRepository(database)
+        await outbox_repository.create_outbox_table()
+    if config.CHECKOUT_IDEMPOTENCY_ENABLED:
+        idempotency_repository = IdempotencyRepository(database)
+        await idempotency_repository.create_idempotency_table()
+        idempotency_pruner = asyncio.create_task(_prune_idempotency_keys_periodically(idempotency_repository))
 
-    if not MOCK_KAFKA:
-        kafka_consumer_manager = KafkaConsumerManager(
-            bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-            database=database,
-            saga_repository=saga_repository,
-            producer=kafka_producer,
-            httpx_client=config.httpx_client,
+    quote_cache = None
+    if config.QUOTE_CACHE_MAX_ENTRIES > 0:
+        quote_cache = QuoteCache(config.QUOTE_CACHE_MAX_ENTRIES, config.QUOTE_CACHE_TTL_SECONDS)
+
+    saga_cache = None
+    if config.SAGA_CACHE_MAX_ENTRIES > 0:
+        saga_cache = SagaStateCache(config.SAGA_CACHE_MAX_ENTRIES)
+
+    if config.SAGA_ARCHIVE_ENABLED:
+        saga_archiver = SagaArchiver(
+            saga_repository,
+            max_age=datetime.timedelta(hours=config.SAGA_ARCHIVE_AFTER_HOURS),
+            batch_size=config.SAGA_ARCHIVE_BATCH_SIZE,
+            interval_s=config.SAGA_ARCHIVE_INTERVAL_SECONDS,
+            batch_pause_ms=config.SAGA_ARCHIVE_BATCH_PAUSE_MS,
+            lock_timeout_ms=config.SAGA_ARCHIVE_LOCK_TIMEOUT_MS,
+        )
+        saga_archiver.start()
+        print("Saga archiver started.")
+
+    saga_timeouts = None
+    if config.SAGA_TIMEOUTS_ENABLED:
+        saga_timeouts = {**DEFAULT_SAGA_TIMEOUTS, **config.SAGA_TIMEOUT_OVERRIDES}
+
+    consumer_options = {}
+    if MOCK_KAFKA:
+        # Consumes from the in-memory broker the mocked producer writes to
+        consumer_options["consumer_factory"] = config.kafka_broker.consumer
+    kafka_consumer_manager = KafkaConsumerManager(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        database=database,
+        saga_repository=saga_repository,
+        producer=kafka_producer,
+        httpx_client=config.httpx_client,
+        lanes=config.CONSUMER_LANES,
+        lane_queue_size=config.CONSUMER_LANE_QUEUE_SIZE,
+        commit_interval_ms=config.CONSUMER_COMMIT_INTERVAL_MS,
+        batch_size=config.CONSUMER_BATCH_SIZE,
+        batch_timeout_ms=config.CONSUMER_BATCH_TIMEOUT_MS,
+        outbox_repository=outbox_repository,
+        quote_timeout_ms=config.PRICING_QUOTE_TIMEOUT_MS,
+        quote_cache=quote_cache,
+        processed_event_repository=processed_event_repository,
+        processed_event_ttl=datetime.timedelta(hours=config.PROCESSED_EVENT_TTL_HOURS),
+        saga_cache=saga_cache,
+        saga_timeouts=saga_timeouts,
+        timeout_sweep_interval_s=config.SAGA_TIMEOUT_SWEEP_INTERVAL_SECONDS,
+        timeout_batch_size=config.SAGA_TIMEOUT_BATCH_SIZE,
+        log_policy=config.saga_log_policy,
+        status_cache=saga_status_cache,
+        event_bus=saga_event_bus,
+        **consumer_options,
+    )
+    asyncio.create_task(kafka_consumer_manager.start_consumer())
+    if admission_controller is not None:
+        admission_controller.consumer_lag = kafka_consumer_manager.consumer_lag
+    print("Kafka consumer manager started.")
+
+    if outbox_repository is not None:
+        outbox_relay = OutboxRelay(
+            database,
+            outbox_repository,
+            kafka_producer,
+            batch_size=config.OUTBOX_RELAY_BATCH_SIZE,
+            poll_interval_ms=config.OUTBOX_RELAY_POLL_INTERVAL_MS,
+            retention=datetime.timedelta(hours=config.OUTBOX_RETENTION_HOURS),
         )
-        asyncio.create_task(kafka_consumer_manager.start_consumer())
-        print("Kafka consumer manager started.")
-    else:
-        kafka_consumer_manager = None
-        print("Kafka consumer manager is mocked, skipping startup.")
+        outbox_relay.start()
+        print("Outbox relay started.")
+
+    if checkout_spool is not None:
+        await checkout_spool.open()
+        spool_drainer = SpoolDrainer(
+            checkout_spool,
+            kafka_producer,
+            batch_size=config.CHECKOUT_SPOOL_DRAIN_BATCH_SIZE,
+            retry_interval_ms=config.CHECKOUT_SPOOL_RETRY_INTERVAL_MS,
+        )
+        spool_drainer.start()
+        print(f"Checkout spool opened at {config.CHECKOUT_SPOOL_PATH} ({checkout_spool.backlog} events pending).")
+
+    if MOCK_KAFKA and config.MOCK_KAFKA_RESPONDERS:
+        fake_responders = await start_fake_responders(
+            config.kafka_broker,
+            latency_ms=config.MOCK_KAFKA_RESPONDER_LATENCY_MS,
+            failure_rates=config.MOCK_KAFKA_FAILURE_RATES,
+        )
+        print("Fake inventory/payment/order/cart services started.")
+
+    if config.GRPC_ENABLED:
+        cart_client = CartClient(config.CART_SERVICE_GRPC_TARGET, timeout_s=config.CART_SERVICE_TIMEOUT_SECONDS)
+        servicer = CheckoutServicer(
+            create_checkout_service(database, kafka_producer, saga_repository),
+            saga_repository,
+            saga_status_cache,
+            cart_loader=cart_client.load_cart,
+        )
+        grpc_server, grpc_port = create_grpc_server(servicer, f"[::]:{config.GRPC_PORT}")
+        await grpc_server.start()
+        print(f"gRPC CheckoutService listening on port {grpc_port}.")
+
+
+async def _prune_idempotency_keys_periodically(idempotency_repository: IdempotencyRepository):
+    while True:
+        try:
+            await idempotency_repository.prune_expired(datetime.datetime.now(datetime.timezone.utc))
+        except Exception as e:
+            print(f"Failed to prune expired idempotency keys: {e}")
+        await asyncio.sleep(600)
 
 
 @app.on_event("shutdown")
 async def shutdown_db_kafka():
+    global grpc_server, cart_client, idempotency_pruner, spool_drainer
+    if idempotency_pruner is not None:
+        idempotency_pruner.cancel()
+        idempotency_pruner = None
+    if grpc_server is not None:
+        # Lets in-flight InitiateCheckout calls finish before their dependencies go away
+        await grpc_server.stop(config.GRPC_SHUTDOWN_GRACE_SECONDS)
+        grpc_server = None
+    if cart_client is not None:
+        await cart_client.close()
+        cart_client = None
+    if outbox_relay:
+        await outbox_relay.stop()
+    if spool_drainer is not None:
+        # Whatever is still spooled stays on disk and is replayed after the restart
+        await spool_drainer.stop()
+        spool_drainer = None
+    if checkout_spool is not None:
+        await checkout_spool.close()
+    if saga_archiver:
+        await saga_archiver.stop()
+    for responder in fake_responders:
+        await responder.stop()
+    if kafka_consumer_manager:
+        await kafka_consumer_manager.stop_consumer()
     await database.disconnect()
-    if not MOCK_KAFKA:
-        await kafka_producer.stop()
-        if kafka_consumer_manager:
-            await kafka_consumer_manager.stop_consumer()
-        print("Disconnected from database and Kafka producer/consumer stopped.")
-    else:
-        print("Disconnected from database. Kafka producer/consumer mocked, skipping shutdown.")
+    await kafka_producer.stop()
+    print("Disconnected from database and Kafka producer/consumer stopped.")
     if config.httpx_client is not None:
         await config.httpx_client.aclose()
         config.httpx_client = None
@@ -0,0 +1,125 @@
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+# JSON codec shared by the consumer, the producers and the repositories.
+# orjson or msgspec are used when installed, the stdlib json module otherwise.
+# All backends write compact UTF-8 output, so the bytes do not depend on which one is active.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+
+class JSONCodec:
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        dumps_sorted: Callable[[Any], bytes],
+        loads: Callable[[Union[bytes, str]], Any],
+    ):
+        self.name = name
+        self.dumps = dumps
+        self.dumps_sorted = dumps_sorted
+        self.loads = loads
+
+
+def _stdlib_codec() -> JSONCodec:
+    encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    sorted_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    return JSONCodec(
+        "stdlib",
+        lambda obj: encoder.encode(obj).encode("utf-8"),
+        lambda obj: sorted_encoder.encode(obj).encode("utf-8"),
+        json.loads,
+    )
+
+
+def _orjson_codec() -> JSONCodec:
+    options = orjson.OPT_NON_STR_KEYS
+    return JSONCodec(
+        "orjson",
+        lambda obj: orjson.dumps(obj, option=options),
+        lambda obj: orjson.dumps(obj, option=options | orjson.OPT_SORT_KEYS),
+        orjson.loads,
+    )
+
+
+def _msgspec_codec() -> JSONCodec:
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return JSONCodec(
+        "msgspec",
+        encoder.encode,
+        lambda obj: encoder.encode(msgspec.to_builtins(obj, order="sorted")),
+        loads,
+    )
+
+
+def _factories() -> Dict[str, Callable[[], JSONCodec]]:
+    factories = {}
+    if orjson is not None:
+        factories["orjson"] = _orjson_codec
+    if msgspec is not None:
+        factories["msgspec"] = _msgspec_codec
+    factories["stdlib"] = _stdlib_codec
+    return factories
+
+
+def available_backends():
+    """Installed backends, fastest first."""
+    return list(_factories())
+
+
+def make_codec(name: Optional[str] = None) -> JSONCodec:
+    """Builds the named backend; "auto" or None picks the fastest installed one."""
+    factories = _factories()
+    if name in (None, "", "auto"):
+        name = next(iter(factories))
+    if name not in factories:
+        raise ValueError(f"JSON codec '{name}' is not available (installed: {', '.join(factories)})")
+    return factories[name]()
+
+
+_codec = make_codec()
+
+
+def set_backend(name: Optional[str]) -> JSONCodec:
+    global _codec
+    _codec = make_codec(name)
+    return _codec
+
+
+def backend_name() -> str:
+    return _codec.name
+
+
+def dumps(obj: Any) -> bytes:
+    return _codec.dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    return _codec.dumps(obj).decode("utf-8")
+
+
+def dumps_sorted(obj: Any) -> bytes:
+    """Deterministic encoding (sorted keys), for hashing."""
+    return _codec.dumps_sorted(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Raises ValueError on invalid JSON, whatever the backend."""
+    return _codec.loads(data)
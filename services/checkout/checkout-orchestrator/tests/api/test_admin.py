@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import checkout_orchestrator.core.config as config
+from checkout_orchestrator.api.endpoints import admin
+from checkout_orchestrator.core.log_sampling import SagaLogPolicy
+
+
+def _client() -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_require_the_configured_token(monkeypatch):
+    monkeypatch.setattr(config, "saga_log_policy", SagaLogPolicy(redact_keys=["cvv"]))
+    monkeypatch.setattr(config, "ADMIN_API_TOKEN", "")
+    async with _client() as client:
+        assert (await client.get("/api/admin/logging")).status_code == 403
+
+        monkeypatch.setattr(config, "ADMIN_API_TOKEN", "s3cret")
+        assert (await client.get("/api/admin/logging")).status_code == 401
+        denied = await client.put(
+            "/api/admin/logging", json={"default_rate": 0}, headers={"Authorization": "Bearer wrong"}
+        )
+        assert denied.status_code == 401
+        assert config.saga_log_policy.default_rate == 1.0
+
+        headers = {"Authorization": "Bearer s3cret"}
+        updated = await client.put("/api/admin/logging", json={"default_rate": 0.5}, headers=headers)
+        assert updated.status_code == 200
+        assert updated.json()["default_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_startup_redact_keys_cannot_be_cleared_at_runtime(monkeypatch):
+    monkeypatch.setattr(config, "saga_log_policy", SagaLogPolicy(redact_keys=["cvv", "email"]))
+    monkeypatch.setattr(config, "ADMIN_API_TOKEN", "s3cret")
+    headers = {"Authorization": "Bearer s3cret"}
+    async with _client() as client:
+        refused = await client.put("/api/admin/logging", json={"redact_keys": []}, headers=headers)
+        added = await client.put("/api/admin/logging", json={"redact_keys": ["cvv", "email", "phone"]}, headers=headers)
+
+    assert refused.status_code == 400
+    assert added.json()["redact_keys"] == ["cvv", "email", "phone"]
@@ -0,0 +1,280 @@
+import asyncio
+import datetime
+import json
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pybreaker import CircuitBreaker
+
+from checkout_orchestrator.api.endpoints import checkout
+from checkout_orchestrator.core.admission import AdmissionController
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.saga_events import SagaEventBus
+from checkout_orchestrator.core.saga_status import SagaStatusCache
+from checkout_orchestrator.core.services.checkout_service import KAFKA_TOPIC_CHECKOUT_INITIATED, CheckoutService
+from checkout_orchestrator.dependencies import (
+    get_checkout_service,
+    get_saga_event_bus,
+    get_saga_repository,
+    get_saga_status_cache,
+)
+from checkout_orchestrator.infrastructure.repositories.idempotency_repository import IdempotencyRepository
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+
+
+def _request() -> dict:
+    return {
+        "cart_id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "cart_details": {"items": [{"product_id": str(uuid.uuid4()), "quantity": 1}], "total_price": 1000},
+    }
+
+
+def _client(
+    saga_repository,
+    broker,
+    status_cache,
+    outbox_repository=None,
+    event_bus=None,
+    idempotency_repository=None,
+    admission_controller=None,
+) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(checkout.router, prefix="/api")
+
+    async def checkout_service():
+        return CheckoutService(
+            saga_repository.database,
+            broker.producer(),
+            saga_repository,
+            outbox_repository=outbox_repository,
+            status_cache=status_cache,
+            idempotency_repository=idempotency_repository,
+            admission_controller=admission_controller,
+        )
+
+    async def repository():
+        return saga_repository
+
+    async def cache():
+        return status_cache
+
+    app.dependency_overrides[get_checkout_service] = checkout_service
+    app.dependency_overrides[get_saga_repository] = repository
+    async def bus():
+        return event_bus or SagaEventBus()
+
+    app.dependency_overrides[get_saga_status_cache] = cache
+    app.dependency_overrides[get_saga_event_bus] = bus
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_checkout_is_accepted_and_its_status_served_from_the_cache(saga_repository):
+    broker = InMemoryBroker()
+    status_cache = SagaStatusCache()
+    reads = []
+    original_get = saga_repository.get
+
+    async def counting_get(saga_id, include_archived=False):
+        reads.append(saga_id)
+        return await original_get(saga_id, include_archived)
+
+    saga_repository.get = counting_get
+    async with _client(saga_repository, broker, status_cache) as client:
+        response = await client.post("/api/checkout", json=_request())
+        assert response.status_code == 202
+        saga_id = response.json()["saga_id"]
+        assert response.headers["location"] == f"/api/checkout/{saga_id}"
+
+        status = await client.get(f"/api/checkout/{saga_id}")
+
+    assert status.status_code == 200
+    assert status.json()["status"] == "CHECKOUT_INITIATED"
+    assert reads == []
+    assert (await original_get(saga_id)).state == "CHECKOUT_INITIATED"
+    [event] = broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED)
+    assert json.loads(event.value)["saga_id"] == saga_id
+
+
+@pytest.mark.asyncio
+async def test_status_of_unknown_or_malformed_saga_ids(saga_repository):
+    # Status reads fall back to the archive
+    await saga_repository.create_archive_table()
+    async with _client(saga_repository, InMemoryBroker(), SagaStatusCache()) as client:
+        assert (await client.get(f"/api/checkout/{uuid.uuid4()}")).status_code == 404
+        assert (await client.get("/api/checkout/not-a-uuid")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_with_an_outbox_the_initial_event_is_stored_with_the_saga(saga_repository):
+    outbox_repository = OutboxRepository(saga_repository.database)
+    await outbox_repository.create_outbox_table()
+    broker = InMemoryBroker()
+    async with _client(saga_repository, broker, SagaStatusCache(), outbox_repository) as client:
+        response = await client.post("/api/checkout", json=_request())
+
+    assert response.status_code == 202
+    [row] = await outbox_repository.fetch_unpublished(10)
+    assert row["saga_id"] == response.json()["saga_id"]
+    assert row["topic"] == KAFKA_TOPIC_CHECKOUT_INITIATED
+    assert broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED) == []
+
+
+@pytest.mark.asyncio
+async def test_open_kafka_breaker_answers_503(saga_repository, monkeypatch):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=60)
+    breaker.open()
+    monkeypatch.setattr("checkout_orchestrator.core.services.checkout_service.kafka_breaker", breaker)
+    status_cache = SagaStatusCache()
+    async with _client(saga_repository, InMemoryBroker(), status_cache) as client:
+        response = await client.post("/api/checkout", json=_request())
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    # The client never learned the saga id, so nothing of it may be left for the timeout sweep
+    assert await saga_repository.database.fetch_all("SELECT * FROM saga_states") == []
+    assert len(status_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_status_events_stream_until_the_saga_finishes(saga_repository):
+    status_cache = SagaStatusCache()
+    event_bus = SagaEventBus()
+    async with _client(saga_repository, InMemoryBroker(), status_cache, event_bus=event_bus) as client:
+        saga_id = (await client.post("/api/checkout", json=_request())).json()["saga_id"]
+        stream = asyncio.create_task(client.get(f"/api/checkout/{saga_id}/events"))
+        while not event_bus.has_subscribers(saga_id):
+            await asyncio.sleep(0.001)
+        saga = await saga_repository.get(saga_id)
+        for state in ("INVENTORY_RESERVED", "COMPLETED"):
+            saga.state = state
+            saga.updated_at = saga.updated_at + datetime.timedelta(seconds=1)
+            event_bus.publish(saga)
+        response = await stream
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [frame["status"] for frame in frames] == ["CHECKOUT_INITIATED", "INVENTORY_RESERVED", "COMPLETED"]
+    assert not event_bus.has_subscribers(saga_id)
+
+
+@pytest.mark.asyncio
+async def test_status_events_of_an_unknown_saga_answer_404(saga_repository):
+    await saga_repository.create_archive_table()
+    event_bus = SagaEventBus()
+    async with _client(saga_repository, InMemoryBroker(), SagaStatusCache(), event_bus=event_bus) as client:
+        assert (await client.get(f"/api/checkout/{uuid.uuid4()}/events")).status_code == 404
+        assert (await client.get("/api/checkout/not-a-uuid/events")).status_code == 400
+    assert event_bus._subscriptions == {}
+
+
+async def _idempotency_repository(saga_repository) -> IdempotencyRepository:
+    repository = IdempotencyRepository(saga_repository.database)
+    await repository.create_idempotency_table()
+    return repository
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submissions_return_the_first_saga(saga_repository):
+    broker = InMemoryBroker()
+    idempotency_repository = await _idempotency_repository(saga_repository)
+    request = _request()
+    async with _client(
+        saga_repository, broker, SagaStatusCache(), idempotency_repository=idempotency_repository
+    ) as client:
+        keyed = [
+            await client.post("/api/checkout", json=request, headers={"Idempotency-Key": "order-1"}) for _ in range(2)
+        ]
+        # Without a header the key is derived from the user, the cart and its content
+        derived = [await client.post("/api/checkout", json=request) for _ in range(2)]
+        changed = await client.post("/api/checkout", json={**request, "cart_details": {"items": [], "total_price": 0}})
+
+    assert [response.status_code for response in keyed + derived] == [202] * 4
+    assert keyed[0].json()["saga_id"] == keyed[1].json()["saga_id"]
+    assert derived[0].json()["saga_id"] == derived[1].json()["saga_id"] != keyed[0].json()["saga_id"]
+    assert changed.json()["saga_id"] not in (keyed[0].json()["saga_id"], derived[0].json()["saga_id"])
+    assert len(broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED)) == 3
+
+
+@pytest.mark.asyncio
+async def test_racing_duplicates_start_one_saga(saga_repository):
+    broker = InMemoryBroker()
+    idempotency_repository = await _idempotency_repository(saga_repository)
+    service = CheckoutService(
+        saga_repository.database, broker.producer(), saga_repository, idempotency_repository=idempotency_repository
+    )
+    request = _request()
+
+    saga_ids = await asyncio.gather(
+        *(service.start_checkout_saga(request["cart_id"], request["user_id"], request["cart_details"]) for _ in range(5))
+    )
+
+    assert len(set(saga_ids)) == 1
+    assert len(await saga_repository.database.fetch_all("SELECT id FROM saga_states")) == 1
+    assert len(broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED)) == 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_another_request_is_rejected(saga_repository):
+    idempotency_repository = await _idempotency_repository(saga_repository)
+    request = _request()
+    other_user = {**request, "user_id": str(uuid.uuid4())}
+    other_cart = {**request, "cart_id": str(uuid.uuid4())}
+    headers = {"Idempotency-Key": "order-1"}
+    async with _client(
+        saga_repository, InMemoryBroker(), SagaStatusCache(), idempotency_repository=idempotency_repository
+    ) as client:
+        first = await client.post("/api/checkout", json=request, headers=headers)
+        # Keys are scoped to the user
+        same_key_other_user = await client.post("/api/checkout", json=other_user, headers=headers)
+        conflict = await client.post("/api/checkout", json=other_cart, headers=headers)
+        too_long = await client.post("/api/checkout", json=request, headers={"Idempotency-Key": "k" * 256})
+
+    assert first.status_code == same_key_other_user.status_code == 202
+    assert first.json()["saga_id"] != same_key_other_user.json()["saga_id"]
+    assert conflict.status_code == 422
+    assert too_long.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_a_saga_that_could_not_start_does_not_answer_retries(saga_repository, monkeypatch):
+    idempotency_repository = await _idempotency_repository(saga_repository)
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=60)
+    breaker.open()
+    monkeypatch.setattr("checkout_orchestrator.core.services.checkout_service.kafka_breaker", breaker)
+    request = _request()
+    async with _client(
+        saga_repository, InMemoryBroker(), SagaStatusCache(), idempotency_repository=idempotency_repository
+    ) as client:
+        response = await client.post("/api/checkout", json=request, headers={"Idempotency-Key": "order-1"})
+
+    assert response.status_code == 503
+    assert await saga_repository.database.fetch_all("SELECT * FROM checkout_idempotency_keys") == []
+
+
+@pytest.mark.asyncio
+async def test_checkouts_past_the_user_limit_answer_429(saga_repository):
+    broker = InMemoryBroker()
+    idempotency_repository = await _idempotency_repository(saga_repository)
+    admission_controller = AdmissionController(user_rate=0.1, user_burst=1)
+    request = _request()
+    async with _client(
+        saga_repository,
+        broker,
+        SagaStatusCache(),
+        idempotency_repository=idempotency_repository,
+        admission_controller=admission_controller,
+    ) as client:
+        first = await client.post("/api/checkout", json=request)
+        # A duplicate is answered from the idempotency store and does not need a token
+        duplicate = await client.post("/api/checkout", json=request)
+        rejected = await client.post("/api/checkout", json={**request, "cart_id": str(uuid.uuid4())})
+
+    assert first.status_code == duplicate.status_code == 202
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "10"
+    assert len(broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED)) == 1
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+
+grpc = pytest.importorskip("grpc")
+
+from checkout_orchestrator import checkout_pb2, checkout_pb2_grpc
+from checkout_orchestrator.api.rpc.checkout import CheckoutServicer, create_grpc_server
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.saga_status import SagaStatusCache
+from checkout_orchestrator.core.services.checkout_service import KAFKA_TOPIC_CHECKOUT_INITIATED, CheckoutService
+
+CART_ID = str(uuid.uuid4())
+
+
+async def _cart(user_id):
+    return CART_ID, {"items": [{"product_id": str(uuid.uuid4()), "quantity": 1, "price_cents": 500}], "total_price": 500}
+
+
+async def _empty_cart(user_id):
+    return CART_ID, {"items": [], "total_price": 0}
+
+
+class _Server:
+    def __init__(self, saga_repository, broker, status_cache, cart_loader=_cart):
+        servicer = CheckoutServicer(
+            CheckoutService(saga_repository.database, broker.producer(), saga_repository, status_cache=status_cache),
+            saga_repository,
+            status_cache,
+            cart_loader=cart_loader,
+        )
+        self.server, self.port = create_grpc_server(servicer, "127.0.0.1:0")
+
+    async def __aenter__(self):
+        await self.server.start()
+        self.channel = grpc.aio.insecure_channel(f"127.0.0.1:{self.port}")
+        return checkout_pb2_grpc.CheckoutServiceStub(self.channel)
+
+    async def __aexit__(self, *exc):
+        await self.channel.close()
+        await self.server.stop(None)
+
+
+@pytest.mark.asyncio
+async def test_initiate_checkout_starts_a_saga_and_its_status_is_served(saga_repository):
+    broker = InMemoryBroker()
+    user_id = str(uuid.uuid4())
+    async with _Server(saga_repository, broker, SagaStatusCache()) as stub:
+        response = await stub.InitiateCheckout(checkout_pb2.InitiateCheckoutRequest(user_id=user_id))
+        status = await stub.GetCheckoutStatus(checkout_pb2.GetCheckoutStatusRequest(checkout_id=response.checkout_id))
+
+    saga = await saga_repository.get(response.checkout_id)
+    assert saga.context["user_id"] == user_id
+    assert saga.context["cart_id"] == CART_ID
+    assert status.checkout_id == response.checkout_id
+    assert status.state == checkout_pb2.PENDING
+    assert len(broker.records(KAFKA_TOPIC_CHECKOUT_INITIATED)) == 1
+
+
+@pytest.mark.asyncio
+async def test_grpc_errors_map_to_status_codes(saga_repository):
+    await saga_repository.create_archive_table()
+    async with _Server(saga_repository, InMemoryBroker(), SagaStatusCache(), cart_loader=_empty_cart) as stub:
+        with pytest.raises(grpc.aio.AioRpcError) as invalid:
+            await stub.InitiateCheckout(checkout_pb2.InitiateCheckoutRequest(user_id="not-a-uuid"))
+        with pytest.raises(grpc.aio.AioRpcError) as empty:
+            await stub.InitiateCheckout(checkout_pb2.InitiateCheckoutRequest(user_id=str(uuid.uuid4())))
+        with pytest.raises(grpc.aio.AioRpcError) as missing:
+            await stub.GetCheckoutStatus(checkout_pb2.GetCheckoutStatusRequest(checkout_id=str(uuid.uuid4())))
+
+    assert invalid.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert empty.value.code() == grpc.StatusCode.FAILED_PRECONDITION
+    assert missing.value.code() == grpc.StatusCode.NOT_FOUND
@@ -0,0 +1,49 @@
+# Microbenchmarks of the per-event hot path (needs pytest-benchmark, skipped without it).
+#
+#   Record a baseline:   pytest tests/benchmarks --benchmark-storage=tests/benchmarks/baselines --benchmark-save=baseline
+#   Check against it:    pytest tests/benchmarks --benchmark-storage=tests/benchmarks/baselines \
+#                            --benchmark-compare --benchmark-compare-fail=median:25%
+#
+# Baselines are kept per machine/interpreter (a sub-directory each), so compare on the machine that recorded them.
+# The benchmarks are plain sync tests driving their own event loop: the benchmark fixture cannot await.
+import asyncio
+import datetime
+import uuid
+
+import pytest
+from databases import Database
+
+from benchmarks.payloads import saga_context
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository
+
+# Items per cart: a typical checkout, a big one and a pathological one
+CONTEXT_SIZES = {"small": 1, "medium": 20, "large": 500}
+
+
+def make_saga(item_count: int, state: str = "CHECKOUT_INITIATED") -> SagaState:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return SagaState(
+        id=str(uuid.uuid4()),
+        state=state,
+        context=saga_context(item_count, seed=item_count),
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def bench_saga_repository(loop, tmp_path):
+    database = Database(f"sqlite:///{tmp_path / 'bench.db'}")
+    loop.run_until_complete(database.connect())
+    repository = SagaRepository(database)
+    loop.run_until_complete(repository.create_saga_table())
+    yield repository
+    loop.run_until_complete(database.disconnect())
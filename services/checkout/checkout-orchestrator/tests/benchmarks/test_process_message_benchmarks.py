@@ -0,0 +1,83 @@
+import asyncio
+import itertools
+import json
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.kafka_consumer import SAGA_TRANSITIONS, KafkaConsumerManager
+from tests.benchmarks.conftest import make_saga
+
+pytest.importorskip("pytest_benchmark")
+
+# Enough rounds for stable medians without making every test run much slower
+pytestmark = pytest.mark.benchmark(max_time=0.5)
+
+_offsets = itertools.count()
+
+
+class NullProducer:
+    async def send(self, topic, value, key=None):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+def _pricing(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/discounts/calculate":
+        return httpx.Response(200, json={"totalDiscountCents": 100})
+    return httpx.Response(200, json={"taxCents": 50})
+
+
+def _saga_in(state: str):
+    saga = make_saga(5, state=state)
+    for item in saga.context["cart_details"]["items"]:
+        item["product_id"] = str(uuid.uuid4())
+    # What the earlier steps would have stored
+    saga.context["inventory_reservation_details"] = {"reservation_id": str(uuid.uuid4())}
+    saga.context["payment_details"] = {"payment_id": str(uuid.uuid4())}
+    return saga
+
+
+def _record(payload: dict):
+    return SimpleNamespace(
+        topic="checkout.checkout-events",
+        partition=0,
+        offset=next(_offsets),
+        key=None,
+        value=json.dumps(payload).encode("utf-8"),
+        headers=(),
+    )
+
+
+@pytest.fixture
+def manager(loop, bench_saga_repository):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_pricing))
+    manager = KafkaConsumerManager(
+        bootstrap_servers="in-memory",
+        database=bench_saga_repository.database,
+        saga_repository=bench_saga_repository,
+        producer=NullProducer(),
+        httpx_client=client,
+        consumer_factory=InMemoryBroker().consumer,
+    )
+    yield manager
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.mark.parametrize(
+    "state, event_type", list(SAGA_TRANSITIONS), ids=[event_type for _, event_type in SAGA_TRANSITIONS]
+)
+def test_process_message(benchmark, loop, bench_saga_repository, manager, state, event_type):
+    # One consumed event: decode, load, dispatch, commands, persist
+    benchmark.group = "process_message"
+
+    def setup():
+        saga = _saga_in(state)
+        loop.run_until_complete(bench_saga_repository.create(saga))
+        return (_record({"type": event_type, "saga_id": saga.id, "event_id": str(uuid.uuid4())}),), {}
+
+    benchmark.pedantic(lambda record: loop.run_until_complete(manager.process_message(record)), setup=setup, rounds=50)
@@ -0,0 +1,48 @@
+import pytest
+
+from tests.benchmarks.conftest import CONTEXT_SIZES, make_saga
+
+pytest.importorskip("pytest_benchmark")
+
+# Enough rounds for stable medians without making every test run much slower
+pytestmark = pytest.mark.benchmark(max_time=0.5)
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_create(benchmark, loop, bench_saga_repository, size):
+    benchmark.group = "saga_repository.create"
+
+    def setup():
+        return (make_saga(CONTEXT_SIZES[size]),), {}
+
+    benchmark.pedantic(lambda saga: loop.run_until_complete(bench_saga_repository.create(saga)), setup=setup, rounds=100)
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_get(benchmark, loop, bench_saga_repository, size):
+    benchmark.group = "saga_repository.get"
+    saga = make_saga(CONTEXT_SIZES[size])
+    loop.run_until_complete(bench_saga_repository.create(saga))
+
+    stored = benchmark(lambda: loop.run_until_complete(bench_saga_repository.get(saga.id)))
+
+    assert stored.context == saga.context
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_update_one_step(benchmark, loop, bench_saga_repository, size):
+    # What a saga step writes: the state and a couple of context keys
+    benchmark.group = "saga_repository.update"
+    saga = make_saga(CONTEXT_SIZES[size])
+    loop.run_until_complete(bench_saga_repository.create(saga))
+    step = 0
+
+    def update():
+        nonlocal step
+        step += 1
+        saga.state = "PAYMENT_PROCESSING_PENDING" if step % 2 else "INVENTORY_RESERVATION_PENDING"
+        saga.context["current_step"] = f"STEP_{step}"
+        saga.context["totalDiscountCents"] = step
+        loop.run_until_complete(bench_saga_repository.update(saga))
+
+    benchmark(update)
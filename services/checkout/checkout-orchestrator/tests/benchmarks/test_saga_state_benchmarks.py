@@ -0,0 +1,46 @@
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.utils import json_codec
+from tests.benchmarks.conftest import CONTEXT_SIZES, make_saga
+
+pytest.importorskip("pytest_benchmark")
+
+# Enough rounds for stable medians without making every test run much slower
+pytestmark = pytest.mark.benchmark(max_time=0.5)
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_context_encode(benchmark, size):
+    # The saga_states.context column as the repository writes it
+    benchmark.group = "saga_state.context_encode"
+    saga = make_saga(CONTEXT_SIZES[size])
+
+    benchmark(json_codec.dumps, saga.context)
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_context_decode(benchmark, size):
+    benchmark.group = "saga_state.context_decode"
+    encoded = json_codec.dumps(make_saga(CONTEXT_SIZES[size]).context)
+
+    benchmark(json_codec.loads, encoded)
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_model_round_trip(benchmark, size):
+    # Used by the batch consumer (model_copy) and anything returning a saga over the API
+    benchmark.group = "saga_state.model_round_trip"
+    saga = make_saga(CONTEXT_SIZES[size])
+
+    restored = benchmark(lambda: SagaState.model_validate_json(saga.model_dump_json()))
+
+    assert restored.context == saga.context
+
+
+@pytest.mark.parametrize("size", CONTEXT_SIZES)
+def test_deep_copy(benchmark, size):
+    benchmark.group = "saga_state.model_copy"
+    saga = make_saga(CONTEXT_SIZES[size])
+
+    benchmark(saga.model_copy, deep=True)
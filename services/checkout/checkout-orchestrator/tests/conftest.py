@@ -0,0 +1,23 @@
+import os
+
+# kafka_consumer and config read these at import time; point them somewhere harmless for the test run
+os.environ.setdefault("DISCOUNT_ENGINE_SERVICE_URL", "http://discount-engine.test")
+os.environ.setdefault("TAX_CALCULATION_SERVICE_URL", "http://tax-service.test")
+os.environ.setdefault("USE_IN_MEMORY_DB", "true")
+os.environ.setdefault("MOCK_KAFKA", "true")
+
+import pytest_asyncio  # noqa: E402
+from databases import Database  # noqa: E402
+
+from checkout_orchestrator.infrastructure.repositories.saga_repository import SagaRepository  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def saga_repository(tmp_path):
+    # A file-backed SQLite database: every connection of the pool sees the same tables
+    database = Database(f"sqlite:///{tmp_path / 'sagas.db'}")
+    await database.connect()
+    repository = SagaRepository(database)
+    await repository.create_saga_table()
+    yield repository
+    await database.disconnect()
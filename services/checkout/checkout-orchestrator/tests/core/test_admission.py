@@ -0,0 +1,101 @@
+import pytest
+from pybreaker import CircuitBreaker
+
+from checkout_orchestrator.core.admission import AdmissionController, CheckoutRejected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _rejection(controller: AdmissionController, user_id: str) -> CheckoutRejected:
+    with pytest.raises(CheckoutRejected) as rejected:
+        controller.check(user_id)
+    return rejected.value
+
+
+def test_each_user_has_its_own_bucket():
+    clock = FakeClock()
+    controller = AdmissionController(user_rate=0.5, user_burst=2, clock=clock)
+
+    controller.check("alice")
+    controller.check("alice")
+    rejected = _rejection(controller, "alice")
+    controller.check("bob")
+
+    assert rejected.reason == "user_rate"
+    assert rejected.retry_after == pytest.approx(2.0)
+    assert rejected.retry_after_header == "2"
+    clock.now += 2
+    controller.check("alice")
+
+
+def test_global_bucket_rejection_does_not_cost_the_user_a_token():
+    clock = FakeClock()
+    controller = AdmissionController(global_rate=1, global_burst=1, user_rate=1, user_burst=1, clock=clock)
+
+    controller.check("alice")
+    assert _rejection(controller, "bob").reason == "global_rate"
+    clock.now += 1
+    controller.check("bob")
+
+
+def test_overload_signals_shed_every_checkout():
+    lag = [0]
+    saturation = [0.0]
+    controller = AdmissionController(
+        max_consumer_lag=100,
+        max_db_pool_saturation=0.9,
+        overload_retry_after_s=7,
+        consumer_lag=lambda: lag[0],
+        db_pool_saturation=lambda: saturation[0],
+        clock=FakeClock(),
+    )
+    controller.check("alice")
+
+    lag[0] = 101
+    rejected = _rejection(controller, "bob")
+    assert (rejected.reason, rejected.retry_after) == ("consumer_lag", 7)
+    lag[0] = 0
+    saturation[0] = 0.95
+    assert _rejection(controller, "bob").reason == "db_pool"
+    saturation[0] = 0.5
+    controller.check("bob")
+
+
+def test_open_breaker_sheds_until_its_reset_timeout_then_lets_a_probe_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    controller = AdmissionController(breaker=breaker, clock=clock)
+    breaker.open()
+
+    clock.now += 10
+    rejected = _rejection(controller, "alice")
+    assert rejected.reason == "kafka_breaker"
+    assert rejected.retry_after == pytest.approx(20)
+
+    clock.now += 20
+    controller.check("alice")
+
+
+def test_a_full_spool_sheds_checkouts():
+    backlog = [99]
+    controller = AdmissionController(max_spool_backlog=100, spool_backlog=lambda: backlog[0], clock=FakeClock())
+    controller.check("alice")
+
+    backlog[0] = 100
+    assert _rejection(controller, "bob").reason == "spool"
+
+
+def test_tracked_users_are_bounded():
+    controller = AdmissionController(user_rate=0.001, user_burst=1, max_users=2, clock=FakeClock())
+    for user_id in ("a", "b", "c"):
+        controller.check(user_id)
+
+    # "a" was evicted and starts over with a full bucket; "c" is still tracked
+    controller.check("a")
+    assert _rejection(controller, "c").reason == "user_rate"
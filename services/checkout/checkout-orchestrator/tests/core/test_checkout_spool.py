@@ -0,0 +1,88 @@
+import json
+import uuid
+
+import pytest
+from pybreaker import CircuitBreaker, CircuitBreakerError
+
+from checkout_orchestrator.core.checkout_spool import CheckoutSpool, SpoolDrainer, SpoolFull
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.services.checkout_service import KAFKA_TOPIC_CHECKOUT_INITIATED, CheckoutService
+
+TOPIC = KAFKA_TOPIC_CHECKOUT_INITIATED
+
+
+async def _spool(tmp_path, max_entries=100) -> CheckoutSpool:
+    spool = CheckoutSpool(str(tmp_path / "spool.db"), max_entries=max_entries)
+    await spool.open()
+    return spool
+
+
+@pytest.mark.asyncio
+async def test_spooled_events_survive_a_restart(tmp_path):
+    spool = await _spool(tmp_path)
+    for i in range(3):
+        await spool.append(f"saga-{i}", TOPIC, {"type": "CheckoutInitiated", "saga_id": f"saga-{i}"})
+    first = await spool.peek(1)
+    await spool.delete([event.id for event in first])
+    await spool.close()
+
+    spool = await _spool(tmp_path)
+    assert spool.backlog == 2
+    assert [event.saga_id for event in await spool.peek(10)] == ["saga-1", "saga-2"]
+    assert (await spool.peek(1))[0].payload == {"type": "CheckoutInitiated", "saga_id": "saga-1"}
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_spool_is_bounded(tmp_path):
+    spool = await _spool(tmp_path, max_entries=1)
+    await spool.append("saga-1", TOPIC, {})
+
+    with pytest.raises(SpoolFull):
+        await spool.append("saga-2", TOPIC, {})
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_drainer_waits_for_the_breaker_and_replays_in_order(tmp_path):
+    spool = await _spool(tmp_path)
+    broker = InMemoryBroker(partitions=1)
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=60)
+    drainer = SpoolDrainer(spool, broker.producer(), breaker=breaker, batch_size=2)
+    for i in range(3):
+        await spool.append(f"saga-{i}", TOPIC, {"type": "CheckoutInitiated", "saga_id": f"saga-{i}"})
+
+    breaker.open()
+    with pytest.raises(CircuitBreakerError):
+        await drainer.drain_once()
+    assert spool.backlog == 3
+
+    breaker.close()
+    assert await drainer.drain_once() == 2
+    assert await drainer.drain_once() == 1
+    assert await drainer.drain_once() == 0
+    assert spool.backlog == 0
+    assert [json.loads(record.value)["saga_id"] for record in broker.records(TOPIC)] == ["saga-0", "saga-1", "saga-2"]
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_checkout_is_spooled_while_the_breaker_is_open(saga_repository, tmp_path, monkeypatch):
+    spool = await _spool(tmp_path)
+    broker = InMemoryBroker()
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=60)
+    breaker.open()
+    monkeypatch.setattr("checkout_orchestrator.core.services.checkout_service.kafka_breaker", breaker)
+    service = CheckoutService(saga_repository.database, broker.producer(), saga_repository, spool=spool)
+
+    saga_id = await service.start_checkout_saga(str(uuid.uuid4()), str(uuid.uuid4()), {"items": [], "total_price": 0})
+
+    assert (await saga_repository.get(saga_id)).state == "CHECKOUT_INITIATED"
+    assert broker.records(TOPIC) == []
+    [event] = await spool.peek(10)
+    assert (event.saga_id, event.topic, event.payload["type"]) == (saga_id, TOPIC, "CheckoutInitiated")
+
+    breaker.close()
+    await SpoolDrainer(spool, broker.producer(), breaker=breaker).drain_once()
+    assert json.loads(broker.records(TOPIC)[0].value)["saga_id"] == saga_id
+    await spool.close()
@@ -0,0 +1,34 @@
+import httpx
+import pytest
+
+from checkout_orchestrator.core.config import registry
+from checkout_orchestrator.core.http_metrics import InstrumentedTransport
+
+
+def _sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_records_latency_and_errors_per_upstream():
+    def respond(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/broken":
+            return httpx.Response(503)
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"taxCents": 0})
+
+    upstream = "tax-metrics.test"
+    latency_before = _sample("checkout_http_client_request_seconds_count", upstream=upstream, method="POST")
+    server_errors_before = _sample("checkout_http_client_errors_total", upstream=upstream, reason="5xx")
+    connect_errors_before = _sample("checkout_http_client_errors_total", upstream=upstream, reason="ConnectError")
+
+    async with httpx.AsyncClient(transport=InstrumentedTransport(httpx.MockTransport(respond))) as client:
+        assert (await client.post(f"http://{upstream}/ok")).status_code == 200
+        assert (await client.post(f"http://{upstream}/broken")).status_code == 503
+        with pytest.raises(httpx.ConnectError):
+            await client.post(f"http://{upstream}/down")
+
+    assert _sample("checkout_http_client_request_seconds_count", upstream=upstream, method="POST") == latency_before + 3
+    assert _sample("checkout_http_client_errors_total", upstream=upstream, reason="5xx") == server_errors_before + 1
+    assert _sample("checkout_http_client_errors_total", upstream=upstream, reason="ConnectError") == connect_errors_before + 1
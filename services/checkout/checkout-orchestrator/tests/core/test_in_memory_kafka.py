@@ -0,0 +1,251 @@
+import asyncio
+import datetime
+import json
+import uuid
+
+import httpx
+import pytest
+from aiokafka import ConsumerRebalanceListener, TopicPartition
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.fake_responders import start_fake_responders
+from checkout_orchestrator.core.in_memory_kafka import InMemoryBroker
+from checkout_orchestrator.core.saga_events import SagaEventBus
+from checkout_orchestrator.core.kafka_consumer import (
+    KAFKA_TOPIC_CHECKOUT_EVENTS,
+    KAFKA_TOPIC_CHECKOUT_INITIATED,
+    SAGA_STATE_COMPENSATING,
+    SAGA_STATE_COMPLETED,
+    SAGA_STATE_INITIATED,
+    KafkaConsumerManager,
+)
+
+
+class RecordingListener(ConsumerRebalanceListener):
+    def __init__(self):
+        self.revoked = []
+
+    async def on_partitions_revoked(self, revoked):
+        self.revoked.append(set(revoked))
+
+    async def on_partitions_assigned(self, assigned):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_records_with_the_same_key_stay_in_one_partition_in_order():
+    broker = InMemoryBroker(partitions=4)
+    producer = broker.producer()
+    for i in range(10):
+        await producer.send_and_wait("orders", f"a-{i}".encode(), key=b"saga-a")
+        await producer.send_and_wait("orders", f"b-{i}".encode(), key=b"saga-b")
+
+    by_key = {}
+    for record in broker.records("orders"):
+        by_key.setdefault(record.key, []).append(record)
+    for key, records in by_key.items():
+        assert len({record.partition for record in records}) == 1
+        assert [record.value for record in records] == [f"{key.decode()[-1]}-{i}".encode() for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_consumer_group_splits_partitions_and_rebalances_on_leave():
+    broker = InMemoryBroker(partitions=4)
+    listener = RecordingListener()
+    first = broker.consumer(group_id="group", auto_offset_reset="earliest")
+    first.subscribe(["orders"], listener=listener)
+    second = broker.consumer("orders", group_id="group", auto_offset_reset="earliest")
+    await first.start()
+    await second.start()
+
+    assert len(first.assignment()) == len(second.assignment()) == 2
+    assert listener.revoked == [second.assignment()]
+
+    await second.stop()
+    assert first.assignment() == {TopicPartition("orders", p) for p in range(4)}
+    await first.stop()
+
+
+@pytest.mark.asyncio
+async def test_committed_offsets_are_resumed_by_the_next_group_member():
+    broker = InMemoryBroker(partitions=1)
+    producer = broker.producer()
+    for i in range(5):
+        await producer.send_and_wait("orders", str(i).encode())
+
+    consumer = broker.consumer("orders", group_id="group", auto_offset_reset="earliest", enable_auto_commit=False)
+    await consumer.start()
+    records = await consumer.getmany(timeout_ms=0, max_records=3)
+    await consumer.commit({tp: batch[-1].offset + 1 for tp, batch in records.items()})
+    await consumer.stop()
+
+    consumer = broker.consumer("orders", group_id="group", auto_offset_reset="earliest")
+    await consumer.start()
+    assert (await consumer.getone()).value == b"3"
+    await consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_getmany_waits_for_records_until_the_timeout():
+    broker = InMemoryBroker(partitions=2)
+    consumer = broker.consumer("orders", group_id="group")
+    await consumer.start()
+    producer = broker.producer()
+
+    assert await consumer.getmany(timeout_ms=10) == {}
+    asyncio.get_running_loop().call_later(0.01, lambda: asyncio.ensure_future(producer.send("orders", b"late")))
+    records = await consumer.getmany(timeout_ms=1000)
+
+    assert [record.value for batch in records.values() for record in batch] == [b"late"]
+    await consumer.stop()
+
+
+async def _until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_batch_consumer_survives_a_rebalance_during_a_batch(saga_repository):
+    broker = InMemoryBroker(partitions=2)
+    manager = KafkaConsumerManager(
+        bootstrap_servers="in-memory",
+        database=saga_repository.database,
+        saga_repository=saga_repository,
+        producer=broker.producer(),
+        httpx_client=None,
+        consumer_factory=broker.consumer,
+        batch_size=10,
+    )
+    applied = []
+    release = asyncio.Event()
+
+    async def slow_batch(records):
+        applied.append(sum(len(msgs) for msgs in records.values()))
+        await release.wait()
+
+    manager.process_batch = slow_batch
+    consumer_task = asyncio.create_task(manager.start_consumer())
+    await _until(lambda: manager.consumer.assignment())
+    for partition in (0, 1):
+        broker.append(KAFKA_TOPIC_CHECKOUT_EVENTS, b"{}", partition=partition)
+    await _until(lambda: applied)
+
+    # A second member joins while the batch is in flight: revocation waits for the batch and its commit
+    second = broker.consumer(KAFKA_TOPIC_CHECKOUT_INITIATED, KAFKA_TOPIC_CHECKOUT_EVENTS, group_id="checkout-orchestrator-group")
+    join = asyncio.create_task(second.start())
+    await asyncio.sleep(0.02)
+    assert not join.done()
+    release.set()
+    await join
+    for partition in (0, 1):
+        assert broker.committed("checkout-orchestrator-group", TopicPartition(KAFKA_TOPIC_CHECKOUT_EVENTS, partition)) == 1
+
+    # A failing commit is logged and consumption goes on
+    async def failing_commit(offsets=None):
+        raise RuntimeError("rebalance in progress")
+
+    manager.consumer.commit = failing_commit
+    kept = next(tp for tp in manager.consumer.assignment() if tp.topic == KAFKA_TOPIC_CHECKOUT_EVENTS)
+    broker.append(kept.topic, b"{}", partition=kept.partition)
+    await _until(lambda: len(applied) == 2)
+    broker.append(kept.topic, b"{}", partition=kept.partition)
+    await _until(lambda: len(applied) == 3)
+    assert not consumer_task.done()
+
+    consumer_task.cancel()
+    await consumer_task
+    await second.stop()
+
+
+def _pricing(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/discounts/calculate":
+        return httpx.Response(200, json={"totalDiscountCents": 100})
+    return httpx.Response(200, json={"taxCents": 50})
+
+
+async def _run_saga(saga_repository, broker, failure_rates=None, event_bus=None, saga_id=None) -> SagaState:
+    producer = broker.producer()
+    responders = await start_fake_responders(broker, failure_rates=failure_rates)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(_pricing)) as client:
+        manager = KafkaConsumerManager(
+            bootstrap_servers="in-memory",
+            database=saga_repository.database,
+            saga_repository=saga_repository,
+            producer=producer,
+            httpx_client=client,
+            consumer_factory=broker.consumer,
+            event_bus=event_bus,
+        )
+        consumer_task = asyncio.create_task(manager.start_consumer())
+        now = datetime.datetime.now(datetime.timezone.utc)
+        saga = SagaState(
+            id=saga_id or str(uuid.uuid4()),
+            state=SAGA_STATE_INITIATED,
+            context={
+                "cart_id": str(uuid.uuid4()),
+                "user_id": str(uuid.uuid4()),
+                "cart_details": {"items": [{"product_id": str(uuid.uuid4()), "quantity": 2}], "total_price": 1000},
+                "current_step": "CHECKOUT_INITIATED",
+                "errors": [],
+            },
+            created_at=now,
+            updated_at=now,
+        )
+        await saga_repository.create(saga)
+        await producer.send_and_wait(
+            KAFKA_TOPIC_CHECKOUT_INITIATED,
+            json.dumps({"type": "CheckoutInitiated", "saga_id": saga.id}).encode(),
+            key=saga.id.encode(),
+        )
+        for _ in range(200):
+            stored = await saga_repository.get(saga.id)
+            if stored.state in (SAGA_STATE_COMPLETED, SAGA_STATE_COMPENSATING):
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop_consumer()
+        await consumer_task
+    for responder in responders:
+        await responder.stop()
+    return stored
+
+
+@pytest.mark.asyncio
+async def test_fake_services_drive_a_saga_to_completion(saga_repository):
+    stored = await _run_saga(saga_repository, InMemoryBroker())
+
+    assert stored.state == SAGA_STATE_COMPLETED
+    assert stored.context["finalAmountCents"] == 1000 + 50 - 100
+    assert stored.context["order_details"]["order_id"]
+
+
+@pytest.mark.asyncio
+async def test_fake_service_failures_lead_to_compensation(saga_repository):
+    broker = InMemoryBroker()
+    stored = await _run_saga(saga_repository, broker, failure_rates={"payment": 1.0})
+
+    assert stored.state == SAGA_STATE_COMPENSATING
+    commands = [json.loads(record.value)["type"] for record in broker.records("checkout.inventory-command")]
+    assert commands == ["ReserveInventory", "CompensateInventory"]
+
+
+@pytest.mark.asyncio
+async def test_consumer_publishes_every_committed_saga_update(saga_repository):
+    event_bus = SagaEventBus(queue_size=100)
+    saga_id = str(uuid.uuid4())
+    with event_bus.subscribe(saga_id) as subscription:
+        await _run_saga(saga_repository, InMemoryBroker(), event_bus=event_bus, saga_id=saga_id)
+        statuses = []
+        while (status := await subscription.next(timeout=0)) is not None:
+            statuses.append(status.status)
+
+    assert statuses == [
+        "INVENTORY_RESERVATION_PENDING",
+        "PAYMENT_PROCESSING_PENDING",
+        "ORDER_CREATION_PENDING",
+        "CART_CLEARANCE_PENDING",
+        SAGA_STATE_COMPLETED,
+    ]
@@ -0,0 +1,443 @@
+import asyncio
+import datetime
+import json
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+from checkout_orchestrator.infrastructure.repositories.processed_event_repository import ProcessedEventRepository
+from checkout_orchestrator.core.kafka_consumer import (
+    KAFKA_TOPIC_INVENTORY_COMMAND,
+    KAFKA_TOPIC_PAYMENT_COMMAND,
+    SAGA_STATE_PAYMENT_PROCESSING_PENDING,
+    SAGA_STATE_FAILED,
+    SAGA_STATE_INITIATED,
+    SAGA_STATE_INVENTORY_RESERVATION_PENDING,
+    SAGA_STATE_COMPENSATING,
+    DEFAULT_SAGA_TIMEOUTS,
+    SAGA_TRANSITIONS,
+    KafkaConsumerManager,
+)
+from checkout_orchestrator.core.config import registry
+from checkout_orchestrator.core.saga_cache import SagaStateCache
+
+
+class RecordingProducer:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, value, key=None):
+        self.sent.append((topic, json.loads(value)))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+def _saga(saga_id: str) -> SagaState:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return SagaState(
+        id=saga_id,
+        state=SAGA_STATE_INITIATED,
+        context={
+            "cart_id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "cart_details": {"items": [{"product_id": str(uuid.uuid4()), "quantity": 1}], "total_price": 1000},
+            "current_step": "CHECKOUT_INITIATED",
+            "errors": [],
+        },
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def _record(offset: int, payload: dict, topic: str = "checkout.checkout-events"):
+    return SimpleNamespace(
+        topic=topic, partition=0, offset=offset, key=None, value=json.dumps(payload).encode("utf-8")
+    )
+
+
+def _manager(saga_repository, producer, **kwargs) -> KafkaConsumerManager:
+    return KafkaConsumerManager(
+        bootstrap_servers="localhost:9092",
+        database=saga_repository.database,
+        saga_repository=saga_repository,
+        producer=producer,
+        httpx_client=None,
+        batch_size=100,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_batch_applies_events_in_order_and_persists_once(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer)
+    first, second = _saga(str(uuid.uuid4())), _saga(str(uuid.uuid4()))
+    await saga_repository.create(first)
+    await saga_repository.create(second)
+
+    records = {
+        "tp-0": [
+            _record(0, {"type": "CheckoutInitiated", "saga_id": first.id, "event_id": "e1"}),
+            _record(1, {"type": "CheckoutInitiated", "saga_id": second.id, "event_id": "e2"}),
+            _record(2, {"type": "InventoryReservationFailed", "saga_id": first.id, "event_id": "e3", "reason": "out of stock"}),
+            # Redelivery of an already applied event inside the same batch
+            _record(3, {"type": "CheckoutInitiated", "saga_id": second.id, "event_id": "e2"}),
+        ]
+    }
+    await manager.process_batch(records)
+
+    stored = await saga_repository.get_many([first.id, second.id])
+    assert stored[first.id].state == SAGA_STATE_FAILED
+    assert stored[first.id].processed_event_ids == ["e1", "e3"]
+    assert stored[second.id].state == SAGA_STATE_INVENTORY_RESERVATION_PENDING
+    assert stored[second.id].processed_event_ids == ["e2"]
+    assert [topic for topic, _ in producer.sent] == [KAFKA_TOPIC_INVENTORY_COMMAND] * 2
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_leaves_saga_untouched_when_handler_fails(saga_repository):
+    producer = RecordingProducer()
+    # No httpx client: the discount/tax quote in handle_inventory_reserved blows up
+    manager = _manager(saga_repository, producer)
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+
+    await manager.process_batch({
+        "tp-0": [
+            _record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}),
+            _record(1, {"type": "InventoryReserved", "saga_id": saga.id, "event_id": "e2"}),
+        ]
+    })
+
+    stored = await saga_repository.get(saga.id)
+    assert stored.state == SAGA_STATE_INVENTORY_RESERVATION_PENDING
+    assert stored.processed_event_ids == ["e1"]
+    assert [topic for topic, _ in producer.sent] == [KAFKA_TOPIC_INVENTORY_COMMAND]
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_commands_go_to_the_outbox_with_the_saga_update(saga_repository):
+    outbox_repository = OutboxRepository(saga_repository.database)
+    await outbox_repository.create_outbox_table()
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer, outbox_repository=outbox_repository)
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+
+    await manager.process_message(_record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+
+    assert producer.sent == []
+    rows = await outbox_repository.fetch_unpublished(10)
+    assert [(row["saga_id"], row["topic"]) for row in rows] == [(saga.id, KAFKA_TOPIC_INVENTORY_COMMAND)]
+    assert json.loads(rows[0]["payload"])["type"] == "ReserveInventory"
+    assert (await saga_repository.get(saga.id)).state == SAGA_STATE_INVENTORY_RESERVATION_PENDING
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_inventory_reserved_quotes_discount_and_tax_concurrently_and_persists_once(saga_repository):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def pricing(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        if request.url.path == "/api/discounts/calculate":
+            return httpx.Response(200, json={"totalDiscountCents": 150})
+        return httpx.Response(200, json={"taxCents": 80})
+
+    updates = []
+    original_update = saga_repository.update
+
+    async def counting_update(saga_state):
+        updates.append(saga_state.state)
+        return await original_update(saga_state)
+
+    saga_repository.update = counting_update
+    producer = RecordingProducer()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(pricing)) as client:
+        manager = KafkaConsumerManager(
+            bootstrap_servers="localhost:9092",
+            database=saga_repository.database,
+            saga_repository=saga_repository,
+            producer=producer,
+            httpx_client=client,
+        )
+        saga = _saga(str(uuid.uuid4()))
+        saga.state = SAGA_STATE_INVENTORY_RESERVATION_PENDING
+        await saga_repository.create(saga)
+
+        await manager.process_message(_record(0, {"type": "InventoryReserved", "saga_id": saga.id, "event_id": "e1"}))
+
+    assert max_in_flight == 2
+    assert updates == [SAGA_STATE_PAYMENT_PROCESSING_PENDING]
+    stored = await saga_repository.get(saga.id)
+    assert stored.context["finalAmountCents"] == 1000 + 80 - 150
+    assert [topic for topic, _ in producer.sent] == [KAFKA_TOPIC_PAYMENT_COMMAND]
+    assert producer.sent[0][1]["amount"] == 930
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_a_failed_quote_cancels_the_other_one(saga_repository):
+    tax_cancelled = asyncio.Event()
+
+    async def pricing(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/discounts/calculate":
+            return httpx.Response(503, text="unavailable")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            tax_cancelled.set()
+            raise
+        return httpx.Response(200, json={"taxCents": 80})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(pricing)) as client:
+        manager = KafkaConsumerManager(
+            bootstrap_servers="localhost:9092",
+            database=saga_repository.database,
+            saga_repository=saga_repository,
+            producer=RecordingProducer(),
+            httpx_client=client,
+        )
+        saga = _saga(str(uuid.uuid4()))
+        saga.state = SAGA_STATE_INVENTORY_RESERVATION_PENDING
+
+        with pytest.raises(RuntimeError, match="Discount engine returned 503"):
+            await asyncio.wait_for(manager.handle_inventory_reserved(saga, {}), timeout=1)
+
+    assert tax_cancelled.is_set()
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_processed_events_table_dedupes_without_growing_the_saga_row(saga_repository):
+    processed_event_repository = ProcessedEventRepository(saga_repository.database)
+    await processed_event_repository.create_processed_events_table()
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer, processed_event_repository=processed_event_repository)
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+
+    initiated = {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}
+    await manager.process_batch({"tp-0": [_record(0, initiated), _record(1, initiated)]})
+    # Redelivered later, outside the batch
+    await manager.process_message(_record(2, initiated))
+
+    stored = await saga_repository.get(saga.id)
+    assert stored.state == SAGA_STATE_INVENTORY_RESERVATION_PENDING
+    assert stored.processed_event_ids == []
+    assert await processed_event_repository.exists(saga.id, "e1")
+    assert len(producer.sent) == 1
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_saga_cache_serves_reads_for_sagas_this_instance_wrote(saga_repository):
+    reads = []
+    original_get = saga_repository.get
+
+    async def counting_get(saga_id):
+        reads.append(saga_id)
+        return await original_get(saga_id)
+
+    saga_repository.get = counting_get
+    saga_cache = SagaStateCache(max_entries=10)
+    manager = _manager(saga_repository, RecordingProducer(), saga_cache=saga_cache)
+    saga = _saga(str(uuid.uuid4()))
+    saga.state = "CART_CLEARANCE_PENDING"
+    await saga_repository.create(saga)
+
+    await manager.process_message(_record(0, {"type": "CartClearanceFailed", "saga_id": saga.id, "event_id": "e1"}))
+    await manager.process_message(_record(1, {"type": "CartCleared", "saga_id": saga.id, "event_id": "e2"}))
+
+    assert reads == [saga.id]
+    assert saga_cache.get(saga.id).state == "COMPENSATING"
+
+    await manager.on_partitions_revoked([])
+    assert len(saga_cache) == 0
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_timed_out_sagas_are_compensated_in_one_sweep(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer, saga_timeouts=DEFAULT_SAGA_TIMEOUTS)
+    long_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+    stuck_payment, stuck_start, waiting = _saga(str(uuid.uuid4())), _saga(str(uuid.uuid4())), _saga(str(uuid.uuid4()))
+    stuck_payment.state = SAGA_STATE_PAYMENT_PROCESSING_PENDING
+    stuck_payment.updated_at = long_ago
+    stuck_start.updated_at = long_ago
+    waiting.state = SAGA_STATE_PAYMENT_PROCESSING_PENDING
+    for saga in (stuck_payment, stuck_start, waiting):
+        await saga_repository.create(saga)
+
+    assert await manager.expire_timed_out_sagas() == 2
+
+    stored = await saga_repository.get_many([stuck_payment.id, stuck_start.id, waiting.id])
+    assert stored[stuck_payment.id].state == SAGA_STATE_COMPENSATING
+    assert stored[stuck_payment.id].context["errors"][-1]["step"] == "timeout"
+    assert stored[stuck_start.id].state == SAGA_STATE_FAILED
+    assert stored[waiting.id].state == SAGA_STATE_PAYMENT_PROCESSING_PENDING
+    assert [(topic, payload["type"]) for topic, payload in producer.sent] == [
+        (KAFKA_TOPIC_PAYMENT_COMMAND, "CompensatePayment"),
+        (KAFKA_TOPIC_INVENTORY_COMMAND, "CompensateInventory"),
+    ]
+    # Already compensated: a second sweep finds nothing
+    assert await manager.expire_timed_out_sagas() == 0
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_persisted_sagas_are_tracked_by_the_timer_wheel_until_terminal(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer, saga_timeouts={SAGA_STATE_INVENTORY_RESERVATION_PENDING: 0.01})
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+
+    await manager.process_message(_record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+    assert saga.id in manager.timer_wheel
+
+    await manager.process_message(
+        _record(1, {"type": "InventoryReservationFailed", "saga_id": saga.id, "event_id": "e2", "reason": "gone"})
+    )
+    assert saga.id not in manager.timer_wheel
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_wheel_expiry_only_touches_sagas_still_past_their_deadline(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer, saga_timeouts={SAGA_STATE_INVENTORY_RESERVATION_PENDING: 0.01})
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+    await manager.process_message(_record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+    producer.sent.clear()
+
+    await asyncio.sleep(0.05)
+    due = manager.timer_wheel.advance(datetime.datetime.now(datetime.timezone.utc).timestamp() + 2)
+    assert due == [saga.id]
+    assert await manager.expire_timed_out_sagas(due) == 1
+
+    assert (await saga_repository.get(saga.id)).state == SAGA_STATE_COMPENSATING
+    assert [payload["type"] for _, payload in producer.sent] == ["CompensateInventory"]
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_transition_racing_a_timeout_is_dropped_and_the_saga_reloaded(saga_repository):
+    producer = RecordingProducer()
+    saga_cache = SagaStateCache(max_entries=10)
+    manager = _manager(saga_repository, producer, saga_cache=saga_cache)
+    saga = _saga(str(uuid.uuid4()))
+    saga.state = SAGA_STATE_PAYMENT_PROCESSING_PENDING
+    saga.context["inventory_reservation_details"] = {"reservation_id": "r1"}
+    saga.updated_at -= datetime.timedelta(hours=1)
+    await saga_repository.create(saga)
+    saga_cache.put(await saga_repository.get(saga.id))
+
+    # Another replica's sweep times the saga out; this instance still caches the old state
+    sweeper = _manager(saga_repository, RecordingProducer(), saga_timeouts=DEFAULT_SAGA_TIMEOUTS)
+    assert await sweeper.expire_timed_out_sagas() == 1
+    conflicts = _sample("checkout_saga_update_conflicts_total")
+
+    await manager.process_message(_record(0, {"type": "PaymentProcessed", "saga_id": saga.id, "event_id": "e1"}))
+
+    stored = await saga_repository.get(saga.id)
+    assert stored.state == SAGA_STATE_COMPENSATING
+    assert stored.processed_event_ids == []
+    assert producer.sent == []
+    assert saga_cache.get(saga.id).state == SAGA_STATE_COMPENSATING
+    assert _sample("checkout_saga_update_conflicts_total") == conflicts + 1
+    await manager.consumer.stop()
+    await sweeper.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_rejected_events_do_not_move_the_timeout_deadline(saga_repository):
+    manager = _manager(saga_repository, RecordingProducer(), saga_timeouts=DEFAULT_SAGA_TIMEOUTS)
+    saga = _saga(str(uuid.uuid4()))
+    saga.state = SAGA_STATE_PAYMENT_PROCESSING_PENDING
+    saga.updated_at -= datetime.timedelta(hours=1)
+    await saga_repository.create(saga)
+
+    # Out of order for PAYMENT_PROCESSING_PENDING, then an event type no transition knows
+    await manager.process_message(_record(0, {"type": "InventoryReserved", "saga_id": saga.id, "event_id": "e1"}))
+    await manager.process_message(_record(1, {"type": "SomethingElse", "saga_id": saga.id, "event_id": "e2"}))
+
+    stored = await saga_repository.get(saga.id)
+    assert stored.processed_event_ids == ["e1", "e2"]
+    assert stored.updated_at == saga.updated_at
+    assert manager.timer_wheel.advance(datetime.datetime.now(datetime.timezone.utc).timestamp()) == [saga.id]
+    assert await manager.expire_timed_out_sagas() == 1
+    assert (await saga_repository.get(saga.id)).state == SAGA_STATE_COMPENSATING
+    await manager.consumer.stop()
+
+
+def _sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_transitions_are_dispatched_from_the_table_and_measured(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer)
+    assert set(manager.transitions) == set(SAGA_TRANSITIONS)
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+    transition = {"state": SAGA_STATE_INITIATED, "event_type": "CheckoutInitiated"}
+    out_of_order = {"state": SAGA_STATE_INVENTORY_RESERVATION_PENDING, "event_type": "PaymentProcessed", "reason": "out_of_order"}
+    unknown = {"state": SAGA_STATE_INVENTORY_RESERVATION_PENDING, "event_type": "other", "reason": "unknown_event"}
+    duplicate = {"state": SAGA_STATE_INVENTORY_RESERVATION_PENDING, "event_type": "CheckoutInitiated", "reason": "duplicate"}
+    before = {
+        "latency": _sample("checkout_saga_transition_seconds_count", **transition),
+        "out_of_order": _sample("checkout_saga_events_rejected_total", **out_of_order),
+        "unknown": _sample("checkout_saga_events_rejected_total", **unknown),
+        "duplicate": _sample("checkout_saga_events_rejected_total", **duplicate),
+    }
+
+    await manager.process_message(_record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+    await manager.process_message(_record(1, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+    await manager.process_message(_record(2, {"type": "PaymentProcessed", "saga_id": saga.id, "event_id": "e2"}))
+    await manager.process_message(_record(3, {"type": "SomethingElse", "saga_id": saga.id, "event_id": "e3"}))
+
+    assert (await saga_repository.get(saga.id)).state == SAGA_STATE_INVENTORY_RESERVATION_PENDING
+    assert _sample("checkout_saga_transition_seconds_count", **transition) == before["latency"] + 1
+    assert _sample("checkout_saga_events_rejected_total", **out_of_order) == before["out_of_order"] + 1
+    assert _sample("checkout_saga_events_rejected_total", **unknown) == before["unknown"] + 1
+    assert _sample("checkout_saga_events_rejected_total", **duplicate) == before["duplicate"] + 1
+    await manager.consumer.stop()
+
+
+@pytest.mark.asyncio
+async def test_saga_duration_and_repository_latency_are_recorded(saga_repository):
+    producer = RecordingProducer()
+    manager = _manager(saga_repository, producer)
+    saga = _saga(str(uuid.uuid4()))
+    await saga_repository.create(saga)
+    failed_before = _sample("checkout_saga_duration_seconds_count", outcome="failed")
+    updates_before = _sample("checkout_saga_repository_query_seconds_count", operation="update")
+
+    await manager.process_message(_record(0, {"type": "CheckoutInitiated", "saga_id": saga.id, "event_id": "e1"}))
+    assert _sample("checkout_saga_duration_seconds_count", outcome="failed") == failed_before
+    await manager.process_message(
+        _record(1, {"type": "InventoryReservationFailed", "saga_id": saga.id, "event_id": "e2", "reason": "gone"})
+    )
+    # Redelivered outcome: the saga does not change, so it is not measured twice
+    await manager.process_message(
+        _record(2, {"type": "InventoryReservationFailed", "saga_id": saga.id, "event_id": "e3", "reason": "gone"})
+    )
+
+    assert _sample("checkout_saga_duration_seconds_count", outcome="failed") == failed_before + 1
+    assert _sample("checkout_saga_repository_query_seconds_count", operation="update") == updates_before + 3
+    await manager.consumer.stop()
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from checkout_orchestrator.core.lanes import PartitionOffsetTracker, SagaLanePool
+
+
+def _msg(offset, partition=0, topic="checkout.checkout-events"):
+    return SimpleNamespace(topic=topic, partition=partition, offset=offset)
+
+
+def test_offset_tracker_only_advances_past_contiguous_completions():
+    tracker = PartitionOffsetTracker()
+    for offset in (10, 11, 12):
+        tracker.track(offset)
+
+    tracker.complete(12)
+    assert tracker.committable is None
+
+    tracker.complete(10)
+    assert tracker.committable == 11
+
+    tracker.complete(11)
+    assert tracker.committable == 13
+    assert tracker.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_events_of_one_saga_are_processed_in_order_while_others_run():
+    processed = []
+    release_slow = asyncio.Event()
+
+    async def handler(msg, event_data):
+        if event_data["saga_id"] == "slow":
+            await release_slow.wait()
+        processed.append((event_data["saga_id"], msg.offset))
+
+    pool = SagaLanePool(handler, lanes=8, queue_size=10)
+    # Make sure the two sagas do not share a lane
+    fast_id = next(f"fast-{i}" for i in range(100) if pool.lane_for(f"fast-{i}") != pool.lane_for("slow"))
+    pool.start()
+
+    await pool.submit("slow", _msg(0), {"saga_id": "slow"})
+    await pool.submit(fast_id, _msg(1), {"saga_id": fast_id})
+    await pool.submit(fast_id, _msg(2), {"saga_id": fast_id})
+    await asyncio.sleep(0.01)
+
+    assert processed == [(fast_id, 1), (fast_id, 2)]
+    # Offset 0 is still in flight, so nothing can be committed yet
+    assert pool.pop_committable() == {}
+
+    release_slow.set()
+    await pool.drain()
+    assert pool.pop_committable() == {("checkout.checkout-events", 0): 3}
+    assert pool.pop_committable() == {}
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_skipped_records_still_advance_the_committable_offset():
+    async def handler(msg, event_data):
+        pass
+
+    pool = SagaLanePool(handler, lanes=2, queue_size=10)
+    pool.start()
+    await pool.submit("saga", _msg(0), {"saga_id": "saga"})
+    pool.skip(_msg(1))
+    await pool.drain()
+
+    assert pool.pop_committable() == {("checkout.checkout-events", 0): 2}
+    await pool.stop()
@@ -0,0 +1,87 @@
+import logging
+
+import pytest
+
+from checkout_orchestrator.core.log_sampling import SagaLogPolicy, SampledLogFilter
+
+
+def _record(level: int) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, "message", (), None)
+
+
+def test_sampling_follows_the_rate_of_the_event_type():
+    policy = SagaLogPolicy(sample_rates={"InventoryReserved": 0.0, "PaymentFailed": 1.0}, default_rate=0.25)
+    saga_ids = [f"saga-{i}" for i in range(2000)]
+
+    assert not any(policy.sampled("InventoryReserved", saga_id) for saga_id in saga_ids)
+    assert all(policy.sampled("PaymentFailed", saga_id) for saga_id in saga_ids)
+    sampled = sum(policy.sampled("OrderCreated", saga_id) for saga_id in saga_ids)
+    assert 350 < sampled < 650
+
+
+def test_sampling_decision_is_stable_for_a_saga():
+    policy = SagaLogPolicy(default_rate=0.5)
+
+    assert len({policy.sampled("CartCleared", "saga-1") for _ in range(20)}) == 1
+
+
+def test_debug_sagas_are_always_logged_with_the_full_payload():
+    policy = SagaLogPolicy(default_rate=0.0, max_payload_chars=10)
+    policy.enable_debug("saga-1")
+
+    assert policy.sampled("InventoryReserved", "saga-1")
+    assert not policy.sampled("InventoryReserved", "saga-2")
+    assert str(policy.payload({"note": "x" * 50}, "saga-1")) == '{"note":"' + "x" * 50 + '"}'
+
+    policy.disable_debug("saga-1")
+    assert not policy.sampled("InventoryReserved", "saga-1")
+
+
+def test_payloads_are_redacted_truncated_and_rendered_lazily():
+    policy = SagaLogPolicy(max_payload_chars=60, redact_keys=["payment_details"])
+    event = {"saga_id": "saga-1", "payment_details": {"card_number": "4111"}, "items": [{"note": "y" * 80}]}
+
+    payload = policy.payload(event)
+    # Nothing is serialized until the payload is formatted
+    event["saga_id"] = "saga-2"
+    rendered = str(payload)
+
+    assert "4111" not in rendered
+    assert rendered.startswith('{"saga_id":"saga-2","payment_details":"***"')
+    assert rendered.endswith(" chars)")
+
+
+def test_filter_drops_info_of_unsampled_events_but_keeps_warnings():
+    policy = SagaLogPolicy(sample_rates={"InventoryReserved": 0.0})
+    log_filter = SampledLogFilter()
+
+    with policy.event("InventoryReserved", "saga-1"):
+        assert not log_filter.filter(_record(logging.INFO))
+        assert log_filter.filter(_record(logging.WARNING))
+    with policy.event("PaymentProcessed", "saga-1"):
+        assert log_filter.filter(_record(logging.INFO))
+    assert log_filter.filter(_record(logging.INFO))
+
+
+def test_configure_changes_only_the_given_settings():
+    policy = SagaLogPolicy(default_rate=1.0, max_payload_chars=100, redact_keys=["email"])
+    policy.configure(sample_rates={"CartCleared": 0.1}, max_payload_chars=20)
+
+    assert policy.describe() == {
+        "sample_rates": {"CartCleared": 0.1},
+        "default_rate": 1.0,
+        "max_payload_chars": 20,
+        "redact_keys": ["email"],
+        "debug_saga_ids": [],
+    }
+
+
+def test_keys_redacted_at_startup_cannot_be_unredacted():
+    policy = SagaLogPolicy(redact_keys=["email", "cvv"])
+
+    with pytest.raises(ValueError, match="cvv, email"):
+        policy.configure(redact_keys=[], max_payload_chars=20)
+    assert policy.describe()["max_payload_chars"] == 512
+
+    policy.configure(redact_keys=["email", "cvv", "phone"])
+    assert policy.describe()["redact_keys"] == ["cvv", "email", "phone"]
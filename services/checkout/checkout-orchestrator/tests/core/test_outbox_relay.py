@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import pytest
+
+from checkout_orchestrator.core.outbox_relay import OutboxRelay
+from checkout_orchestrator.infrastructure.repositories.outbox_repository import OutboxRepository
+
+
+class PipeliningProducer:
+    """Mimics AIOKafkaProducer.send(): enqueue now, ack later through the returned future."""
+
+    def __init__(self):
+        self.sent = []
+        self.pending = []
+
+    async def send(self, topic, value, key=None):
+        future = asyncio.get_running_loop().create_future()
+        self.sent.append((topic, json.loads(value), key))
+        self.pending.append(future)
+        return future
+
+    def ack_all(self):
+        for future in self.pending:
+            future.set_result(None)
+        self.pending = []
+
+
+@pytest.mark.asyncio
+async def test_relay_pipelines_a_batch_and_marks_it_published(saga_repository):
+    database = saga_repository.database
+    outbox_repository = OutboxRepository(database)
+    await outbox_repository.create_outbox_table()
+    await outbox_repository.add_many("saga-1", [("topic-a", {"n": 1}), ("topic-b", {"n": 2})])
+    await outbox_repository.add_many("saga-2", [("topic-a", {"n": 3})])
+
+    producer = PipeliningProducer()
+    relay = OutboxRelay(database, outbox_repository, producer, batch_size=2)
+    relay_task = asyncio.create_task(relay.relay_once())
+    await asyncio.sleep(0.05)
+
+    # Both sends were issued before any ack came back
+    assert [payload["n"] for _, payload, _ in producer.sent] == [1, 2]
+    producer.ack_all()
+    assert await relay_task == 2
+
+    remaining = await outbox_repository.fetch_unpublished(10)
+    assert [row["saga_id"] for row in remaining] == ["saga-2"]
+
+    relay_task = asyncio.create_task(relay.relay_once())
+    await asyncio.sleep(0.05)
+    producer.ack_all()
+    assert await relay_task == 1
+    assert producer.sent[-1] == ("topic-a", {"n": 3}, b"saga-2")
+    assert await outbox_repository.fetch_unpublished(10) == []
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from pybreaker import CircuitBreaker, CircuitBreakerError
+
+from checkout_orchestrator.core.producer import PipelinedProducer
+
+
+class DeferredAckProducer:
+    def __init__(self):
+        self.sent = []
+        self.futures = []
+
+    async def send(self, topic, value, key=None):
+        future = asyncio.get_running_loop().create_future()
+        self.sent.append((topic, value, key))
+        self.futures.append(future)
+        return future
+
+
+@pytest.mark.asyncio
+async def test_batch_enqueues_every_send_before_awaiting_acks():
+    producer = DeferredAckProducer()
+    pipelined = PipelinedProducer(producer, CircuitBreaker(fail_max=5, reset_timeout=60))
+
+    async def publish():
+        async with pipelined.batch() as batch:
+            await batch.send("t", b"1")
+            await batch.send("t", b"2", key=b"saga")
+
+    task = asyncio.create_task(publish())
+    await asyncio.sleep(0.01)
+    assert [value for _, value, _ in producer.sent] == [b"1", b"2"]
+    assert not task.done()
+
+    for future in producer.futures:
+        future.set_result(None)
+    await task
+
+
+@pytest.mark.asyncio
+async def test_failed_acks_open_the_breaker():
+    producer = DeferredAckProducer()
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=60)
+    pipelined = PipelinedProducer(producer, breaker)
+
+    for _ in range(2):
+        with pytest.raises((RuntimeError, CircuitBreakerError)):
+            async with pipelined.batch() as batch:
+                await batch.send("t", b"x")
+                producer.futures[-1].set_exception(RuntimeError("broker down"))
+
+    assert breaker.current_state == "open"
+    with pytest.raises(CircuitBreakerError):
+        await pipelined.send_and_wait("t", b"y")
+    assert len(producer.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_caller_errors_inside_a_batch_do_not_count_against_the_breaker():
+    producer = DeferredAckProducer()
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=60)
+    pipelined = PipelinedProducer(producer, breaker)
+
+    for _ in range(3):
+        with pytest.raises(TypeError):
+            async with pipelined.batch() as batch:
+                await batch.send("t", b"x")
+                raise TypeError("not serializable")
+
+    async def cancelled_publish():
+        async with pipelined.batch() as batch:
+            await batch.send("t", b"x")
+            await asyncio.Event().wait()
+
+    for _ in range(3):
+        task = asyncio.create_task(cancelled_publish())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert breaker.current_state == "closed"
+    assert breaker.fail_counter == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_open_the_breaker():
+    class FailingProducer:
+        async def send(self, topic, value, key=None):
+            raise RuntimeError("buffer full")
+
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=60)
+    pipelined = PipelinedProducer(FailingProducer(), breaker)
+
+    for _ in range(2):
+        with pytest.raises((RuntimeError, CircuitBreakerError)):
+            await pipelined.send_and_wait("t", b"x")
+
+    assert breaker.current_state == "open"
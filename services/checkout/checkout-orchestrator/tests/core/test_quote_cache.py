@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from checkout_orchestrator.core.config import registry
+from checkout_orchestrator.core.quote_cache import QuoteCache, cart_quote_key
+
+
+def _sample(name: str, **labels) -> float:
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def test_cart_quote_key_ignores_item_order():
+    items = [{"product_id": "a", "quantity": 1}, {"quantity": 2, "product_id": "b"}]
+    assert cart_quote_key("cart", "user", items) == cart_quote_key("cart", "user", list(reversed(items)))
+    assert cart_quote_key("cart", "user", items) != cart_quote_key("cart", "other-user", items)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_lookups_make_one_upstream_call():
+    cache = QuoteCache(max_entries=10, ttl_seconds=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 150
+
+    hits_before = _sample("checkout_quote_cache_hits_total", kind="discount")
+    coalesced_before = _sample("checkout_quote_cache_coalesced_total", kind="discount")
+
+    results = await asyncio.gather(*(cache.get_or_load("discount", "k", loader) for _ in range(5)))
+    assert results == [150] * 5
+    assert calls == 1
+    assert _sample("checkout_quote_cache_coalesced_total", kind="discount") - coalesced_before == 4
+
+    assert await cache.get_or_load("discount", "k", loader) == 150
+    assert calls == 1
+    assert _sample("checkout_quote_cache_hits_total", kind="discount") - hits_before == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_are_evicted_least_recently_used_first():
+    now = 0.0
+    cache = QuoteCache(max_entries=2, ttl_seconds=10, clock=lambda: now)
+
+    async def value(v):
+        return v
+
+    await cache.get_or_load("tax", "a", lambda: value(1))
+    await cache.get_or_load("tax", "b", lambda: value(2))
+    await cache.get_or_load("tax", "a", lambda: value(-1))  # touch "a"
+    await cache.get_or_load("tax", "c", lambda: value(3))  # evicts "b"
+    assert await cache.get_or_load("tax", "b", lambda: value(20)) == 20
+
+    now = 11.0
+    assert await cache.get_or_load("tax", "c", lambda: value(30)) == 30
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached():
+    cache = QuoteCache()
+
+    async def failing():
+        raise RuntimeError("tax service down")
+
+    async def ok():
+        return 80
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("tax", "k", failing)
+    assert await cache.get_or_load("tax", "k", ok) == 80
+
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_when_the_first_lookup_is_cancelled():
+    cache = QuoteCache()
+    started = asyncio.Event()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.05)
+        return 80
+
+    first = asyncio.create_task(cache.get_or_load("tax", "k", loader))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_load("tax", "k", loader))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await waiter == 80
+    assert calls == 2
+    with pytest.raises(asyncio.CancelledError):
+        await first
@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.saga_archiver import SagaArchiver
+
+
+def _saga(saga_id: str, state: str, age: datetime.timedelta) -> SagaState:
+    updated_at = datetime.datetime.now(datetime.timezone.utc) - age
+    return SagaState(
+        id=saga_id,
+        state=state,
+        context={"cart_id": "c", "user_id": "u", "errors": []},
+        created_at=updated_at,
+        updated_at=updated_at,
+    )
+
+
+@pytest.mark.asyncio
+async def test_archives_old_terminal_sagas_in_batches(saga_repository):
+    await saga_repository.create_archive_table()
+    old, recent = datetime.timedelta(days=30), datetime.timedelta(hours=1)
+    for saga in (
+        _saga("old-completed", "COMPLETED", old),
+        _saga("old-failed", "FAILED", old),
+        _saga("old-completed-2", "COMPLETED", old),
+        _saga("recent-completed", "COMPLETED", recent),
+        _saga("old-pending", "PAYMENT_PROCESSING_PENDING", old),
+    ):
+        await saga_repository.create(saga)
+
+    archiver = SagaArchiver(saga_repository, max_age=datetime.timedelta(days=7), batch_size=2, batch_pause_ms=0)
+    assert await archiver.archive_once() == 3
+    assert await archiver.archive_once() == 0
+
+    remaining = await saga_repository.get_many(
+        ["old-completed", "old-failed", "old-completed-2", "recent-completed", "old-pending"]
+    )
+    assert set(remaining) == {"recent-completed", "old-pending"}
+
+    # The hot path does not see archived sagas; historical lookups do
+    assert await saga_repository.get("old-failed") is None
+    archived = await saga_repository.get("old-failed", include_archived=True)
+    assert archived.state == "FAILED"
+    assert archived.context["cart_id"] == "c"
+    assert (await saga_repository.get("old-pending", include_archived=True)).state == "PAYMENT_PROCESSING_PENDING"
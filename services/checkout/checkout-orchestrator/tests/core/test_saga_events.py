@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.saga_events import SagaEventBus, status_event_stream
+from checkout_orchestrator.core.saga_status import checkout_status
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _saga(state: str, seconds: int = 0, saga_id: str = "saga-1") -> SagaState:
+    return SagaState(
+        id=saga_id,
+        state=state,
+        context={"current_step": state, "errors": []},
+        created_at=START,
+        updated_at=START + datetime.timedelta(seconds=seconds),
+    )
+
+
+@pytest.mark.asyncio
+async def test_updates_reach_only_the_subscribers_of_the_saga():
+    bus = SagaEventBus()
+    with bus.subscribe("saga-1") as first, bus.subscribe("saga-2") as second:
+        bus.publish(_saga("INVENTORY_RESERVED"))
+
+        assert (await first.next(timeout=0.1)).status == "INVENTORY_RESERVED"
+        assert await second.next(timeout=0.01) is None
+    assert not bus.has_subscribers("saga-1")
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_keep_the_latest_updates():
+    bus = SagaEventBus(queue_size=2)
+    with bus.subscribe("saga-1") as subscription:
+        for i, state in enumerate(("INVENTORY_RESERVED", "PAYMENT_PROCESSED", "ORDER_CREATED")):
+            bus.publish(_saga(state, i))
+
+        assert (await subscription.next(timeout=0.1)).status == "PAYMENT_PROCESSED"
+        assert (await subscription.next(timeout=0.1)).status == "ORDER_CREATED"
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_changes_and_ends_with_the_saga():
+    bus = SagaEventBus()
+    subscription = bus.subscribe("saga-1")
+    stream = status_event_stream(subscription, checkout_status(_saga("CHECKOUT_INITIATED")), reload=None)
+
+    assert "CHECKOUT_INITIATED" in await stream.__anext__()
+    bus.publish(_saga("CHECKOUT_INITIATED"))
+    bus.publish(_saga("INVENTORY_RESERVED", 1))
+    frame = await stream.__anext__()
+    assert frame.startswith("event: status\ndata: ") and '"status":"INVENTORY_RESERVED"' in frame
+    bus.publish(_saga("COMPLETED", 2))
+    assert '"status":"COMPLETED"' in await stream.__anext__()
+
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert not bus.has_subscribers("saga-1")
+
+
+@pytest.mark.asyncio
+async def test_quiet_streams_reload_the_status_and_send_keepalives():
+    bus = SagaEventBus()
+    statuses = [checkout_status(_saga("CHECKOUT_INITIATED")), checkout_status(_saga("PAYMENT_PROCESSED", 5))]
+
+    async def reload():
+        return statuses[0]
+
+    stream = status_event_stream(bus.subscribe("saga-1"), statuses[0], reload, heartbeat_seconds=0.01)
+    await stream.__anext__()
+    assert await stream.__anext__() == ": keepalive\n\n"
+
+    # Advanced by another instance: nothing was published here
+    statuses.pop(0)
+    assert '"status":"PAYMENT_PROCESSED"' in await stream.__anext__()
+    await stream.aclose()
+    assert not bus.has_subscribers("saga-1")
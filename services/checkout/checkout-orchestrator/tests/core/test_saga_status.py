@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+from checkout_orchestrator.core.config import registry
+from checkout_orchestrator.core.saga_status import SagaStatusCache
+
+
+def _sample(name: str, **labels) -> float:
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def _saga(state: str = "INVENTORY_RESERVATION_PENDING", updated_at: datetime.datetime = None) -> SagaState:
+    now = updated_at or datetime.datetime.now(datetime.timezone.utc)
+    return SagaState(
+        id=str(uuid.uuid4()),
+        state=state,
+        context={"current_step": "INVENTORY_RESERVATION_SENT", "errors": [], "order_details": {"order_id": "o-1"}},
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_status_reads_of_one_saga_share_a_database_read():
+    cache = SagaStatusCache()
+    saga = _saga()
+    reads = 0
+
+    async def loader():
+        nonlocal reads
+        reads += 1
+        await asyncio.sleep(0.01)
+        return saga
+
+    coalesced_before = _sample("checkout_saga_status_lookups_total", result="coalesced")
+    statuses = await asyncio.gather(*(cache.get_or_load(saga.id, loader) for _ in range(5)))
+
+    assert reads == 1
+    assert {status.status for status in statuses} == {"INVENTORY_RESERVATION_PENDING"}
+    assert statuses[0].order_id == "o-1"
+    assert _sample("checkout_saga_status_lookups_total", result="coalesced") - coalesced_before == 4
+
+
+def test_in_progress_snapshots_expire_sooner_than_final_ones():
+    now = 100.0
+    cache = SagaStatusCache(ttl_seconds=1, final_ttl_seconds=60, clock=lambda: now)
+    running, completed = _saga(), _saga("COMPLETED")
+    cache.put(running)
+    cache.put(completed)
+
+    now = 102.0
+    assert cache.get(running.id) is None
+    assert cache.get(completed.id).status == "COMPLETED"
+
+
+def test_an_older_snapshot_does_not_replace_a_newer_one():
+    cache = SagaStatusCache()
+    newer = _saga("PAYMENT_PROCESSING_PENDING")
+    older = newer.model_copy(update={"state": "INVENTORY_RESERVATION_PENDING", "updated_at": newer.updated_at - datetime.timedelta(seconds=1)})
+    cache.put(newer)
+    cache.put(older)
+
+    assert cache.get(newer.id).status == "PAYMENT_PROCESSING_PENDING"
+
+
+@pytest.mark.asyncio
+async def test_unknown_sagas_are_not_cached():
+    cache = SagaStatusCache()
+    saga = _saga()
+    results = iter([None, saga])
+
+    async def loader():
+        return next(results)
+
+    assert await cache.get_or_load(saga.id, loader) is None
+    assert (await cache.get_or_load(saga.id, loader)).saga_id == saga.id
+
+
+@pytest.mark.asyncio
+async def test_the_shared_read_survives_the_poller_that_started_it_disconnecting():
+    cache = SagaStatusCache()
+    saga = _saga()
+    started = asyncio.Event()
+    reads = 0
+
+    async def loader():
+        nonlocal reads
+        reads += 1
+        started.set()
+        await asyncio.sleep(0.02)
+        return saga
+
+    first = asyncio.create_task(cache.get_or_load(saga.id, loader))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_load(saga.id, loader))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await waiter).saga_id == saga.id
+    assert reads == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
@@ -0,0 +1,63 @@
+import pytest
+
+from checkout_orchestrator.core.timer_wheel import TimerWheel
+
+
+def test_keys_expire_once_their_deadline_passes():
+    wheel = TimerWheel(tick_seconds=1.0, slots=8)
+    wheel.advance(100.0)
+    wheel.schedule("a", 102.5)
+    wheel.schedule("b", 104.0)
+
+    assert wheel.advance(102.0) == []
+    assert wheel.advance(103.0) == ["a"]
+    assert wheel.advance(110.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_rescheduling_and_cancelling_replace_the_deadline():
+    wheel = TimerWheel(tick_seconds=1.0, slots=8)
+    wheel.advance(100.0)
+    wheel.schedule("a", 101.0)
+    wheel.schedule("a", 105.0)
+    wheel.schedule("b", 101.0)
+    wheel.cancel("b")
+
+    assert wheel.advance(102.0) == []
+    assert wheel.advance(105.0) == ["a"]
+
+
+def test_deadlines_beyond_one_revolution_wait_for_their_turn():
+    wheel = TimerWheel(tick_seconds=1.0, slots=4)
+    wheel.advance(0.0)
+    # Same slot as tick 2, but three revolutions later
+    wheel.schedule("far", 14.0)
+
+    assert wheel.advance(4.0) == []
+    assert wheel.advance(13.0) == []
+    assert wheel.advance(14.0) == ["far"]
+
+
+def test_past_deadlines_and_stalled_clocks_still_expire():
+    wheel = TimerWheel(tick_seconds=1.0, slots=4)
+    wheel.schedule("before-start", 1.0)
+    wheel.advance(50.0)
+    wheel.schedule("late", 10.0)
+    wheel.schedule("soon", 52.0)
+
+    assert wheel.advance(50.5) == []
+    assert sorted(wheel.advance(1000.0)) == ["late", "soon"]
+
+
+def test_first_advance_sees_everything_already_due():
+    wheel = TimerWheel(tick_seconds=1.0, slots=4)
+    wheel.schedule("a", 5.0)
+    wheel.schedule("b", 90.0)
+
+    assert wheel.advance(60.0) == ["a"]
+    assert "b" in wheel
+
+
+def test_invalid_configuration_is_rejected():
+    with pytest.raises(ValueError):
+        TimerWheel(tick_seconds=0)
@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+
+from checkout_orchestrator.infrastructure.repositories.idempotency_repository import IdempotencyRepository
+
+NOW = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+LATER = NOW + datetime.timedelta(minutes=10)
+
+
+@pytest.mark.asyncio
+async def test_first_claim_owns_the_key_until_it_expires(saga_repository):
+    repository = IdempotencyRepository(saga_repository.database)
+    await repository.create_idempotency_table()
+
+    assert (await repository.claim("k", "saga-1", "h1", NOW, LATER))["saga_id"] == "saga-1"
+    owner = await repository.claim("k", "saga-2", "h2", NOW, LATER)
+    assert (owner["saga_id"], owner["request_hash"]) == ("saga-1", "h1")
+    assert (await repository.get("k", NOW))["saga_id"] == "saga-1"
+
+    # Expired claims are neither served nor in the way of a new one
+    assert await repository.get("k", LATER) is None
+    assert (await repository.claim("k", "saga-3", "h3", LATER, LATER + datetime.timedelta(minutes=10)))["saga_id"] == "saga-3"
+
+
+@pytest.mark.asyncio
+async def test_release_and_prune(saga_repository):
+    repository = IdempotencyRepository(saga_repository.database)
+    await repository.create_idempotency_table()
+    await repository.claim("a", "saga-1", "h", NOW, LATER)
+    await repository.claim("b", "saga-2", "h", NOW, LATER + datetime.timedelta(minutes=10))
+
+    # Only the owning saga can release a key
+    await repository.release("a", "saga-2")
+    assert await repository.get("a", NOW) is not None
+    await repository.release("a", "saga-1")
+    assert await repository.get("a", NOW) is None
+
+    await repository.prune_expired(LATER + datetime.timedelta(minutes=10))
+    assert await saga_repository.database.fetch_all("SELECT * FROM checkout_idempotency_keys") == []
@@ -0,0 +1,18 @@
+import datetime
+
+import pytest
+
+from checkout_orchestrator.infrastructure.repositories.processed_event_repository import ProcessedEventRepository
+
+
+@pytest.mark.asyncio
+async def test_existing_and_prune(saga_repository):
+    repository = ProcessedEventRepository(saga_repository.database)
+    await repository.create_processed_events_table()
+    await repository.add_many([("s1", "e1"), ("s1", "e2"), ("s2", "e1")])
+
+    assert await repository.existing([("s1", "e1"), ("s2", "e2"), ("s2", "e1")]) == {("s1", "e1"), ("s2", "e1")}
+    assert await repository.existing([]) == set()
+
+    await repository.prune_before(datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=1))
+    assert not await repository.exists("s1", "e1")
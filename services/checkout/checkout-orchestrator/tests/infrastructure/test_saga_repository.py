@@ -0,0 +1,144 @@
+import datetime
+
+import pytest
+
+from checkout_orchestrator.api.schemas.saga import SagaState
+
+
+def _saga(saga_id: str, state: str = "CHECKOUT_INITIATED") -> SagaState:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return SagaState(
+        id=saga_id,
+        state=state,
+        context={"cart_id": "c", "user_id": "u", "cart_details": {"items": []}, "errors": []},
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_many_returns_only_existing_sagas(saga_repository):
+    await saga_repository.create(_saga("a"))
+    await saga_repository.create(_saga("b"))
+
+    sagas = await saga_repository.get_many(["a", "b", "missing", "a"])
+
+    assert set(sagas) == {"a", "b"}
+    assert sagas["a"].context["cart_id"] == "c"
+    assert await saga_repository.get_many([]) == {}
+
+
+@pytest.mark.asyncio
+async def test_update_many_writes_all_sagas(saga_repository):
+    await saga_repository.create(_saga("a"))
+    await saga_repository.create(_saga("b"))
+    sagas = await saga_repository.get_many(["a", "b"])
+    for saga in sagas.values():
+        saga.state = "INVENTORY_RESERVATION_PENDING"
+        saga.processed_event_ids.append(f"evt-{saga.id}")
+
+    await saga_repository.update_many(list(sagas.values()))
+
+    reloaded = await saga_repository.get_many(["a", "b"])
+    assert {s.state for s in reloaded.values()} == {"INVENTORY_RESERVATION_PENDING"}
+    assert reloaded["b"].processed_event_ids == ["evt-b"]
+
+
+@pytest.mark.asyncio
+async def test_find_timed_out_applies_the_cutoff_of_each_state(saga_repository):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for saga_id, state, age in [
+        ("old-inventory", "INVENTORY_RESERVATION_PENDING", 300),
+        ("fresh-inventory", "INVENTORY_RESERVATION_PENDING", 10),
+        ("old-payment", "PAYMENT_PROCESSING_PENDING", 100),
+        ("older-payment", "PAYMENT_PROCESSING_PENDING", 400),
+        ("completed", "COMPLETED", 1000),
+    ]:
+        saga = _saga(saga_id, state)
+        saga.updated_at = now - datetime.timedelta(seconds=age)
+        await saga_repository.create(saga)
+
+    cutoffs = {
+        "INVENTORY_RESERVATION_PENDING": now - datetime.timedelta(seconds=120),
+        "PAYMENT_PROCESSING_PENDING": now - datetime.timedelta(seconds=60),
+    }
+    async with saga_repository.database.transaction():
+        found = await saga_repository.find_timed_out(cutoffs, limit=10)
+        limited = await saga_repository.find_timed_out(cutoffs, limit=10, saga_ids=["old-payment", "fresh-inventory"])
+
+    # Oldest first
+    assert [saga.id for saga in found] == ["older-payment", "old-inventory", "old-payment"]
+    assert [saga.id for saga in limited] == ["old-payment"]
+    assert await saga_repository.find_timed_out({}, limit=10) == []
+
+
+@pytest.mark.asyncio
+async def test_update_writes_only_changed_context_keys(saga_repository):
+    await saga_repository.create(_saga("a"))
+    saga = await saga_repository.get("a")
+    # Written by someone else after our read: a full rewrite would drop it
+    await saga_repository.database.execute(
+        "UPDATE saga_states SET context = json_set(context, '$.audit', 'kept') WHERE id = 'a'"
+    )
+
+    saga.state = "PAYMENT_PROCESSING_PENDING"
+    saga.context["current_step"] = "PAYMENT_REQUEST_SENT"
+    saga.context["errors"].append({"step": "inventory", "reason": None})
+    saga.context["inventory_reservation_details"] = None
+    del saga.context["cart_id"]
+    assert saga.context_changes() == (
+        {
+            "errors": [{"step": "inventory", "reason": None}],
+            "current_step": "PAYMENT_REQUEST_SENT",
+            "inventory_reservation_details": None,
+        },
+        ["cart_id"],
+    )
+    await saga_repository.update(saga)
+
+    assert saga.context_changes() == ({}, [])
+    stored = await saga_repository.get("a")
+    assert stored.state == "PAYMENT_PROCESSING_PENDING"
+    assert stored.context == {
+        "user_id": "u",
+        "cart_details": {"items": []},
+        "errors": [{"step": "inventory", "reason": None}],
+        "audit": "kept",
+        "current_step": "PAYMENT_REQUEST_SENT",
+        "inventory_reservation_details": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_sagas_never_read_from_the_database_are_written_whole(saga_repository):
+    await saga_repository.create(_saga("a"))
+    replacement = _saga("a", "FAILED")
+    replacement.context = {"errors": ["boom"]}
+    assert replacement.context_changes() is None
+
+    await saga_repository.update_many([replacement])
+
+    stored = await saga_repository.get("a")
+    assert stored.state == "FAILED"
+    assert stored.context == {"errors": ["boom"]}
+
+
+@pytest.mark.asyncio
+async def test_updates_are_skipped_once_the_stored_state_moved_on(saga_repository):
+    await saga_repository.create(_saga("a"))
+    await saga_repository.create(_saga("b"))
+    stale = await saga_repository.get("a")
+    sagas = await saga_repository.get_many(["a", "b"])
+    # A timeout wins the race
+    sagas["a"].state = "FAILED"
+    await saga_repository.update(sagas["a"])
+
+    stale.state = "INVENTORY_RESERVATION_PENDING"
+    assert await saga_repository.update(stale) is None
+    assert stale.persisted_state == "CHECKOUT_INITIATED"
+    sagas["b"].state = "INVENTORY_RESERVATION_PENDING"
+    assert await saga_repository.update_many([stale, sagas["b"]]) == [sagas["b"]]
+
+    stored = await saga_repository.get_many(["a", "b"])
+    assert stored["a"].state == "FAILED"
+    assert stored["b"].state == "INVENTORY_RESERVATION_PENDING"
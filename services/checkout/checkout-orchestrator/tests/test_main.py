@@ -0,0 +1,15 @@
+import httpx
+import pytest
+
+from checkout_orchestrator.core.config import MOCK_KAFKA
+from checkout_orchestrator.main import app
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_served_with_mocked_kafka():
+    assert MOCK_KAFKA
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "checkout_saga_events_rejected_total" in response.text
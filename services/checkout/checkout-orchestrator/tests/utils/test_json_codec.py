@@ -0,0 +1,49 @@
+import pytest
+
+from checkout_orchestrator.utils import json_codec
+
+CART_DETAILS = {
+    "items": [
+        {"product_id": "p-2", "quantity": 1, "price": 19.99, "name": "Café crème"},
+        {"product_id": "p-1", "quantity": 3, "price": 4, "attributes": {"size": "L", "gift": True}},
+    ],
+    "total_price": 3199,
+    "coupon": None,
+}
+
+
+@pytest.fixture(params=json_codec.available_backends())
+def codec(request):
+    return json_codec.make_codec(request.param)
+
+
+def test_round_trip(codec):
+    assert codec.loads(codec.dumps(CART_DETAILS)) == CART_DETAILS
+    assert codec.loads(codec.dumps(CART_DETAILS).decode("utf-8")) == CART_DETAILS
+
+
+def test_backends_write_identical_bytes(codec):
+    stdlib = json_codec.make_codec("stdlib")
+    assert codec.dumps(CART_DETAILS) == stdlib.dumps(CART_DETAILS)
+    assert codec.dumps_sorted({"b": 1, "a": [2, {"d": 3, "c": 4}]}) == b'{"a":[2,{"c":4,"d":3}],"b":1}'
+
+
+@pytest.mark.parametrize("data", [b"{not json", b"\xff\xfe", ""])
+def test_invalid_input_raises_value_error(codec, data):
+    with pytest.raises(ValueError):
+        codec.loads(data)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        json_codec.make_codec("simdjson")
+
+
+def test_set_backend_switches_the_module_functions():
+    previous = json_codec.backend_name()
+    try:
+        json_codec.set_backend("stdlib")
+        assert json_codec.backend_name() == "stdlib"
+        assert json_codec.loads(json_codec.dumps_str({"a": 1})) == {"a": 1}
+    finally:
+        json_codec.set_backend(previous)